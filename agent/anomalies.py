@@ -0,0 +1,156 @@
+"""
+Batch anomaly scan over every (entity, account_category) monthly series.
+
+    python -m agent.anomalies --fixtures fixtures
+
+scans the ledger and persists the flags next to the loader cache, where the
+app picks them up without rescanning.
+"""
+import argparse
+import glob
+import hashlib
+import inspect
+import json
+import os
+import warnings
+
+import numpy as np
+import pyarrow.feather as feather
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Scoring methods for the rolling scan
+METHODS = ['zscore', 'mad']
+
+# Scales the median absolute deviation to a standard deviation for normal data
+MAD_SCALE = 1.4826
+
+
+def _trailing_bounds(months, window):
+    """First and one-past-last month of the `window` months before each month"""
+    end = np.arange(months)
+    return np.maximum(end - window, 0), end
+
+
+def rolling_zscores(values, present, window=12, min_periods=6):
+    """
+    z-score of each month against the mean and standard deviation of the
+    trailing `window` months with rows (the month itself excluded), from
+    prefix sums down the month axis. NaN where fewer than min_periods months.
+    """
+    # Centring each series first keeps the sum-of-squares variance accurate
+    counts = present.sum(axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        centre = np.where(counts > 0, np.where(present, values, 0).sum(axis=0) / counts, 0)
+    x = np.where(present, values - centre, 0.0)
+
+    prefix = np.zeros((3, len(values) + 1) + values.shape[1:])
+    np.cumsum(present, axis=0, out=prefix[0, 1:])
+    np.cumsum(x, axis=0, out=prefix[1, 1:])
+    np.cumsum(x * x, axis=0, out=prefix[2, 1:])
+
+    start, end = _trailing_bounds(len(values), window)
+    n, s, q = prefix[:, end] - prefix[:, start]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = s / n
+        std = np.sqrt(np.maximum(q / n - mean * mean, 0))
+        z = np.where(std > 0, (x - mean) / std, np.where(x == mean, 0.0, np.inf * np.sign(x - mean)))
+    ok = present & (n >= min_periods)
+    return np.where(ok, z, np.nan), np.where(ok, mean + centre, np.nan)
+
+
+def rolling_mad_scores(values, present, window=12, min_periods=6):
+    """
+    Robust z-score of each month against the median and scaled median
+    absolute deviation of the trailing `window` months with rows
+    """
+    padded = np.full((window + len(values),) + values.shape[1:], np.nan)
+    padded[window:] = np.where(present, values, np.nan)
+    # month x ... x window views of the months before each month; no copies
+    windows = sliding_window_view(padded, window, axis=0)[:len(values)]
+
+    n = np.sum(~np.isnan(windows), axis=-1)
+    with warnings.catch_warnings():
+        # All-NaN windows (the first months) are expected
+        warnings.simplefilter('ignore', RuntimeWarning)
+        median = np.nanmedian(windows, axis=-1)
+        mad = np.nanmedian(np.abs(windows - median[..., None]), axis=-1) * MAD_SCALE
+    deviation = values - median
+    with np.errstate(divide='ignore', invalid='ignore'):
+        z = np.where(mad > 0, deviation / mad, np.where(deviation == 0, 0.0, np.inf * np.sign(deviation)))
+    ok = present & (n >= min_periods)
+    return np.where(ok, z, np.nan), np.where(ok, median, np.nan)
+
+
+def budget_misses(actual, actual_present, budget, budget_present):
+    """Signed miss against budget as a fraction of it (NaN where either side has no rows)"""
+    ok = actual_present & budget_present & (budget != 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(ok, (actual - budget) / np.abs(budget), np.nan)
+
+
+class AnomalyStore:
+    """
+    Anomaly flags persisted as feather files keyed by data version and scan
+    settings, so a restarted app shows them without rescanning
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def path(self, version, params):
+        digest = hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()[:12]
+        return os.path.join(self.directory, f'anomalies-{version}-{digest}.feather')
+
+    def load(self, version, params):
+        try:
+            return feather.read_feather(self.path(version, params))
+        except (OSError, ValueError):
+            return None
+
+    def save(self, version, params, flags):
+        os.makedirs(self.directory, exist_ok=True)
+        # Flags for older data versions can never be shown again
+        for stale in glob.glob(os.path.join(self.directory, 'anomalies-*.feather')):
+            if not os.path.basename(stale).startswith(f'anomalies-{version}-'):
+                os.remove(stale)
+        # Write-then-rename so a concurrent reader never sees half a file
+        path = self.path(version, params)
+        feather.write_feather(flags.reset_index(drop=True), path + '.tmp')
+        os.replace(path + '.tmp', path)
+
+    def get_or_scan(self, tools, **params):
+        """Persisted flags for the tools' data version, scanning and saving them if missing"""
+        # Key on every setting, defaults filled in, so the CLI's explicit flags match the app's bare call
+        bound = inspect.signature(type(tools).detect_anomalies).bind(tools, **params)
+        bound.apply_defaults()
+        params = {name: value for name, value in bound.arguments.items() if name != 'self'}
+        flags = self.load(tools.data_version, params)
+        if flags is None:
+            flags = tools.detect_anomalies(**params)
+            self.save(tools.data_version, params, flags)
+        return flags
+
+
+def main(argv=None):
+    from agent.data_loader import FinanceDataLoader
+    from agent.tools import FinanceTools
+
+    parser = argparse.ArgumentParser(description='Scan the ledger for anomalies and persist the flags')
+    parser.add_argument('--fixtures', default='fixtures', help='directory containing data.xlsx')
+    parser.add_argument('--window', type=int, default=12, help='trailing months each month is scored against')
+    parser.add_argument('--threshold', type=float, default=3.0, help='score that flags a month')
+    parser.add_argument('--method', choices=METHODS, default='zscore')
+    parser.add_argument('--budget-threshold', type=float, default=0.1, help='budget miss that flags a month')
+    args = parser.parse_args(argv)
+
+    loader = FinanceDataLoader(args.fixtures, compact=True)
+    tools = FinanceTools(loader.load_lazy(), result_cache=False)
+    store = AnomalyStore(loader.cache_dir)
+    flags = store.get_or_scan(tools, window=args.window, threshold=args.threshold, method=args.method,
+                              budget_threshold=args.budget_threshold)
+    print(f"{len(flags)} flags saved to {store.directory}")
+    print(flags['kind'].value_counts().to_string() if len(flags) else '')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,218 @@
+import argparse
+import json
+import multiprocessing
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from agent.data_loader import FinanceDataLoader
+from agent.pdf_generator import PDFReportGenerator
+from agent.tools import FinanceTools
+
+# Name used in filenames for group-level reports
+CONSOLIDATED = 'Consolidated'
+
+MANIFEST_NAME = 'manifest.json'
+
+REVENUE_METRICS = ['revenue', 'budget_revenue', 'revenue_variance', 'revenue_variance_pct']
+
+
+def report_filename(month, entity=None):
+    safe_entity = re.sub(r'[^A-Za-z0-9_-]+', '_', entity or CONSOLIDATED)
+    return f'cfo_report_{safe_entity}_{month}.pdf'
+
+
+def _write_report(job):
+    """Render one report from precomputed inputs (runs in a worker process)"""
+    start = time.perf_counter()
+    generator = PDFReportGenerator(None, chart_workers=0)
+
+    # Writing to a side file first so a crash never leaves a "finished" partial PDF
+    partial_path = job['path'] + '.part'
+    try:
+        generator.write_report(partial_path, job['month'], job['revenue'], job['opex'],
+                               job['runway'], job['entity'])
+        os.replace(partial_path, job['path'])
+    except Exception:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        raise
+
+    return time.perf_counter() - start
+
+
+class BulkReportGenerator:
+    """
+    Writes one PDF per (month, entity) from a single batched metrics pass,
+    rendering reports in parallel and recording progress in a manifest so an
+    interrupted run can resume
+    """
+
+    def __init__(self, tools, output_dir='reports', workers=None):
+        self.tools = tools
+        self.output_dir = output_dir
+        self.workers = workers or os.cpu_count() or 1
+        self.manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+
+    def plan(self, end_month=None, window=12, entities=None, include_consolidated=False):
+        """(month, entity) pairs for a rolling window ending at end_month"""
+        if window < 1:
+            raise ValueError("The report window must be at least 1 month")
+        months = [m for m in self.tools.actual_months() if end_month is None or m <= end_month]
+        months = months[-window:]
+        entities = list(self.tools.entities) if entities is None else list(entities)
+        if include_consolidated:
+            entities = entities + [None]
+        return [(month, entity) for month in months for entity in entities]
+
+    def compute_inputs(self, jobs):
+        """Fetch every metric the jobs need with one call per metric family"""
+        months = sorted({month for month, _ in jobs})
+        entities = sorted({entity for _, entity in jobs if entity is not None})
+
+        revenue = {}
+        opex = {}
+        if entities:
+            by_entity = self.tools.get_metrics(months, entities, REVENUE_METRICS, by_entity=True)
+            for row in by_entity.itertuples(index=False):
+                revenue[(row.month, row.entity)] = row
+            opex_rows = self.tools.get_opex_by_category(months, entities, by_entity=True)
+            for key, frame in opex_rows.groupby(['month', 'entity'], sort=False):
+                opex[key] = frame
+        if any(entity is None for _, entity in jobs):
+            consolidated = self.tools.get_metrics(months, metrics=REVENUE_METRICS)
+            for row in consolidated.itertuples(index=False):
+                revenue[(row.month, None)] = row
+            for month, frame in self.tools.get_opex_by_category(months).groupby('month', sort=False):
+                opex[(month, None)] = frame
+
+        runway = self.tools.get_cash_runway()
+
+        inputs = []
+        for month, entity in jobs:
+            row = revenue[(month, entity)]
+            breakdown = opex.get((month, entity))
+            if breakdown is None:
+                breakdown = pd.DataFrame({'category': pd.Series(dtype=object), 'amount': pd.Series(dtype=float)})
+            breakdown = breakdown[['category', 'amount']].reset_index(drop=True)
+            breakdown['pct_of_total'] = breakdown['amount'] / breakdown['amount'].sum() * 100
+
+            inputs.append({
+                'month': month,
+                'entity': entity,
+                'path': os.path.join(self.output_dir, report_filename(month, entity)),
+                'revenue': {
+                    'month': month,
+                    'actual': row.revenue,
+                    'budget': row.budget_revenue,
+                    'variance': row.revenue_variance,
+                    'variance_pct': row.revenue_variance_pct
+                },
+                'opex': breakdown.sort_values('amount', ascending=False),
+                'runway': runway
+            })
+        return inputs
+
+    def _read_manifest(self):
+        try:
+            with open(self.manifest_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_manifest(self, manifest):
+        tmp_path = self.manifest_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.manifest_path)
+
+    def run(self, jobs, resume=True, progress=None):
+        """
+        Generate the reports for `jobs`. With resume=True, reports already marked
+        done in the manifest from the same data version (and still on disk) are
+        skipped. Returns one status dict per job; `progress` is called with each
+        as it finishes.
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        manifest = self._read_manifest() if resume else {}
+
+        results = []
+        pending = []
+        for month, entity in jobs:
+            name = report_filename(month, entity)
+            entry = manifest.get(name, {})
+            done = entry.get('status') == 'done' and entry.get('data_version') == self.tools.data_version
+            if done and os.path.exists(os.path.join(self.output_dir, name)):
+                result = {'month': month, 'entity': entity, 'file': name, 'status': 'skipped',
+                          'seconds': 0.0, 'error': None}
+                results.append(result)
+                if progress:
+                    progress(result)
+            else:
+                pending.append((month, entity))
+
+        if not pending:
+            return results
+
+        inputs = self.compute_inputs(pending)
+        # Spawned like the chart pool: forking a host with threads or matplotlib state running is unsafe
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=min(self.workers, len(inputs)), mp_context=context) as pool:
+            futures = {pool.submit(_write_report, job): job for job in inputs}
+            for future in as_completed(futures):
+                job = futures[future]
+                name = os.path.basename(job['path'])
+                try:
+                    seconds = future.result()
+                    result = {'status': 'done', 'seconds': seconds, 'error': None}
+                except Exception as exc:
+                    result = {'status': 'failed', 'seconds': None, 'error': repr(exc)}
+
+                # Reports from other data versions are stale and get redone
+                manifest[name] = dict(result, data_version=self.tools.data_version)
+                self._write_manifest(manifest)
+
+                result = dict(result, month=job['month'], entity=job['entity'], file=name)
+                results.append(result)
+                if progress:
+                    progress(result)
+
+        return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Write one CFO report per entity per month')
+    parser.add_argument('--output-dir', default='reports')
+    parser.add_argument('--end-month', help='last month of the window (default: latest actuals)')
+    parser.add_argument('--months', type=int, default=12, help='length of the rolling window')
+    parser.add_argument('--entities', nargs='+', help='entities to report on (default: all)')
+    parser.add_argument('--include-consolidated', action='store_true',
+                        help='also write a consolidated report per month')
+    parser.add_argument('--workers', type=int, help='parallel report writers (default: CPU count)')
+    parser.add_argument('--no-resume', action='store_true', help='regenerate reports already done')
+    parser.add_argument('--fixtures', default='fixtures', help='directory containing data.xlsx')
+    args = parser.parse_args(argv)
+    if args.months < 1:
+        parser.error('--months must be at least 1')
+
+    tools = FinanceTools(FinanceDataLoader(args.fixtures, compact=True).load_all_data())
+    bulk = BulkReportGenerator(tools, args.output_dir, args.workers)
+    jobs = bulk.plan(args.end_month, args.months, args.entities, args.include_consolidated)
+
+    def report(result):
+        seconds = '' if result['seconds'] is None else f"{result['seconds']:.2f}s"
+        line = f"{result['status']:<8} {result['file']:<45} {seconds}"
+        print(line + (f"  {result['error']}" if result['error'] else ''), flush=True)
+
+    start = time.perf_counter()
+    results = bulk.run(jobs, resume=not args.no_resume, progress=report)
+    failed = [r for r in results if r['status'] == 'failed']
+    print(f"{len(results)} reports in {time.perf_counter() - start:.1f}s, {len(failed)} failed")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
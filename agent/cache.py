@@ -0,0 +1,112 @@
+import copy
+import functools
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from agent.instrumentation import annotate
+
+
+class ResultCache:
+    """
+    Bounded LRU cache with an optional time-to-live, shared by FinanceTools
+    instances. Keys start with the data version they were computed from.
+    """
+
+    def __init__(self, maxsize=1024, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return (found, value) and count the hit or miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, stored_at = entry
+                if self.ttl is None or time.monotonic() - stored_at < self.ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return True, value
+                del self._entries[key]
+                self.evictions += 1
+            self.misses += 1
+            return False, None
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, version=None):
+        """Drop every entry, or only those computed from `version`"""
+        with self._lock:
+            if version is None:
+                self._entries.clear()
+                return
+            for key in [k for k in self._entries if k[0] == version]:
+                del self._entries[key]
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'size': len(self._entries),
+                'hit_rate': self.hits / total if total else 0.0
+            }
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def _freeze(value):
+    """Make list/dict/array arguments hashable so they can be part of a key"""
+    if isinstance(value, (np.ndarray, pd.Index, pd.Series, pd.Categorical)):
+        return tuple(_freeze(v) for v in value.tolist())
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (set, frozenset)):
+        return tuple(sorted(_freeze(v) for v in value))
+    return value
+
+
+def memoized(method):
+    """Cache a FinanceTools method on (data version, currency, name, args)"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        cache = self.result_cache
+        if cache is None:
+            return method(self, *args, **kwargs)
+
+        key = (self.data_version, self.reporting_currency, method.__name__,
+               _freeze(args), _freeze(kwargs))
+        try:
+            hash(key)
+        except TypeError:
+            # Arguments we can't key on are answered uncached
+            return method(self, *args, **kwargs)
+        found, value = cache.get(key)
+        annotate(cached=found)
+        if not found:
+            value = method(self, *args, **kwargs)
+            cache.put(key, value)
+
+        # Callers get their own copy so they can't corrupt the cached result
+        return copy.deepcopy(value)
+
+    return wrapper
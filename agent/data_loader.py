@@ -1,27 +1,393 @@
 import pandas as pd
+import numpy as np
+import pyarrow.feather as feather
+import openpyxl
+import hashlib
+import itertools
+import json
 import os
+import threading
+from collections.abc import Mapping
+
+from agent.instrumentation import add_rows, span, traced
+
+SHEETS = ['actuals', 'budget', 'cash', 'fx']
+
+# Large ledger sheets that streaming mode reads row by row
+STREAMED_SHEETS = ['actuals', 'budget']
+
+# Dimension columns stored as categorical codes in streaming mode
+DIMENSIONS = ['month', 'entity', 'account_category', 'currency']
+
+
+class _CategoryEncoder:
+    """Assigns stable integer codes to dimension values seen across chunks"""
+
+    def __init__(self):
+        self.codes = {}
+
+    def encode(self, values):
+        local_codes, uniques = pd.factorize(values)
+        lookup = np.array(
+            [self.codes.setdefault(value, len(self.codes)) for value in uniques] + [-1],
+            dtype=np.int32
+        )
+        # factorize marks missing values as -1, which indexes the trailing -1
+        return lookup[local_codes]
+
+    def to_categorical(self, codes, ordered=False):
+        categories = np.array(list(self.codes), dtype=object)
+        order = np.argsort(categories, kind='stable')
+        remap = np.empty(len(order) + 1, dtype=np.int32)
+        remap[order] = np.arange(len(order), dtype=np.int32)
+        remap[-1] = -1
+        return pd.Categorical.from_codes(remap[codes], categories=categories[order], ordered=ordered)
+
+
+def compact_ledger(df):
+    """
+    Store a ledger's dimension columns as categoricals (months ordered), so
+    each distinct string is kept once. Columns that are already categorical
+    and the amount column are reused without copying.
+    """
+    columns = {}
+    for column in df.columns:
+        values = df[column]
+        if column in DIMENSIONS and not isinstance(values.dtype, pd.CategoricalDtype):
+            categories = sorted(values.dropna().unique())
+            values = values.astype(pd.CategoricalDtype(categories, ordered=column == 'month'))
+        columns[column] = values
+    return pd.DataFrame(columns, copy=False)
+
+
+def partition_fingerprints(df):
+    """Map each month to an order-insensitive hash of its rows"""
+    # pandas hashes a categorical like its plain string values, so coded and
+    # uncoded frames agree without materializing the strings
+    row_hashes = pd.util.hash_pandas_object(df, index=False)
+    sums = row_hashes.groupby(df['month'], observed=True).sum()
+    return {month: int(value) for month, value in sums.items()}
+
+
+def sheet_digest(sheet, df):
+    """Content fingerprint of one sheet (row order is ignored)"""
+    sha = hashlib.sha256()
+    sha.update(json.dumps([sheet, df.columns.tolist()]).encode())
+    fingerprints = partition_fingerprints(df) if 'month' in df.columns else {}
+    sha.update(json.dumps(sorted((str(k), v) for k, v in fingerprints.items())).encode())
+    return sha.hexdigest()
+
+
+def data_version(data, digests=None):
+    """
+    Content fingerprint of a set of sheets. Sheets with a known digest in
+    `digests` (e.g. recorded in the loader cache) aren't read to compute it.
+    """
+    digests = digests or {}
+    sha = hashlib.sha256()
+    for sheet in sorted(data):
+        sha.update((digests.get(sheet) or sheet_digest(sheet, data[sheet])).encode())
+    return sha.hexdigest()[:16]
+
+
+class LazyData(Mapping):
+    """
+    The sheets of a FinanceDataLoader, each read on first access and then kept.
+    Reads like the dict load_all_data returns. `version` equals data_version
+    of those sheets when the loader cache has every sheet's digest, and is
+    otherwise taken from the source files, so keying answers parses nothing.
+    """
+
+    def __init__(self, loader):
+        self.loader = loader
+        self._sheets = {}
+        self._version = None
+        self._lock = threading.Lock()
+
+    @property
+    def version(self):
+        if self._version is None:
+            digests = {sheet: self.loader.cached_digest(sheet) for sheet in SHEETS}
+            if all(digests.values()):
+                self._version = data_version(self, digests)
+            else:
+                # Parsing the uncached sheets just to key answers would undo lazy loading
+                self._version = self.loader.source_version()
+        return self._version
+
+    def __getitem__(self, sheet):
+        if sheet not in SHEETS:
+            raise KeyError(sheet)
+        df = self._sheets.get(sheet)
+        if df is None:
+            with self._lock:
+                df = self._sheets.get(sheet)
+                if df is None:
+                    df = self._sheets[sheet] = self.loader.load_sheet(sheet)
+        return df
+
+    def __contains__(self, sheet):
+        # Mapping's default would load the sheet just to answer
+        return sheet in SHEETS
+
+    def __iter__(self):
+        return iter(SHEETS)
+
+    def __len__(self):
+        return len(SHEETS)
+
+    def loaded(self):
+        """Sheets read so far"""
+        return [sheet for sheet in SHEETS if sheet in self._sheets]
+
 
 class FinanceDataLoader:
-    def __init__(self, fixtures_path='fixtures'):
+    def __init__(self, fixtures_path='fixtures', use_cache=True, cache_dir=None,
+                 streaming=False, chunk_size=50000, compact=False):
         self.fixtures_path = fixtures_path
+        self.use_cache = use_cache
+        # Compact mode codes ledger dimensions as categoricals (streaming always does)
+        self.compact = compact
+        # Streaming reads actuals/budget in chunks into categorical-coded frames
+        self.streaming = streaming
+        self.chunk_size = chunk_size
+        # Columnar cache lives next to the workbook unless told otherwise
+        self.cache_dir = cache_dir or os.path.join(fixtures_path, '.cache')
         #loadind data
+    @traced('loader.load_all_data')
     def load_all_data(self):
-      
-        excel_path = os.path.join(self.fixtures_path, 'data.xlsx')
-        
-        data = {}
-        data['actuals'] = pd.read_excel(excel_path, sheet_name='actuals')
-        data['budget'] = pd.read_excel(excel_path, sheet_name='budget')
-        data['cash'] = pd.read_excel(excel_path, sheet_name='cash')
-        data['fx'] = pd.read_excel(excel_path, sheet_name='fx')
-        
-        return data
-    
+        return {sheet: self.load_sheet(sheet) for sheet in SHEETS}
+
+    def load_lazy(self):
+        """Sheets as a LazyData mapping that reads each one on first access"""
+        return LazyData(self)
+
+    @traced('loader.load_sheet')
+    def load_sheet(self, sheet):
+        """Read one sheet, from the columnar cache when it still matches the workbook"""
+        excel_path = self._excel_path()
+
+        if not os.path.exists(excel_path):
+            # Generated datasets too big for a workbook ship one file per sheet
+            with span('loader.read_sheet_files'):
+                df = self._load_sheet_file(sheet)
+            if df is not None:
+                df = self._compact(sheet, df)
+                add_rows(len(df))
+                return df
+
+        if self.use_cache:
+            with span('loader.read_cache'):
+                df = self._load_from_cache(excel_path, sheet)
+            if df is not None:
+                add_rows(len(df))
+                return df
+
+        with span('loader.read_excel'):
+            if self.streaming and sheet in STREAMED_SHEETS:
+                df = self._load_streaming(excel_path, sheet)
+            else:
+                df = pd.read_excel(excel_path, sheet_name=sheet)
+            df = self._compact(sheet, df)
+            add_rows(len(df))
+
+        if self.use_cache:
+            with span('loader.write_cache'):
+                self._write_cache(excel_path, sheet, df)
+
+        return df
+
+    def source_version(self):
+        """Fingerprint of the bytes behind the sheets, using the cache manifest's workbook hash when it matches"""
+        excel_path = self._excel_path()
+        if os.path.exists(excel_path):
+            manifest = self._valid_manifest(excel_path) if self.use_cache else None
+            sha256 = manifest['sha256'] if manifest else self._workbook_hash(excel_path)
+            sources = [[os.path.basename(excel_path), os.stat(excel_path).st_size, sha256]]
+        else:
+            sources = [[os.path.basename(path), os.stat(path).st_size, self._workbook_hash(path)]
+                       for sheet in SHEETS for path in self._sheet_file_paths(sheet) if os.path.exists(path)]
+        return hashlib.sha256(json.dumps(sources).encode()).hexdigest()[:16]
+
+    def cached_digest(self, sheet):
+        """sheet_digest of a sheet as recorded when it was cached, or None if it isn't cached"""
+        excel_path = self._excel_path()
+        if not self.use_cache or not os.path.exists(excel_path):
+            return None
+        manifest = self._valid_manifest(excel_path)
+        if manifest is None or not os.path.exists(self._sheet_path(sheet)):
+            return None
+        return manifest.get('digests', {}).get(sheet)
+
+    def refresh(self, previous):
+        """
+        Reload the workbook and report which month partitions differ from `previous`.
+        Returns (data, changes) where changes maps sheet -> sorted changed months.
+        """
+        data = self.load_all_data()
+        changes = {}
+        for sheet in SHEETS:
+            old = partition_fingerprints(previous[sheet])
+            new = partition_fingerprints(data[sheet])
+            changed = [month for month in set(old) | set(new) if old.get(month) != new.get(month)]
+            if changed:
+                changes[sheet] = sorted(changed)
+        return data, changes
+
+    def stream_sheet(self, excel_path, sheet, chunk_size=None):
+        """Yield a sheet as DataFrames of at most chunk_size rows"""
+        chunk_size = chunk_size or self.chunk_size
+        workbook = openpyxl.load_workbook(excel_path, read_only=True, data_only=True)
+        try:
+            rows = workbook[sheet].iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                return
+            while True:
+                chunk = [row for row in itertools.islice(rows, chunk_size)
+                         if any(value is not None for value in row)]
+                if not chunk:
+                    break
+                yield pd.DataFrame.from_records(chunk, columns=header)
+        finally:
+            workbook.close()
+
+    def _load_streaming(self, excel_path, sheet):
+        """Build a compact frame chunk by chunk, coding dimensions as they arrive"""
+        encoders = {}
+        parts = {}
+        columns = None
+
+        for chunk in self.stream_sheet(excel_path, sheet):
+            columns = chunk.columns.tolist()
+            for column in columns:
+                if column in DIMENSIONS:
+                    encoder = encoders.setdefault(column, _CategoryEncoder())
+                    values = encoder.encode(chunk[column].to_numpy())
+                else:
+                    values = pd.to_numeric(chunk[column]).to_numpy()
+                parts.setdefault(column, []).append(values)
+
+        if columns is None:
+            return pd.read_excel(excel_path, sheet_name=sheet)
+
+        frame = {}
+        for column in columns:
+            values = np.concatenate(parts.pop(column))
+            if column in encoders:
+                # Months sort chronologically as strings, so range filters keep working
+                values = encoders[column].to_categorical(values, ordered=column == 'month')
+            elif values.dtype.kind == 'f' and np.all(np.mod(values, 1) == 0):
+                # openpyxl hands back floats; match read_excel's integer columns
+                values = values.astype(np.int64)
+            frame[column] = values
+        return pd.DataFrame(frame)
+
+    def _compact(self, sheet, df):
+        if not self.compact or sheet not in STREAMED_SHEETS:
+            return df
+        return compact_ledger(df)
+
+    def _excel_path(self):
+        return os.path.join(self.fixtures_path, 'data.xlsx')
+
+    def _sheet_file_paths(self, sheet):
+        return [os.path.join(self.fixtures_path, f'{sheet}.{ext}') for ext in ['feather', 'csv']]
+
+    def _load_sheet_file(self, sheet):
+        """Read <sheet>.feather or <sheet>.csv, or None if there is neither"""
+        feather_path, csv_path = self._sheet_file_paths(sheet)
+        if os.path.exists(feather_path):
+            return feather.read_table(feather_path, memory_map=True).to_pandas()
+        if os.path.exists(csv_path):
+            return pd.read_csv(csv_path)
+        return None
+
+    def _workbook_hash(self, excel_path):
+        sha = hashlib.sha256()
+        with open(excel_path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                sha.update(block)
+        return sha.hexdigest()
+
+    def _manifest_path(self):
+        return os.path.join(self.cache_dir, 'manifest.json')
+
+    def _sheet_path(self, sheet):
+        return os.path.join(self.cache_dir, f'{sheet}.feather')
+
+    def _read_manifest(self):
+        try:
+            with open(self._manifest_path()) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_manifest(self, manifest):
+        tmp_path = self._manifest_path() + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, self._manifest_path())
+
+    def _valid_manifest(self, excel_path):
+        """The cache manifest if it was written for this workbook and these options, else None"""
+        manifest = self._read_manifest()
+        if manifest is None or manifest.get('streaming', False) != self.streaming:
+            return None
+        if manifest.get('compact', False) != self.compact:
+            return None
+
+        stat = os.stat(excel_path)
+        if manifest.get('mtime_ns') != stat.st_mtime_ns or manifest.get('size') != stat.st_size:
+            # mtime moved: only rebuild if the content actually changed
+            if manifest.get('sha256') != self._workbook_hash(excel_path):
+                return None
+            manifest['mtime_ns'] = stat.st_mtime_ns
+            manifest['size'] = stat.st_size
+            self._write_manifest(manifest)
+        return manifest
+
+    def _load_from_cache(self, excel_path, sheet):
+        """Return the cached sheet if it still matches the workbook, else None"""
+        manifest = self._valid_manifest(excel_path)
+        if manifest is None or sheet not in manifest.get('digests', {}):
+            return None
+        if not os.path.exists(self._sheet_path(sheet)):
+            return None
+        return feather.read_table(self._sheet_path(sheet), memory_map=True).to_pandas()
+
+    def _write_cache(self, excel_path, sheet, df):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        manifest = self._valid_manifest(excel_path)
+        if manifest is None:
+            # Drop the manifest first so a crash mid-write can't validate stale sheets
+            if os.path.exists(self._manifest_path()):
+                os.remove(self._manifest_path())
+            stat = os.stat(excel_path)
+            manifest = {
+                'sha256': self._workbook_hash(excel_path),
+                'mtime_ns': stat.st_mtime_ns,
+                'size': stat.st_size,
+                'streaming': self.streaming,
+                'compact': self.compact,
+                'digests': {}
+            }
+
+        # Write-then-rename so a concurrent reader never sees half a file
+        tmp_path = self._sheet_path(sheet) + '.tmp'
+        feather.write_feather(df, tmp_path)
+        os.replace(tmp_path, self._sheet_path(sheet))
+
+        # The digest lets LazyData.version skip parsing this sheet next time
+        manifest.setdefault('digests', {})[sheet] = sheet_digest(sheet, df)
+        self._write_manifest(manifest)
+
     def print_data_summary(self, data):
-        
+
         for name, df in data.items():
             print(f"\n{name.upper()}:")
             print(f"  Shape: {df.shape}")
             print(f"  Columns: {df.columns.tolist()}")
+            print(f"  Memory: {df.memory_usage(deep=True).sum() / 2**20:.1f} MB")
             if 'month' in df.columns:
-                print(f"  Date range: {df['month'].min()} to {df['month'].max()}")
\ No newline at end of file
+                print(f"  Date range: {df['month'].min()} to {df['month'].max()}")
@@ -0,0 +1,84 @@
+import numpy as np
+
+# Models forecast_series fits to every series at once
+MODELS = ['seasonal_naive', 'exp_smoothing', 'linear_trend']
+
+# 'auto' picks, per series, the model with the smallest holdout error
+FORECAST_METHODS = MODELS + ['auto']
+
+# Months in a seasonal cycle
+SEASON = 12
+
+# Smoothing factors exp_smoothing chooses between, per series
+ALPHAS = np.linspace(0.1, 0.9, 9)
+
+# Trailing months 'auto' holds back to score the models
+HOLDOUT_MONTHS = 6
+
+
+def _along_time(values, ndim):
+    """Shape a per-month vector to broadcast down the month axis of an ndim array"""
+    return values.reshape((-1,) + (1,) * (ndim - 1))
+
+
+def seasonal_naive(history, horizon, season=SEASON):
+    """Each future month repeats the same month of the last season (the last month if there is none)"""
+    if len(history) < season:
+        return np.repeat(history[-1:], horizon, axis=0)
+    return history[len(history) - season + np.arange(horizon) % season]
+
+
+def exp_smoothing(history, horizon, alphas=ALPHAS):
+    """
+    Simple exponential smoothing, forecasting flat at the final level. Every
+    series runs every alpha together, one month at a time, and keeps the
+    alpha with the smallest one-step-ahead squared error.
+    """
+    levels = np.repeat(history[:1], len(alphas), axis=0)
+    errors = np.zeros_like(levels)
+    alphas = _along_time(np.asarray(alphas, dtype=float), history.ndim)
+    for month in history[1:]:
+        residual = month - levels
+        errors += residual * residual
+        levels += alphas * residual
+    best = errors.argmin(axis=0)
+    level = np.take_along_axis(levels, best[None], axis=0)
+    return np.repeat(level, horizon, axis=0)
+
+
+def linear_trend(history, horizon):
+    """Least-squares line through each series, extended forward"""
+    t = np.arange(len(history), dtype=float)
+    centred = t - t.mean()
+    spread = (centred * centred).sum()
+    mean = history.mean(axis=0)
+    if spread > 0:
+        slope = np.tensordot(centred, history - mean, axes=1) / spread
+    else:
+        slope = np.zeros_like(mean)
+    future = np.arange(len(history), len(history) + horizon) - t.mean()
+    return mean + _along_time(future, history.ndim) * slope
+
+
+def forecast_series(history, horizon, method='auto', holdout=HOLDOUT_MONTHS):
+    """
+    Forecast `horizon` months of every series in `history` (months x any
+    series axes) with one model, or with 'auto' the model that best
+    predicted each series' last `holdout` months
+    """
+    if method not in FORECAST_METHODS:
+        raise ValueError(f"Unknown forecast method: {method}. Choose from {FORECAST_METHODS}")
+    history = np.asarray(history, dtype=float)
+    if len(history) == 0:
+        raise ValueError("Forecasting needs at least one month of history")
+    models = {'seasonal_naive': seasonal_naive, 'exp_smoothing': exp_smoothing, 'linear_trend': linear_trend}
+    if method != 'auto':
+        return models[method](history, horizon)
+    if len(history) <= holdout + 1:
+        return exp_smoothing(history, horizon)
+
+    train, test = history[:-holdout], history[-holdout:]
+    errors = np.stack([np.abs(models[m](train, holdout) - test).mean(axis=0) for m in MODELS])
+    forecasts = np.stack([models[m](history, horizon) for m in MODELS])
+    best = np.broadcast_to(errors.argmin(axis=0), (1, horizon) + history.shape[1:])
+    return np.take_along_axis(forecasts, best, axis=0)[0]
@@ -0,0 +1,87 @@
+import pandas as pd
+import numpy as np
+
+# Rates in the fx sheet are quoted against this currency
+BASE_CURRENCY = 'USD'
+
+
+class FXRates:
+    """
+    Dense (month, currency) -> rate_to_usd index built from the fx sheet.
+    Lookups are vectorized gathers; a missing rate falls back to the latest
+    earlier month for that currency ("as-of").
+    """
+
+    def __init__(self, fx):
+        self.months = np.array(sorted(fx['month'].unique()), dtype=object)
+        currencies = set(fx['currency'].unique()) | {BASE_CURRENCY}
+        self.currencies = sorted(currencies)
+        self.currency_index = {c: i for i, c in enumerate(self.currencies)}
+
+        self.rates = np.full((len(self.months), len(self.currencies)), np.nan)
+        month_pos = np.searchsorted(self.months, fx['month'].to_numpy(dtype=object))
+        currency_pos = np.array([self.currency_index[c] for c in fx['currency']], dtype=np.int64)
+        self.rates[month_pos, currency_pos] = fx['rate_to_usd'].to_numpy(dtype=float)
+        base = self.rates[:, self.currency_index[BASE_CURRENCY]]
+        base[np.isnan(base)] = 1.0
+
+        # Forward-fill each currency down the month axis for as-of lookups
+        self.asof_rates = pd.DataFrame(self.rates).ffill().to_numpy()
+
+        # A trailing NaN row/column absorbs -1 positions for unknown keys
+        self._tables = {}
+        for asof, table in [(False, self.rates), (True, self.asof_rates)]:
+            padded = np.full((len(self.months) + 1, len(self.currencies) + 1), np.nan)
+            padded[:-1, :-1] = table
+            self._tables[asof] = padded
+
+    def _month_positions(self, month_values, asof=True):
+        """Row of the rate table for each month (-1 where there is none)"""
+        month_values = np.asarray(month_values, dtype=object)
+        if asof:
+            return np.searchsorted(self.months, month_values, side='right') - 1
+        month_pos = np.searchsorted(self.months, month_values, side='left')
+        exact = (month_pos < len(self.months)) & (
+            self.months[np.minimum(month_pos, len(self.months) - 1)] == month_values)
+        return np.where(exact, month_pos, -1)
+
+    def rate_table(self, months, asof=True):
+        """
+        Rates for the given months (rows) and self.currencies (columns), with a
+        trailing NaN row and column so -1 codes gather NaN
+        """
+        month_pos = np.append(self._month_positions(months, asof), -1)
+        return self._tables[asof][month_pos]
+
+    def lookup(self, months, currencies, asof=True):
+        """Rate to USD for each (month, currency) pair, as a float array"""
+        month_codes, month_values = pd.factorize(np.asarray(months, dtype=object))
+        currency_codes, currency_values = pd.factorize(np.asarray(currencies, dtype=object))
+
+        # Resolve each distinct month/currency once, then gather per row
+        month_pos = self._month_positions(month_values, asof)
+        currency_pos = np.array(
+            [self.currency_index.get(c, -1) for c in currency_values], dtype=np.int64)
+
+        # factorize codes missing values as -1, so map that slot to -1 too
+        month_pos = np.append(month_pos, -1)
+        currency_pos = np.append(currency_pos, -1)
+
+        return self._tables[asof][month_pos[month_codes], currency_pos[currency_codes]]
+
+    def convert(self, amounts, months, currencies, asof=True):
+        """Convert local-currency amounts to USD, raising if any rate is unknown"""
+        rates = self.lookup(months, currencies, asof=asof)
+        missing = np.isnan(rates)
+        if missing.any():
+            pairs = sorted(set(zip(np.asarray(months, dtype=object)[missing],
+                                   np.asarray(currencies, dtype=object)[missing])))
+            raise ValueError(f"No FX rate for (month, currency): {pairs[:10]}")
+        return np.asarray(amounts, dtype=float) * rates, rates
+
+    def usd_to(self, currency, months, asof=True):
+        """Factors that turn USD amounts into `currency` for each month"""
+        if currency not in self.currency_index:
+            raise ValueError(f"Unknown currency: {currency}. Choose from {self.currencies}")
+        rates = self.lookup(months, [currency] * len(months), asof=asof)
+        return 1.0 / rates
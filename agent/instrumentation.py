@@ -0,0 +1,207 @@
+import functools
+import itertools
+import json
+import logging
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Prefix for exported Prometheus metric names
+METRIC_PREFIX = 'cfo_copilot_span'
+
+
+class Span:
+    """One timed call: wall time, rows it scanned and bytes it allocated"""
+
+    __slots__ = ('name', 'parent', 'seq', 'thread', 'started', 'seconds', 'rows', 'alloc_bytes', 'attrs')
+
+    def __init__(self, name, parent, rows=0):
+        self.name = name
+        self.parent = parent
+        self.seq = None
+        self.thread = threading.get_ident()
+        self.started = time.time()
+        self.seconds = 0.0
+        self.rows = rows
+        self.alloc_bytes = None
+        self.attrs = {}
+
+    def add_rows(self, rows):
+        self.rows += int(rows)
+
+    def as_dict(self):
+        record = {
+            'span': self.name,
+            'parent': self.parent,
+            'started': self.started,
+            'seconds': self.seconds,
+            'rows': self.rows,
+            'alloc_bytes': self.alloc_bytes
+        }
+        record.update(self.attrs)
+        return record
+
+
+class Tracer:
+    """
+    Records spans around the loader, FinanceTools, planner and PDF export.
+    Keeps per-span-name totals plus a bounded history of recent spans, which
+    can be exported as JSON log lines or Prometheus text.
+    """
+
+    def __init__(self, enabled=True, track_allocations=False, history=1000):
+        self.enabled = enabled
+        self.track_allocations = False
+        self._recent = deque(maxlen=history)
+        self._totals = {}
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.set_track_allocations(track_allocations)
+
+    def set_track_allocations(self, on):
+        """Turn allocation tracking on or off; tracemalloc slows everything while on"""
+        if on and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        elif not on and self.track_allocations and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self.track_allocations = on
+
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def current(self):
+        """Innermost open span on this thread, or None"""
+        stack = self._stack()
+        return stack[-1] if stack else None
+
+    @contextmanager
+    def span(self, name, rows=0):
+        if not self.enabled:
+            yield None
+            return
+
+        stack = self._stack()
+        span = Span(name, stack[-1].name if stack else None, rows)
+        tracing = self.track_allocations and tracemalloc.is_tracing()
+        before = tracemalloc.get_traced_memory()[0] if tracing else 0
+
+        stack.append(span)
+        start = time.perf_counter()
+        try:
+            yield span
+        finally:
+            span.seconds = time.perf_counter() - start
+            stack.pop()
+            if tracing:
+                span.alloc_bytes = tracemalloc.get_traced_memory()[0] - before
+            # Rows are inclusive, like wall time: a parent scanned what its children did
+            if stack:
+                stack[-1].rows += span.rows
+            self._record(span)
+
+    def _record(self, span):
+        with self._lock:
+            span.seq = next(self._seq)
+            self._recent.append(span)
+            totals = self._totals.setdefault(span.name, {
+                'calls': 0, 'seconds': 0.0, 'max_seconds': 0.0, 'rows': 0, 'alloc_bytes': 0
+            })
+            totals['calls'] += 1
+            totals['seconds'] += span.seconds
+            totals['max_seconds'] = max(totals['max_seconds'], span.seconds)
+            totals['rows'] += span.rows
+            totals['alloc_bytes'] += span.alloc_bytes or 0
+
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(json.dumps(span.as_dict(), default=str))
+
+    def mark(self):
+        """Position in the span history, for spans_since()"""
+        with self._lock:
+            return self._recent[-1].seq + 1 if self._recent else 0
+
+    def spans_since(self, mark, this_thread=True):
+        """Spans finished after `mark` (only this thread's by default), oldest first"""
+        thread = threading.get_ident()
+        with self._lock:
+            return [span for span in self._recent
+                    if span.seq >= mark and (not this_thread or span.thread == thread)]
+
+    def totals(self):
+        with self._lock:
+            return {name: dict(values) for name, values in self._totals.items()}
+
+    def reset(self):
+        with self._lock:
+            self._recent.clear()
+            self._totals.clear()
+
+    def log_records(self, spans=None):
+        """Recent spans as JSON-ready dicts"""
+        spans = self.spans_since(0, this_thread=False) if spans is None else spans
+        return [span.as_dict() for span in spans]
+
+    def write_jsonl(self, f, spans=None):
+        """Write recent spans to a file object, one JSON object per line"""
+        for record in self.log_records(spans):
+            f.write(json.dumps(record, default=str) + '\n')
+
+    def prometheus(self):
+        """Per-span totals in the Prometheus text exposition format"""
+        series = [
+            ('calls_total', 'counter', 'Number of calls', 'calls'),
+            ('seconds_total', 'counter', 'Wall time spent, in seconds', 'seconds'),
+            ('seconds_max', 'gauge', 'Slowest single call, in seconds', 'max_seconds'),
+            ('rows_total', 'counter', 'Ledger rows scanned', 'rows'),
+            ('alloc_bytes_total', 'counter', 'Net bytes allocated (when tracking allocations)', 'alloc_bytes'),
+        ]
+        totals = self.totals()
+        lines = []
+        for suffix, kind, help_text, field in series:
+            metric = f'{METRIC_PREFIX}_{suffix}'
+            lines.append(f'# HELP {metric} {help_text}')
+            lines.append(f'# TYPE {metric} {kind}')
+            for name in sorted(totals):
+                lines.append(f'{metric}{{span="{name}"}} {totals[name][field]}')
+        return '\n'.join(lines) + '\n'
+
+
+# Process-wide tracer used by the instrumented modules
+TRACER = Tracer()
+
+
+def span(name, rows=0):
+    return TRACER.span(name, rows)
+
+
+def add_rows(rows):
+    """Count rows against the innermost open span (no-op outside a span)"""
+    current = TRACER.current()
+    if current is not None:
+        current.add_rows(rows)
+
+
+def annotate(**attrs):
+    """Attach extra fields (e.g. cache hits) to the innermost open span"""
+    current = TRACER.current()
+    if current is not None:
+        current.attrs.update(attrs)
+
+
+def traced(name):
+    """Run the decorated function inside a span called `name`"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with TRACER.span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -1,18 +1,95 @@
 import matplotlib
 matplotlib.use('Agg')
+from matplotlib.figure import Figure
+from matplotlib.ticker import FuncFormatter
 from reportlab.lib.pagesizes import letter
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak, Image
 from reportlab.lib import colors
 from reportlab.lib.enums import TA_CENTER, TA_RIGHT
-import matplotlib.pyplot as plt
+from concurrent.futures import ProcessPoolExecutor
+import atexit
+import hashlib
 import io
+import json
+import multiprocessing
+import threading
 from datetime import datetime
 
+from agent.cache import ResultCache
+from agent.instrumentation import span, traced
+
+# Rendered PNG bytes keyed by a hash of the chart inputs, shared by all generators
+CHART_CACHE = ResultCache(maxsize=256)
+
+# Process pools by worker count, reused across reports so workers only start once
+_chart_pools = {}
+_chart_pool_lock = threading.Lock()
+
+
+def _get_chart_pool(workers):
+    """
+    Shared pool of `workers` chart processes. Workers are spawned rather
+    than forked, since the app and server host threads a fork would copy
+    mid-flight, and every pool is shut down when the interpreter exits.
+    """
+    with _chart_pool_lock:
+        pool = _chart_pools.get(workers)
+        if pool is None:
+            pool = _chart_pools[workers] = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+        return pool
+
+
+@atexit.register
+def _shutdown_chart_pools():
+    with _chart_pool_lock:
+        for pool in _chart_pools.values():
+            pool.shutdown(wait=False, cancel_futures=True)
+        _chart_pools.clear()
+
+
+def chart_key(kind, payload):
+    digest = hashlib.sha256(json.dumps([kind, payload], sort_keys=True).encode()).hexdigest()
+    return (digest,)
+
+
+@traced('pdf.render_chart')
+def render_chart(kind, payload):
+    """Render one chart to PNG bytes (runs in a worker process)"""
+    # Figure objects don't touch pyplot's global state, so workers stay independent
+    fig = Figure(figsize=(6, 4))
+    ax = fig.subplots()
+
+    if kind == 'revenue':
+        categories = ['Actual', 'Budget']
+        values = [payload['actual'], payload['budget']]
+        colors_list = ['#1f77b4', '#ff7f0e']
+
+        ax.bar(categories, values, color=colors_list)
+        ax.set_ylabel('USD', fontsize=12)
+        ax.set_title(f"Revenue vs Budget - {payload['month']}", fontsize=14, fontweight='bold')
+        ax.yaxis.set_major_formatter(FuncFormatter(lambda x, p: f'${x/1000:.0f}K'))
+    elif kind == 'opex':
+        ax.pie(payload['amounts'], labels=payload['categories'], autopct='%1.1f%%',
+               startangle=90, colors=['#ff7f0e', '#2ca02c', '#d62728', '#9467bd'])
+        ax.set_title('Operating Expenses Breakdown', fontsize=14, fontweight='bold')
+    else:
+        raise ValueError(f"Unknown chart kind: {kind}")
+
+    fig.tight_layout()
+
+    buf = io.BytesIO()
+    fig.savefig(buf, format='png', dpi=150, bbox_inches='tight')
+    return buf.getvalue()
+
+
 class PDFReportGenerator:
-    def __init__(self, tools):
+    def __init__(self, tools, chart_workers=2):
         self.tools = tools
+        # 0 renders charts in this process instead of the shared pool
+        self.chart_workers = chart_workers
         self.styles = getSampleStyleSheet()
         
         # Custom styles
@@ -34,8 +111,28 @@ class PDFReportGenerator:
             spaceBefore=12
         )
     
-    def generate_report(self, filename, month='2025-06'):
+    @traced('pdf.generate_report')
+    def generate_report(self, filename, month='2025-06', entity=None):
         """Generate a PDF report with key financial metrics"""
+        # Fetching the data up front so both charts can render together
+        revenue_data = self.tools.get_revenue_vs_budget(month, entity)
+        opex_data = self.tools.get_opex_breakdown(month, entity)
+        runway_data = self.tools.get_cash_runway()
+
+        return self.write_report(filename, month, revenue_data, opex_data, runway_data, entity)
+
+    def generate_report_bytes(self, month='2025-06', entity=None):
+        """Build the report entirely in memory and return the PDF bytes"""
+        buf = io.BytesIO()
+        self.generate_report(buf, month, entity)
+        return buf.getvalue()
+
+    @traced('pdf.write_report')
+    def write_report(self, filename, month, revenue_data, opex_data, runway_data, entity=None):
+        """
+        Lay out and write a report from already computed metrics.
+        `filename` may be a path or any writable binary file object.
+        """
         doc = SimpleDocTemplate(filename, pagesize=letter)
         story = []
         
@@ -45,11 +142,17 @@ class PDFReportGenerator:
         
         subtitle = Paragraph(f"Report Date: {datetime.now().strftime('%B %d, %Y')}", self.styles['Normal'])
         story.append(subtitle)
+        if entity is not None:
+            story.append(Paragraph(f"Entity: {entity} &nbsp;&nbsp; Period: {month}", self.styles['Normal']))
         story.append(Spacer(1, 0.3*inch))
         
+        charts = self._render_charts([
+            ('revenue', self._revenue_payload(revenue_data, month)),
+            ('opex', self._opex_payload(opex_data))
+        ])
+
         # Page 1: Revenue vs Budget
         story.append(Paragraph("Revenue Performance", self.heading_style))
-        revenue_data = self.tools.get_revenue_vs_budget(month)
         
         revenue_table_data = [
             ['Metric', 'Amount'],
@@ -75,16 +178,13 @@ class PDFReportGenerator:
         story.append(Spacer(1, 0.3*inch))
         
         # Add revenue chart
-        rev_chart = self._create_revenue_chart(revenue_data, month)
-        story.append(rev_chart)
+        story.append(self._chart_image(charts[0]))
         story.append(Spacer(1, 0.5*inch))
         
         # Page 2: Opex Breakdown
         story.append(PageBreak())
         story.append(Paragraph("Operating Expenses Breakdown", self.heading_style))
         
-        opex_data = self.tools.get_opex_breakdown(month)
-        
         opex_table_data = [['Category', 'Amount', '% of Total']]
         for _, row in opex_data.iterrows():
             opex_table_data.append([
@@ -117,14 +217,15 @@ class PDFReportGenerator:
         story.append(Spacer(1, 0.3*inch))
         
 
-        opex_chart = self._create_opex_chart(opex_data)
-        story.append(opex_chart)
+        story.append(self._chart_image(charts[1]))
         
         
         story.append(PageBreak())
         story.append(Paragraph("Cash Position & Runway", self.heading_style))
         
-        runway_data = self.tools.get_cash_runway()
+        if entity is not None:
+            # Cash is only tracked at the consolidated level
+            story.append(Paragraph("Consolidated group cash", self.styles['Normal']))
         
         cash_table_data = [
             ['Metric', 'Value'],
@@ -153,46 +254,48 @@ class PDFReportGenerator:
         story.append(cash_table)
         
         
-        doc.build(story)
+        with span('pdf.build'):
+            doc.build(story)
         return filename
     
-    def _create_revenue_chart(self, revenue_data, month):
-        """Create revenue vs budget bar chart"""
-        fig, ax = plt.subplots(figsize=(6, 4))
-        
-        categories = ['Actual', 'Budget']
-        values = [revenue_data['actual'], revenue_data['budget']]
-        colors_list = ['#1f77b4', '#ff7f0e']
-        
-        ax.bar(categories, values, color=colors_list)
-        ax.set_ylabel('USD', fontsize=12)
-        ax.set_title(f'Revenue vs Budget - {month}', fontsize=14, fontweight='bold')
-        ax.yaxis.set_major_formatter(plt.FuncFormatter(lambda x, p: f'${x/1000:.0f}K'))
-        
-        plt.tight_layout()
-        
-        
-        buf = io.BytesIO()
-        plt.savefig(buf, format='png', dpi=150, bbox_inches='tight')
-        buf.seek(0)
-        plt.close()
-        
-        return Image(buf, width=5*inch, height=3.3*inch)
-    
-    def _create_opex_chart(self, opex_data):
-        """Create opex breakdown pie chart"""
-        fig, ax = plt.subplots(figsize=(6, 4))
-        
-        ax.pie(opex_data['amount'], labels=opex_data['category'], autopct='%1.1f%%',
-               startangle=90, colors=['#ff7f0e', '#2ca02c', '#d62728', '#9467bd'])
-        ax.set_title('Operating Expenses Breakdown', fontsize=14, fontweight='bold')
-        
-        plt.tight_layout()
-        
-      
-        buf = io.BytesIO()
-        plt.savefig(buf, format='png', dpi=150, bbox_inches='tight')
-        buf.seek(0)
-        plt.close()
-        
-        return Image(buf, width=5*inch, height=3.3*inch)
\ No newline at end of file
+    def _revenue_payload(self, revenue_data, month):
+        return {
+            'actual': float(revenue_data['actual']),
+            'budget': float(revenue_data['budget']),
+            'month': month
+        }
+
+    def _opex_payload(self, opex_data):
+        return {
+            'categories': opex_data['category'].tolist(),
+            'amounts': [float(a) for a in opex_data['amount']]
+        }
+
+    @traced('pdf.render_charts')
+    def _render_charts(self, requests):
+        """
+        Render every (kind, payload) chart to PNG bytes, concurrently in the
+        chart pool. Cached charts are reused and new ones stored.
+        """
+        pool = _get_chart_pool(self.chart_workers) if self.chart_workers else None
+        keys = [chart_key(kind, payload) for kind, payload in requests]
+
+        pngs, pending = [], {}
+        for key, (kind, payload) in zip(keys, requests):
+            found, png = CHART_CACHE.get(key)
+            if not found and pool is not None:
+                pending[key] = pool.submit(render_chart, kind, payload)
+            elif not found:
+                png = render_chart(kind, payload)
+                CHART_CACHE.put(key, png)
+            pngs.append(png)
+
+        # Every chart was submitted before waiting on any, so they render together
+        for i, key in enumerate(keys):
+            if key in pending:
+                pngs[i] = pending[key].result()
+                CHART_CACHE.put(key, pngs[i])
+        return pngs
+
+    def _chart_image(self, png):
+        return Image(io.BytesIO(png), width=5*inch, height=3.3*inch)
@@ -0,0 +1,178 @@
+import argparse
+import itertools
+import json
+import sys
+
+import numpy as np
+import pandas as pd
+
+from agent.data_loader import FinanceDataLoader
+from agent.instrumentation import traced
+from agent.planner import QueryPlanner
+from agent.tools import FinanceTools
+
+# Month used when a question needs one but doesn't name it
+DEFAULT_MONTH = '2025-06'
+
+# Trailing months for a gross margin trend without "last N months"
+DEFAULT_TREND_MONTHS = 3
+
+# Trailing months of burn behind a cash runway without "last N months"
+DEFAULT_BURN_MONTHS = 3
+
+
+class QueryPipeline:
+    """
+    Parses questions and answers them with FinanceTools, computing each
+    distinct (intent, month, range) only once per batch
+    """
+
+    def __init__(self, tools, planner=None):
+        self.tools = tools
+        self.planner = planner or QueryPlanner()
+
+    def query_key(self, parsed):
+        """Normalize a parsed question to the arguments its tool actually uses"""
+        intent = parsed['intent']
+
+        if intent == 'revenue_vs_budget':
+            return (intent, parsed['month'], None)
+        if intent == 'gross_margin_trend':
+            if parsed['date_range'] and parsed['date_range'][0] == 'LAST_N_MONTHS':
+                return (intent, None, parsed['date_range'])
+            return (intent, None, ('LAST_N_MONTHS', DEFAULT_TREND_MONTHS))
+        if intent in ['opex_breakdown', 'ebitda']:
+            return (intent, parsed['month'] or DEFAULT_MONTH, None)
+        if intent == 'cash_runway':
+            if parsed['date_range'] and parsed['date_range'][0] == 'LAST_N_MONTHS':
+                return (intent, None, parsed['date_range'])
+            return (intent, None, ('LAST_N_MONTHS', DEFAULT_BURN_MONTHS))
+        return (intent, None, None)
+
+    @traced('pipeline.run')
+    def run(self, key):
+        """Call the tool for a query key; returns (result, error)"""
+        intent, month, date_range = key
+
+        if intent == 'revenue_vs_budget':
+            if not month:
+                return None, "Please specify a month (e.g., 'June 2025')"
+            return self.tools.get_revenue_vs_budget(month), None
+
+        if intent == 'gross_margin_trend':
+            num_months = date_range[1]
+            all_months = sorted(self.tools.actual_months(), reverse=True)
+            if num_months < 1:
+                return None, "The trend needs a window of at least 1 month"
+            if num_months > len(all_months):
+                return None, f"Only {len(all_months)} months of actuals are available"
+            return self.tools.get_gross_margin_trend(all_months[num_months - 1], all_months[0]), None
+
+        if intent == 'opex_breakdown':
+            return self.tools.get_opex_breakdown(month), None
+
+        if intent == 'ebitda':
+            return self.tools.get_ebitda(month), None
+
+        if intent == 'cash_runway':
+            if date_range[1] < 1:
+                return None, "Burn needs a window of at least 1 month"
+            return self.tools.get_cash_runway(date_range[1]), None
+
+        if intent == 'forecast_vs_budget':
+            return self.tools.get_forecast_vs_budget(), None
+
+        if intent == 'forecast_runway':
+            return self.tools.get_forecast_runway(), None
+
+        return None, "I don't understand that question"
+
+    def answer(self, question):
+        return self.answer_batch([question])[0]
+
+    @traced('pipeline.answer_batch')
+    def answer_batch(self, questions, results=None):
+        """
+        Answer many questions, sharing results between questions that resolve
+        to the same query. Answers for the same query share one result object.
+        """
+        results = {} if results is None else results
+        parsed_cache = {}
+        answers = []
+
+        for question in questions:
+            parsed = parsed_cache.get(question)
+            if parsed is None:
+                parsed = parsed_cache[question] = self.planner.parse_query(question)
+
+            key = self.query_key(parsed)
+            if key not in results:
+                try:
+                    results[key] = self.run(key)
+                except Exception as exc:
+                    # One failing query shouldn't take the rest of the batch down with it
+                    results[key] = (None, str(exc))
+            result, error = results[key]
+
+            answers.append({
+                'question': question,
+                'intent': parsed['intent'],
+                'month': key[1],
+                'date_range': key[2],
+                'result': result,
+                'error': error
+            })
+
+        return answers
+
+    def answer_stream(self, questions, chunk_size=1000):
+        """Lazily answer an iterable of questions, chunk by chunk"""
+        results = {}
+        questions = iter(questions)
+        while True:
+            chunk = list(itertools.islice(questions, chunk_size))
+            if not chunk:
+                return
+            yield from self.answer_batch(chunk, results)
+
+
+def to_serializable(value):
+    """Turn tool results (dicts, DataFrames, NumPy scalars) into JSON types"""
+    if isinstance(value, pd.DataFrame):
+        return [to_serializable(row) for row in value.to_dict(orient='records')]
+    if isinstance(value, dict):
+        return {k: to_serializable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_serializable(v) for v in value]
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and not np.isfinite(value):
+        return None if np.isnan(value) else str(value)
+    return value
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Answer a file of CFO questions (one per line)')
+    parser.add_argument('questions', help="questions file, or '-' for stdin")
+    parser.add_argument('--output', default='-', help="JSON lines output file, or '-' for stdout")
+    parser.add_argument('--fixtures', default='fixtures', help='directory containing data.xlsx')
+    args = parser.parse_args(argv)
+
+    # Sheets load as the questions first need them
+    pipeline = QueryPipeline(FinanceTools(FinanceDataLoader(args.fixtures, compact=True).load_lazy()))
+
+    source = sys.stdin if args.questions == '-' else open(args.questions)
+    sink = sys.stdout if args.output == '-' else open(args.output, 'w')
+    try:
+        questions = (line.strip() for line in source if line.strip())
+        for answer in pipeline.answer_stream(questions):
+            sink.write(json.dumps(to_serializable(answer)) + '\n')
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if sink is not sys.stdout:
+            sink.close()
+
+
+if __name__ == '__main__':
+    main()
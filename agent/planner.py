@@ -1,5 +1,26 @@
 import re
 
+from agent.instrumentation import traced
+
+# Month name to number mapping (full names are checked before abbreviations)
+MONTHS = {
+    'january': '01', 'jan': '01',
+    'february': '02', 'feb': '02',
+    'march': '03', 'mar': '03',
+    'april': '04', 'apr': '04',
+    'may': '05',
+    'june': '06', 'jun': '06',
+    'july': '07', 'jul': '07',
+    'august': '08', 'aug': '08',
+    'september': '09', 'sep': '09',
+    'october': '10', 'oct': '10',
+    'november': '11', 'nov': '11',
+    'december': '12', 'dec': '12'
+}
+
+# Priority of each month name when several appear in one question
+MONTH_PRIORITY = {name: i for i, name in enumerate(MONTHS)}
+
 class QueryPlanner:
     """
     Classifies user questions and extracts parameters
@@ -7,6 +28,18 @@ class QueryPlanner:
     
     def __init__(self):
         self.intent_patterns = {
+            # Forecast intents come first so "forecast vs budget" isn't read as actuals
+            'forecast_runway': [
+                r'(forecast|projected|projection|outlook).*(runway|cash)',
+                r'(runway|cash).*(forecast|projected|projection|outlook)'
+            ],
+            'forecast_vs_budget': [
+                r'forecast',
+                r'landing (for )?(this |the )?(year|fy)',
+                r'where will we land',
+                r'projection',
+                r'outlook'
+            ],
             'revenue_vs_budget': [
                 r'revenue.*budget',
                 r'budget.*revenue',
@@ -40,79 +73,76 @@ class QueryPlanner:
                 r'cash.*last'
             ]
         }
-    
+        self._compile()
+
+    def _compile(self):
+        """Precompile the intent patterns and the month/range scanner"""
+        # One lookahead branch per intent, tried in order at the start of the
+        # question, so the first intent with any matching pattern wins
+        self._intent_regex = re.compile('|'.join(
+            rf'(?=[\s\S]*?(?:{"|".join(f"(?:{p})" for p in patterns)}))(?P<{intent}>)'
+            for intent, patterns in self.intent_patterns.items()
+        ))
+
+        # Month names, YYYY-MM and "last N months" in a single alternation
+        self._scan_regex = re.compile(
+            rf'(?P<name>{"|".join(MONTHS)})\s+(?P<year>\d{{4}})'
+            r'|(?P<iso>\d{4}-\d{2})'
+            # Lookahead so the month word can't swallow a following month name
+            r'|last\s+(?P<last_n>\d+)(?=\s+months?)'
+        )
+
     def classify_intent(self, question):
-       
-        question_lower = question.lower()
-        
-        for intent, patterns in self.intent_patterns.items():
-            for pattern in patterns:
-                if re.search(pattern, question_lower):
-                    return intent
-        
+
+        match = self._intent_regex.match(question.lower())
+        if match:
+            return match.lastgroup
+
         return 'unknown'
+
+    def _scan(self, question):
+        """Extract (month, date_range) from one pass over the question"""
+        best_name = None
+        iso = None
+        date_range = None
+
+        for match in self._scan_regex.finditer(question.lower()):
+            name = match.group('name')
+            if name is not None:
+                # Earlier names in MONTHS take precedence, first occurrence each
+                if best_name is None or MONTH_PRIORITY[name] < MONTH_PRIORITY[best_name[0]]:
+                    best_name = (name, match.group('year'))
+            elif match.group('iso') is not None:
+                iso = iso or match.group('iso')
+            elif date_range is None:
+                date_range = ('LAST_N_MONTHS', int(match.group('last_n')))
+
+        if best_name is not None:
+            month = f'{best_name[1]}-{MONTHS[best_name[0]]}'
+        else:
+            month = iso
+
+        return month, date_range
     
     def extract_month(self, question):
         """
         Extracting month from question (e.g., 'June 2025' -> '2025-06')
         """
-        # Month name to number mapping
-        months = {
-            'january': '01', 'jan': '01',
-            'february': '02', 'feb': '02',
-            'march': '03', 'mar': '03',
-            'april': '04', 'apr': '04',
-            'may': '05',
-            'june': '06', 'jun': '06',
-            'july': '07', 'jul': '07',
-            'august': '08', 'aug': '08',
-            'september': '09', 'sep': '09',
-            'october': '10', 'oct': '10',
-            'november': '11', 'nov': '11',
-            'december': '12', 'dec': '12'
-        }
-        
-        question_lower = question.lower()
-        
-       # "Month YYYY" pattern
-        for month_name, month_num in months.items():
-            pattern = rf'{month_name}\s+(\d{{4}})'
-            match = re.search(pattern, question_lower)
-            if match:
-                year = match.group(1)
-                return f'{year}-{month_num}'
-        
-        #  YYYY-MM pattern
-        match = re.search(r'(\d{4})-(\d{2})', question)
-        if match:
-            return match.group(0)
-        
-        return None
-    
+        return self._scan(question)[0]
+
     def extract_date_range(self, question):
-        
-        question_lower = question.lower()
-        
-     
-        match = re.search(r'last\s+(\d+)\s+months?', question_lower)
-        if match:
-            num_months = int(match.group(1))
-          
-            return ('LAST_N_MONTHS', num_months)
-        
-   
-        
-        return None
-    
+
+        return self._scan(question)[1]
+
+    @traced('planner.parse_query')
     def parse_query(self, question):
-      
+
         intent = self.classify_intent(question)
-        month = self.extract_month(question)
-        date_range = self.extract_date_range(question)
-        
+        month, date_range = self._scan(question)
+
         return {
             'intent': intent,
             'month': month,
             'date_range': date_range,
             'original_question': question
-        }
\ No newline at end of file
+        }
@@ -0,0 +1,143 @@
+import numpy as np
+import pandas as pd
+
+# Drivers the runway simulation shocks
+DRIVERS = ['revenue', 'cogs', 'opex', 'fx']
+
+# Runway percentiles reported by default
+PERCENTILES = [5, 25, 50, 75, 95]
+
+# Revenue adds to cash, COGS and opex take from it
+SIGNS = np.array([1.0, -1.0, -1.0])
+
+
+def month_ordinal(month):
+    """'YYYY-MM' as a count of months, so month arithmetic is integer arithmetic"""
+    return int(month[:4]) * 12 + int(month[5:7]) - 1
+
+
+def month_label(ordinal):
+    return f'{ordinal // 12:04d}-{ordinal % 12 + 1:02d}'
+
+
+class RunwaySimulator:
+    """
+    Monte Carlo cash runway. Revenue, COGS and opex follow correlated
+    log-normal random walks calibrated on monthly actuals, and the
+    foreign-currency share of each moves with a single FX factor. Every path
+    is simulated at once as (months x paths) arrays.
+    """
+
+    def __init__(self, history, base, cash, cash_month, foreign_share=None, fx_volatility=0.0):
+        """
+        history: months x (revenue, cogs, opex) actuals, oldest first
+        base: starting monthly (revenue, cogs, opex)
+        cash / cash_month: latest cash balance and the month it was reported
+        """
+        history = np.asarray(history, dtype=float).reshape(-1, 3)
+        self.base = np.asarray(base, dtype=float)
+        self.cash = float(cash)
+        self.cash_ordinal = month_ordinal(cash_month)
+        self.foreign_share = np.zeros(3) if foreign_share is None else np.asarray(foreign_share, dtype=float)
+        self.fx_volatility = float(fx_volatility)
+
+        # Month-on-month log changes; months where a driver isn't positive are skipped
+        with np.errstate(divide='ignore', invalid='ignore'):
+            changes = np.diff(np.log(history), axis=0)
+        changes = changes[np.isfinite(changes).all(axis=1)]
+        if len(changes) >= 2:
+            self.drift = changes.mean(axis=0)
+            covariance = np.cov(changes, rowvar=False)
+        else:
+            self.drift = np.zeros(3)
+            covariance = np.zeros((3, 3))
+
+        # Square root of the covariance; eigh copes when it is singular
+        values, vectors = np.linalg.eigh(covariance)
+        self.mixing = vectors * np.sqrt(np.clip(values, 0, None))
+
+    def simulate(self, paths=10000, horizon=24, by=None, shock=0.1, vol_scale=1.0, trend=False,
+                 percentiles=PERCENTILES, seed=0):
+        """
+        Runway percentiles, the probability of running out of cash by month
+        `by` (default: end of the horizon) and, for each driver, the same
+        figures with that driver moved by -shock and +shock
+        """
+        if paths < 1 or horizon < 1:
+            raise ValueError("paths and horizon must be at least 1")
+        months = [month_label(self.cash_ordinal + i) for i in range(1, horizon + 1)]
+        by = months[-1] if by is None else by
+        by_index = month_ordinal(by) - self.cash_ordinal
+        if not 1 <= by_index <= horizon:
+            raise ValueError(f"by must fall between {months[0]} and {months[-1]}")
+
+        # Correlated log steps per driver and an independent FX factor, laid out
+        # driver x month x path so the walks accumulate one month row at a time
+        rng = np.random.default_rng(seed)
+        z = rng.standard_normal((4, horizon, paths))
+        steps = (self.mixing * vol_scale) @ z[:3].reshape(3, -1)
+        steps = steps.reshape(3, horizon, paths)
+        if trend:
+            steps += self.drift[:, None, None]
+        levels = np.exp(np.cumsum(steps, axis=1, out=steps), out=steps) * self.base[:, None, None]
+        fx = np.exp(np.cumsum(z[3] * (self.fx_volatility * vol_scale), axis=0))
+        del z, steps
+
+        # Each driver's signed cumulative cash contribution, plus the part FX moves;
+        # cumsum is linear, so a shocked scenario is the base path plus one scaled term
+        share = self.foreign_share[:, None, None]
+        foreign = levels * share * fx
+        contributions = np.empty((4, horizon, paths))
+        contributions[:3] = (levels * (1 - share) + foreign) * SIGNS[:, None, None]
+        contributions[3] = (SIGNS @ foreign.reshape(3, -1)).reshape(horizon, paths)
+        del levels, foreign
+        np.cumsum(contributions, axis=1, out=contributions)
+        base_cash = self.cash + contributions[:3].sum(axis=0)
+
+        def outcome(driver=None, move=0.0):
+            cash = base_cash if driver is None else base_cash + move * contributions[driver]
+            return self._runway(cash), cash[-1]
+
+        runway, ending_cash = outcome()
+        out_by = np.searchsorted(np.sort(runway), np.arange(1, horizon + 1), side='left') / paths
+
+        rows = []
+        for i, driver in enumerate(DRIVERS):
+            for move in [-shock, shock]:
+                shocked, shocked_cash = outcome(i, move)
+                rows.append({
+                    'driver': driver,
+                    'shock': move,
+                    'runway_p50': self._percentiles(shocked, [50])['p50'],
+                    'prob_out_of_cash': float(np.mean(shocked < by_index)),
+                    'ending_cash_p50': float(np.median(shocked_cash))
+                })
+
+        return {
+            'paths': paths,
+            'horizon_months': horizon,
+            'current_cash': self.cash,
+            'runway_months': self._percentiles(runway, percentiles),
+            'by': by,
+            'prob_out_of_cash': float(out_by[by_index - 1]),
+            'ending_cash': self._percentiles(ending_cash, percentiles),
+            'out_of_cash_curve': pd.DataFrame({'month': months, 'probability': out_by}),
+            'sensitivity': pd.DataFrame(rows)
+        }
+
+    def _runway(self, cash):
+        """Fractional months until each path's cash first goes negative (inf if it never does)"""
+        negative = cash < 0
+        first = negative.argmax(axis=0)
+        columns = np.arange(cash.shape[1])
+        before = np.where(first > 0, cash[np.maximum(first - 1, 0), columns], self.cash)
+        after = cash[first, columns]
+        # Cash falls linearly through the month it runs out in
+        with np.errstate(divide='ignore', invalid='ignore'):
+            runway = first + np.clip(before / (before - after), 0, 1)
+        return np.where(negative.any(axis=0), runway, np.inf)
+
+    def _percentiles(self, values, percentiles):
+        # inverted_cdf picks observed values, so paths that never run out report inf
+        results = np.percentile(values, percentiles, method='inverted_cdf')
+        return {f'p{p}': float(v) for p, v in zip(percentiles, results)}
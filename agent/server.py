@@ -0,0 +1,218 @@
+import argparse
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+from agent.data_loader import FinanceDataLoader
+from agent.instrumentation import TRACER
+from agent.pipeline import QueryPipeline, to_serializable
+from agent.tools import FinanceTools
+
+# Seconds a request may take before it is answered with 504
+DEFAULT_TIMEOUT = 5.0
+
+# Largest request body and batch accepted
+MAX_BODY_BYTES = 1 << 20
+MAX_BATCH = 10000
+
+
+class _HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class FinanceService:
+    """
+    Headless HTTP/JSON front end for the query pipeline. FinanceTools and the
+    planner stay warm for the life of the process; tool calls run on a thread
+    pool so the event loop keeps accepting requests while they compute.
+
+        GET  /health    data version and status
+        GET  /metrics   instrumentation totals (Prometheus text)
+        POST /query     {"question": "...", "timeout": 2}
+        POST /batch     {"questions": ["...", ...], "timeout": 10}
+    """
+
+    def __init__(self, tools, planner=None, timeout=DEFAULT_TIMEOUT, workers=None):
+        self.tools = tools
+        self.pipeline = QueryPipeline(tools, planner)
+        self.timeout = timeout
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='finance-service')
+        self.routes = {
+            ('GET', '/health'): self.health,
+            ('GET', '/metrics'): self.metrics,
+            ('POST', '/query'): self.query,
+            ('POST', '/batch'): self.batch
+        }
+
+    async def handle(self, method, target, body=b''):
+        """Route one request; returns (status, content type, body bytes)"""
+        url = urlsplit(target)
+        route = self.routes.get((method, url.path))
+        try:
+            if route is None:
+                if any(path == url.path for _, path in self.routes):
+                    raise _HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, f"{method} not allowed on {url.path}")
+                raise _HTTPError(HTTPStatus.NOT_FOUND, f"No such endpoint: {url.path}")
+
+            payload = {}
+            if method == 'POST':
+                try:
+                    payload = json.loads(body or b'{}')
+                except ValueError:
+                    raise _HTTPError(HTTPStatus.BAD_REQUEST, 'Request body must be JSON')
+                if not isinstance(payload, dict):
+                    raise _HTTPError(HTTPStatus.BAD_REQUEST, 'Request body must be a JSON object')
+            for name, values in parse_qs(url.query).items():
+                payload.setdefault(name, values[-1])
+
+            result = await route(payload)
+        except _HTTPError as exc:
+            return self._json(exc.status, {'error': exc.message})
+        except Exception as exc:
+            # Anything else a route raises still gets a response instead of a dropped connection
+            return self._json(HTTPStatus.INTERNAL_SERVER_ERROR, {'error': str(exc) or type(exc).__name__})
+
+        if isinstance(result, str):
+            return HTTPStatus.OK, 'text/plain; version=0.0.4', result.encode()
+        return self._json(HTTPStatus.OK, result)
+
+    def _json(self, status, payload):
+        return status, 'application/json', json.dumps(to_serializable(payload)).encode()
+
+    def _timeout(self, payload):
+        """Per-request timeout, never longer than the service's own"""
+        try:
+            requested = float(payload.get('timeout', self.timeout))
+        except (TypeError, ValueError):
+            raise _HTTPError(HTTPStatus.BAD_REQUEST, 'timeout must be a number of seconds')
+        if requested <= 0:
+            raise _HTTPError(HTTPStatus.BAD_REQUEST, 'timeout must be positive')
+        return min(requested, self.timeout)
+
+    async def _run(self, timeout, fn, *args):
+        """Run blocking work on the pool, giving up after `timeout` seconds"""
+        loop = asyncio.get_running_loop()
+        try:
+            return await asyncio.wait_for(loop.run_in_executor(self.executor, fn, *args), timeout)
+        except asyncio.TimeoutError:
+            # The worker thread finishes in the background; its result lands in the cache
+            raise _HTTPError(HTTPStatus.GATEWAY_TIMEOUT, f"Timed out after {timeout:g}s")
+
+    async def health(self, payload):
+        return {'status': 'ok', 'data_version': self.tools.data_version}
+
+    async def metrics(self, payload):
+        return TRACER.prometheus()
+
+    async def query(self, payload):
+        question = payload.get('question')
+        if not isinstance(question, str) or not question.strip():
+            raise _HTTPError(HTTPStatus.BAD_REQUEST, "Expected {\"question\": \"...\"}")
+        return await self._run(self._timeout(payload), self.pipeline.answer, question)
+
+    async def batch(self, payload):
+        questions = payload.get('questions')
+        if not isinstance(questions, list) or not all(isinstance(q, str) for q in questions):
+            raise _HTTPError(HTTPStatus.BAD_REQUEST, "Expected {\"questions\": [\"...\", ...]}")
+        if len(questions) > MAX_BATCH:
+            raise _HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, f"At most {MAX_BATCH} questions per batch")
+        answers = await self._run(self._timeout(payload), self.pipeline.answer_batch, questions)
+        return {'answers': answers}
+
+    async def handle_connection(self, reader, writer):
+        """Serve HTTP/1.1 requests on one connection, keeping it alive when asked"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                try:
+                    method, target, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    await self._respond(writer, *self._json(HTTPStatus.BAD_REQUEST, {'error': 'Bad request line'}),
+                                        keep_alive=False)
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                try:
+                    length = int(headers.get('content-length') or 0)
+                except ValueError:
+                    length = -1
+                if length < 0 or length > MAX_BODY_BYTES:
+                    status = HTTPStatus.BAD_REQUEST if length < 0 else HTTPStatus.REQUEST_ENTITY_TOO_LARGE
+                    await self._respond(writer, *self._json(status, {'error': 'Bad or oversized body'}),
+                                        keep_alive=False)
+                    break
+
+                body = await reader.readexactly(length) if length else b''
+                await self._respond(writer, *await self.handle(method.upper(), target, body),
+                                    keep_alive=keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, writer, status, content_type, body, keep_alive=True):
+        status = HTTPStatus(status)
+        head = (
+            f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        writer.write(head.encode('latin-1') + body)
+        await writer.drain()
+
+    async def start(self, host='127.0.0.1', port=8080):
+        """Start listening; returns the asyncio server"""
+        return await asyncio.start_server(self.handle_connection, host, port)
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+
+
+async def _serve(service, host, port):
+    server = await service.start(host, port)
+    address = server.sockets[0].getsockname()
+    print(f"Serving on http://{address[0]}:{address[1]}", flush=True)
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve CFO Copilot answers over HTTP/JSON')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--fixtures', default='fixtures', help='directory containing data.xlsx')
+    parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT, help='per-request timeout in seconds')
+    parser.add_argument('--workers', type=int, help='threads running tool calls (default: Python default)')
+    args = parser.parse_args(argv)
+
+    # Everything is loaded up front so concurrent requests never extend the cube mid-read
+    tools = FinanceTools(FinanceDataLoader(args.fixtures, compact=True).load_lazy()).preload()
+    service = FinanceService(tools, timeout=args.timeout, workers=args.workers)
+    try:
+        asyncio.run(_serve(service, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,187 @@
+"""
+Deterministic synthetic ledgers with the fixture schema, for load testing.
+
+    python -m agent.synthetic fixtures_big --entities 300 --currencies 24 --months 360 --format feather
+
+writes actuals/budget/cash/fx that FinanceDataLoader(fixtures_big) can load.
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow.feather as feather
+from openpyxl import Workbook
+
+from agent.data_loader import SHEETS
+
+# Top-level account categories, as in the fixture
+CATEGORIES = ['Revenue', 'COGS', 'Opex:Marketing', 'Opex:Sales', 'Opex:R&D', 'Opex:Admin']
+
+# Reporting currency first; the rest are assigned to entities round-robin
+CURRENCIES = [
+    'USD', 'EUR', 'GBP', 'JPY', 'CHF', 'CAD', 'AUD', 'NZD', 'SEK', 'NOK', 'DKK', 'PLN',
+    'CZK', 'HUF', 'SGD', 'HKD', 'CNY', 'INR', 'KRW', 'BRL', 'MXN', 'ZAR', 'ILS', 'AED',
+    'SAR', 'TRY', 'THB', 'MYR', 'IDR', 'PHP', 'CLP', 'COP'
+]
+
+# Share of revenue each category typically runs at
+CATEGORY_SHARE = {
+    'Revenue': 1.0, 'COGS': 0.15, 'Opex:Marketing': 0.15,
+    'Opex:Sales': 0.10, 'Opex:R&D': 0.07, 'Opex:Admin': 0.05
+}
+
+# Excel's hard row limit per sheet
+XLSX_MAX_ROWS = 1048576
+
+
+def account_categories(sub_accounts=0):
+    """Category names, splitting each Opex line into sub-accounts if asked"""
+    if sub_accounts <= 0:
+        return list(CATEGORIES)
+    names = []
+    for category in CATEGORIES:
+        if category.startswith('Opex:'):
+            names += [f'{category}:{i + 1:02d}' for i in range(sub_accounts)]
+        else:
+            names.append(category)
+    return names
+
+
+def generate_ledger(entities=2, currencies=2, months=36, start_month='2023-01', sub_accounts=0,
+                    actuals_months=None, seed=0, compact=True):
+    """
+    Build actuals, budget, cash and fx frames.
+    Rows = months x entities x categories for budget; actuals stop after
+    `actuals_months` (all months by default). compact=True stores dimensions
+    as categoricals, otherwise as plain strings like pd.read_excel does.
+    """
+    rng = np.random.default_rng(seed)
+    month_names = pd.period_range(start_month, periods=months, freq='M').strftime('%Y-%m').tolist()
+    entity_names = ['ParentCo'] + [f'Entity{i:04d}' for i in range(1, entities)]
+    currency_names = CURRENCIES[:max(1, min(currencies, len(CURRENCIES)))]
+    categories = account_categories(sub_accounts)
+    entity_currency = np.arange(entities) % len(currency_names)
+
+    # FX: a gentle random walk per currency, USD pinned at 1
+    steps = rng.normal(0, 0.01, size=(months, len(currency_names)))
+    levels = rng.uniform(0.005, 1.5, size=len(currency_names))
+    rates = levels * np.exp(np.cumsum(steps, axis=0))
+    rates[:, 0] = 1.0
+
+    # Revenue per entity in local currency, with trend and seasonality
+    base = rng.uniform(5e4, 1e6, size=entities) / rates[0, entity_currency]
+    trend = 1 + rng.normal(0.005, 0.003, size=entities)[None, :] * np.arange(months)[:, None]
+    season = 1 + 0.08 * np.sin(2 * np.pi * (np.arange(months) % 12) / 12)[:, None]
+    revenue = base[None, :] * trend * season
+
+    shares = np.array([CATEGORY_SHARE[':'.join(c.split(':')[:2])] for c in categories])
+    per_category = np.array([max(1, sub_accounts) if c.startswith('Opex:') else 1 for c in categories])
+    shares = shares / per_category
+
+    # month x entity x category amounts
+    budget = revenue[:, :, None] * shares[None, None, :]
+    noise = rng.normal(1.0, 0.04, size=budget.shape)
+    actual = budget * noise
+
+    def ledger(amounts, n_months):
+        m, e, c = np.meshgrid(np.arange(n_months), np.arange(entities), np.arange(len(categories)),
+                              indexing='ij')
+        frame = {
+            'month': pd.Categorical.from_codes(m.ravel(), month_names, ordered=True),
+            'entity': pd.Categorical.from_codes(e.ravel(), entity_names),
+            'account_category': pd.Categorical.from_codes(c.ravel(), categories),
+            'amount': np.round(amounts[:n_months].ravel()).astype(np.int64),
+            'currency': pd.Categorical.from_codes(entity_currency[e.ravel()], currency_names)
+        }
+        return pd.DataFrame(frame)
+
+    actuals_months = months if actuals_months is None else min(actuals_months, months)
+    data = {
+        'actuals': ledger(actual, actuals_months),
+        'budget': ledger(budget, months)
+    }
+
+    # Cash: opening balance plus most of each month's consolidated EBITDA in USD
+    signs = np.array([1.0 if c == 'Revenue' else -1.0 for c in categories])
+    ebitda_usd = ((actual * signs).sum(axis=2) * rates[:, entity_currency]).sum(axis=1)
+    cash = 6 * revenue[0].sum() + np.cumsum(0.8 * ebitda_usd)
+    data['cash'] = pd.DataFrame({
+        'month': month_names[:actuals_months],
+        'entity': 'Consolidated',
+        'cash_usd': np.round(cash[:actuals_months]).astype(np.int64)
+    })
+
+    data['fx'] = pd.DataFrame({
+        'month': np.repeat(month_names, len(currency_names)),
+        'currency': np.tile(currency_names, months),
+        'rate_to_usd': np.round(rates.ravel(), 6)
+    })
+
+    if not compact:
+        for df in data.values():
+            for column in df.columns:
+                if str(df[column].dtype) == 'category':
+                    df[column] = df[column].astype(object)
+    return data
+
+
+def write_xlsx(data, path):
+    """Stream sheets into a workbook with openpyxl's write-only mode"""
+    for sheet in SHEETS:
+        if len(data[sheet]) + 1 > XLSX_MAX_ROWS:
+            raise ValueError(f"{sheet} has {len(data[sheet])} rows; xlsx sheets hold at most "
+                             f"{XLSX_MAX_ROWS - 1}. Use csv or feather output instead")
+
+    workbook = Workbook(write_only=True)
+    for sheet in SHEETS:
+        df = data[sheet]
+        worksheet = workbook.create_sheet(sheet)
+        worksheet.append(df.columns.tolist())
+        columns = [df[c].astype(object).tolist() if str(df[c].dtype) == 'category' else df[c].tolist()
+                   for c in df.columns]
+        for row in zip(*columns):
+            worksheet.append(row)
+    workbook.save(path)
+
+
+def write_dataset(data, output_dir, fmt='xlsx'):
+    """Write sheets as data.xlsx, or one <sheet>.csv / <sheet>.feather file each"""
+    os.makedirs(output_dir, exist_ok=True)
+    if fmt == 'xlsx':
+        write_xlsx(data, os.path.join(output_dir, 'data.xlsx'))
+    elif fmt == 'csv':
+        for sheet in SHEETS:
+            data[sheet].to_csv(os.path.join(output_dir, f'{sheet}.csv'), index=False)
+    elif fmt == 'feather':
+        for sheet in SHEETS:
+            feather.write_feather(data[sheet], os.path.join(output_dir, f'{sheet}.feather'))
+    else:
+        raise ValueError(f"Unknown format: {fmt}. Choose from xlsx, csv, feather")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Generate a synthetic CFO Copilot dataset')
+    parser.add_argument('output_dir')
+    parser.add_argument('--entities', type=int, default=100)
+    parser.add_argument('--currencies', type=int, default=12)
+    parser.add_argument('--months', type=int, default=120)
+    parser.add_argument('--start-month', default='2016-01')
+    parser.add_argument('--sub-accounts', type=int, default=0, help='sub-accounts per Opex category')
+    parser.add_argument('--actuals-months', type=int, help='months of actuals (default: all)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--format', choices=['xlsx', 'csv', 'feather'], default='feather')
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    data = generate_ledger(args.entities, args.currencies, args.months, args.start_month,
+                           args.sub_accounts, args.actuals_months, args.seed)
+    write_dataset(data, args.output_dir, args.format)
+    rows = len(data['actuals']) + len(data['budget'])
+    print(f"Wrote {rows:,} ledger rows to {args.output_dir} ({args.format}) "
+          f"in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,136 +1,1054 @@
 import pandas as pd
+import numpy as np
+import bisect
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from agent.anomalies import METHODS, budget_misses, rolling_mad_scores, rolling_zscores
+from agent.cache import ResultCache, memoized
+from agent.data_loader import compact_ledger, data_version
+from agent.forecasting import forecast_series
+from agent.fx import FXRates, BASE_CURRENCY
+from agent.instrumentation import add_rows, span, traced
+from agent.scenarios import RunwaySimulator, month_label, month_ordinal
+from agent.variance import VarianceIndex, metric_weights
+
+# Scenario axis of the aggregated cube
+SCENARIOS = ['actual', 'budget']
+
+# Ledger sheet behind each scenario
+SCENARIO_SHEETS = {'actual': 'actuals', 'budget': 'budget'}
+
+# Window kinds get_window_metrics understands
+WINDOWS = ['trailing', 'ytd', 'qtd']
+
+# Columns get_metrics can compute
+METRICS = [
+    'revenue', 'budget_revenue', 'revenue_variance', 'revenue_variance_pct',
+    'cogs', 'opex', 'gross_margin_pct', 'ebitda', 'ebitda_margin_pct'
+]
+
+# Months forecast when the actuals already reach the end of the budget
+DEFAULT_FORECAST_MONTHS = 12
+
+# Metrics that read the budget scenario
+BUDGET_METRICS = {'budget_revenue', 'revenue_variance', 'revenue_variance_pct'}
+
+
+def _codes(values, categories):
+    """Positions of values in a sorted axis (-1 where absent) as int64"""
+    return pd.Categorical(values, categories=categories).codes.astype(np.int64)
+
 
 class FinanceTools:
-    def __init__(self, data):
+    @traced('tools.init')
+    def __init__(self, data, reporting_currency=BASE_CURRENCY, result_cache=None, workers=1):
       
-        self.actuals = data['actuals']
-        self.budget = data['budget']
-        self.cash = data['cash']
-        self.fx = data['fx']
-        
-        # Converting everything to USD
-        self.actuals_usd = self._convert_to_usd(self.actuals)
-        self.budget_usd = self._convert_to_usd(self.budget)
-    
+        # Threads used to aggregate the ledger into the cube (results don't depend on it)
+        self.workers = workers
+        # Pass a shared ResultCache to reuse answers across instances, or False to disable
+        if result_cache is None:
+            result_cache = ResultCache()
+        elif result_cache is False:
+            result_cache = None
+        self.result_cache = result_cache
+        # A LazyData reads sheets on first access; a plain dict is already in memory
+        self.data = data
+        self._data_version = None
+
+        # Compact ledgers and the FX index are made on first access
+        self._ledgers = {}
+        self._fx_rates = None
+        self._variance = None
+        self._forecasts = {}
+        # Scenarios aggregated into the cube so far; budget joins when first needed
+        self._scenarios = set()
+        self._lock = threading.Lock()
+        self.months, self.entities, self.categories = [], [], []
+        self.cube_usd = np.zeros((0, 0, 0, len(SCENARIOS)))
+        # Row counts tell "no rows" apart from "rows summing to zero"
+        self.cube_counts = np.zeros((0, 0, 0, len(SCENARIOS)), dtype=np.int32)
+
+        # Every answer reads actuals, so they are aggregated straight away
+        self.reporting_currency = reporting_currency
+        self._require('actual')
+
+    def set_reporting_currency(self, currency):
+        """Restate all metrics in `currency` by rescaling the USD cube per month"""
+        if currency == BASE_CURRENCY:
+            # USD needs no rescaling, so share the cube rather than copy it
+            self.cube = self.cube_usd
+        else:
+            factors = self.fx_rates.usd_to(currency, self.months)
+            self.cube = self.cube_usd * factors[:, None, None, None]
+        self.reporting_currency = currency
+        # Window prefix sums follow the cube; rebuilt on the next windowed query
+        self._prefix = None
+
+    @property
+    def data_version(self):
+        """Content fingerprint of the data, worked out the first time an answer is keyed on it"""
+        if self._data_version is None:
+            with span('tools.data_version'):
+                self._data_version = getattr(self.data, 'version', None) or data_version(self.data)
+        return self._data_version
+
+    @property
+    def actuals(self):
+        return self._ledger('actuals')
+
+    @property
+    def budget(self):
+        return self._ledger('budget')
+
+    @property
+    def cash(self):
+        return self.data['cash']
+
+    @property
+    def fx(self):
+        return self.data['fx']
+
+    @property
+    def fx_rates(self):
+        if self._fx_rates is None:
+            self._fx_rates = FXRates(self.fx)
+        return self._fx_rates
+
+    def _ledger(self, sheet):
+        """Compact copy of a ledger sheet, made on first access and kept"""
+        ledger = self._ledgers.get(sheet)
+        if ledger is None:
+            ledger = self._ledgers[sheet] = compact_ledger(self.data[sheet])
+        return ledger
+
+    def _require(self, scenario):
+        """Aggregate a scenario's ledger into the cube the first time it is needed"""
+        if scenario in self._scenarios:
+            return
+        with self._lock:
+            if scenario in self._scenarios:
+                return
+            ledger = self._ledger(SCENARIO_SHEETS[scenario])
+            with span('tools.build_cube', rows=len(ledger)):
+                self._extend_axes([ledger])
+                self._add_slabs(self._aggregate(ledger), SCENARIOS.index(scenario))
+            self._scenarios.add(scenario)
+            self.set_reporting_currency(self.reporting_currency)
+
+    def preload(self):
+        """Load every sheet and scenario now, e.g. before serving concurrent requests"""
+        for scenario in SCENARIOS:
+            self._require(scenario)
+        self.cash
+        self._variance_index()
+        return self
+
+    @property
+    def actuals_usd(self):
+        """Actuals with rate_to_usd and amount_usd columns, converted on demand on every access"""
+        return self._convert_to_usd(self.actuals)
+
+    @property
+    def budget_usd(self):
+        """Budget with rate_to_usd and amount_usd columns, converted on demand on every access"""
+        return self._convert_to_usd(self.budget)
+
+    def memory_footprint(self):
+        """Bytes held by each ledger frame and the cube, plus the total"""
+        # Only what has been loaded so far
+        frames = dict(self._ledgers)
+        loaded = self.data.loaded() if hasattr(self.data, 'loaded') else list(self.data)
+        frames.update({sheet: self.data[sheet] for sheet in ['cash', 'fx'] if sheet in loaded})
+        footprint = {name: int(df.memory_usage(deep=True).sum()) for name, df in frames.items()}
+        cubes = [self.cube_usd, self.cube_counts]
+        if self.cube is not self.cube_usd:
+            cubes.append(self.cube)
+        footprint['cube'] = sum(cube.nbytes for cube in cubes)
+        if self._fx_rates is not None:
+            footprint['fx_rates'] = sum(table.nbytes for table in self._fx_rates._tables.values())
+        footprint['total'] = sum(footprint.values())
+        return footprint
+
+    @traced('tools.convert_to_usd')
     def _convert_to_usd(self, df):
-        # Mergeing with FX rates
-        df_with_fx = df.merge(
-            self.fx[['month', 'currency', 'rate_to_usd']], 
-            on=['month', 'currency'], 
-            how='left'
+        # Gathering rates from the FX index (as-of fallback for gaps)
+        add_rows(len(df))
+        amount_usd, rates = self.fx_rates.convert(df['amount'], df['month'], df['currency'])
+
+        # Adding the two columns alongside the ledger without copying it
+        extra = pd.DataFrame({'rate_to_usd': rates, 'amount_usd': amount_usd}, index=df.index)
+        return pd.concat([df, extra], axis=1, copy=False)
+
+    def _extend_axes(self, frames):
+        """Grow the cube axes to cover any new months, entities or categories"""
+        months = sorted(set(self.months).union(*(df['month'].unique() for df in frames)))
+        entities = sorted(set(self.entities).union(*(df['entity'].unique() for df in frames)))
+        categories = sorted(set(self.categories).union(*(df['account_category'].unique() for df in frames)))
+
+        if (months, entities, categories) != (self.months, self.entities, self.categories):
+            # Re-lay the existing aggregates onto the wider axes
+            old = np.ix_(
+                np.searchsorted(months, self.months),
+                np.searchsorted(entities, self.entities),
+                np.searchsorted(categories, self.categories)
+            )
+            shape = (len(months), len(entities), len(categories), len(SCENARIOS))
+            cube_usd = np.zeros(shape)
+            cube_counts = np.zeros(shape, dtype=np.int32)
+            cube_usd[old] = self.cube_usd
+            cube_counts[old] = self.cube_counts
+            self.cube_usd, self.cube_counts = cube_usd, cube_counts
+            self.months, self.entities, self.categories = months, entities, categories
+
+        self.month_index = {month: i for i, month in enumerate(self.months)}
+        self.revenue_idx = self._category_positions(lambda c: c == 'Revenue')
+        self.cogs_idx = self._category_positions(lambda c: c == 'COGS')
+        self.opex_idx = self._category_positions(lambda c: c.startswith('Opex:'))
+
+    def _aggregate(self, df):
+        """
+        USD and row-count slabs for a ledger frame, one per month range. With
+        workers > 1 the ranges are aggregated concurrently; every cube cell
+        still sums its rows in ledger order, so results are bit-identical.
+        """
+        month_codes = _codes(df['month'], self.months)
+        partitions = self._month_partitions(month_codes)
+        if len(partitions) == 1:
+            return [self._aggregate_rows(df, month_codes, *partitions[0])]
+
+        if np.all(month_codes[1:] >= month_codes[:-1]):
+            # Month-sorted ledgers split into zero-copy row slices
+            bounds = np.searchsorted(month_codes, [m0 for m0, _ in partitions] + [len(self.months)])
+            rows = [slice(lo, hi) for lo, hi in zip(bounds[:-1], bounds[1:])]
+        else:
+            # A stable sort keeps each month's rows in their original order
+            starts = np.array([m0 for m0, _ in partitions])
+            part_ids = (np.searchsorted(starts, month_codes, side='right') - 1).astype(np.int16)
+            order = np.argsort(part_ids, kind='stable')
+            bounds = np.searchsorted(part_ids[order], np.arange(len(partitions) + 1))
+            rows = [order[lo:hi] for lo, hi in zip(bounds[:-1], bounds[1:])]
+
+        def run(i):
+            m0, m1 = partitions[i]
+            return self._aggregate_rows(df.iloc[rows[i]], month_codes[rows[i]], m0, m1)
+
+        # NumPy releases the GIL in the gathers and bincounts, so threads run in parallel
+        with ThreadPoolExecutor(max_workers=len(partitions)) as pool:
+            return list(pool.map(run, range(len(partitions))))
+
+    def _month_partitions(self, month_codes):
+        """Split the month axis into up to `workers` ranges holding similar row counts"""
+        if self.workers <= 1 or len(self.months) <= 1:
+            return [(0, len(self.months))]
+        rows = np.cumsum(np.bincount(month_codes, minlength=len(self.months)))
+        targets = rows[-1] * np.arange(1, self.workers) / self.workers
+        cuts = np.unique(np.searchsorted(rows, targets, side='left') + 1)
+        bounds = [0] + [int(c) for c in cuts if 0 < c < len(self.months)] + [len(self.months)]
+        return list(zip(bounds[:-1], bounds[1:]))
+
+    def _aggregate_rows(self, df, month_codes, m0, m1):
+        """bincount rows whose months fall in [m0, m1) into (m0, usd slab, count slab)"""
+        entity_codes = _codes(df['entity'], self.entities)
+        category_codes = _codes(df['account_category'], self.categories)
+        currency_codes = _codes(df['currency'], self.fx_rates.currencies)
+
+        # Gathering rates by code from the FX index (as-of fallback for gaps)
+        rates = self.fx_rates.rate_table(self.months)[month_codes, currency_codes]
+        missing = np.isnan(rates)
+        if missing.any():
+            pairs = sorted(set(zip(np.asarray(self.months, dtype=object)[month_codes[missing]],
+                                   np.asarray(df['currency'], dtype=object)[missing])))
+            raise ValueError(f"No FX rate for (month, currency): {pairs[:10]}")
+        # Missing amounts are skipped, as pandas sum() would
+        amounts = np.nan_to_num(df['amount'].to_numpy(dtype=float) * rates)
+
+        shape = (m1 - m0, len(self.entities), len(self.categories))
+        size = shape[0] * shape[1] * shape[2]
+        flat = ((month_codes - m0) * shape[1] + entity_codes) * shape[2] + category_codes
+        return (
+            m0,
+            np.bincount(flat, weights=amounts, minlength=size).reshape(shape),
+            np.bincount(flat, minlength=size).reshape(shape)
         )
-        
-        # Convertint amount to USD
-        df_with_fx['amount_usd'] = df_with_fx['amount'] * df_with_fx['rate_to_usd']
-        
-        return df_with_fx
+
+    def _add_slabs(self, slabs, s):
+        for m0, usd, counts in slabs:
+            self.cube_usd[m0:m0 + len(usd), :, :, s] += usd
+            self.cube_counts[m0:m0 + len(counts), :, :, s] += counts
+
+    @traced('tools.refresh')
+    def refresh(self, data, changes):
+        """
+        Fold changed month partitions into the cube.
+        `changes` maps sheet name -> months whose rows were added, edited or removed
+        (as returned by FinanceDataLoader.refresh).
+        """
+        old_version = self.data_version
+        self.data = data
+        self._ledgers = {}
+        self._variance = None
+        self._forecasts = {}
+
+        # Only scenarios already in the cube need patching; the rest load fresh later
+        scenarios = [s for s in SCENARIOS if s in self._scenarios]
+        fx_months = set()
+        if changes.get('fx'):
+            # As-of fallback means a rate change also reaches later months
+            self._fx_rates = FXRates(self.fx)
+            first_fx_change = min(changes['fx'])
+            for scenario in scenarios:
+                df = self._ledger(SCENARIO_SHEETS[scenario])
+                months = pd.Series(df['month'].unique()).astype(object)
+                fx_months |= set(months[months >= first_fx_change])
+
+        frames = []
+        for scenario in scenarios:
+            name = SCENARIO_SHEETS[scenario]
+            sheet_months = set(changes.get(name, [])) | fx_months
+            ledger = self._ledger(name)
+
+            # Re-aggregating only the rows of changed months
+            delta = ledger[ledger['month'].isin(sheet_months)]
+            frames.append((SCENARIOS.index(scenario), sheet_months, delta))
+
+        self._extend_axes([delta for _, _, delta in frames])
+        # Aggregating both scenarios before touching the cube, so a missing rate leaves it intact
+        slabs = [self._aggregate(delta) for _, _, delta in frames]
+        for (s, sheet_months, _), scenario_slabs in zip(frames, slabs):
+            positions = [self.month_index[m] for m in sheet_months if m in self.month_index]
+            self.cube_usd[positions, :, :, s] = 0
+            self.cube_counts[positions, :, :, s] = 0
+            self._add_slabs(scenario_slabs, s)
+
+        self.set_reporting_currency(self.reporting_currency)
+
+        # Answers computed from the old data can never be served again
+        self._data_version = data_version(data)
+        if self.result_cache is not None and old_version != self.data_version:
+            self.result_cache.invalidate(old_version)
+
+    def _category_positions(self, predicate):
+        return np.array([i for i, c in enumerate(self.categories) if predicate(c)], dtype=np.int64)
+
+    def actual_months(self):
+        """Months that have at least one actuals row"""
+        has_rows = self.cube_counts[..., SCENARIOS.index('actual')].sum(axis=(1, 2)) > 0
+        return [month for month, present in zip(self.months, has_rows) if present]
     
-    def get_revenue_vs_budget(self, month):
-        # Filtering for revenue only
-        actual_revenue = self.actuals_usd[
-            (self.actuals_usd['month'] == month) & 
-            (self.actuals_usd['account_category'] == 'Revenue')
-        ]['amount_usd'].sum()
-        
-        budget_revenue = self.budget_usd[
-            (self.budget_usd['month'] == month) & 
-            (self.budget_usd['account_category'] == 'Revenue')
-        ]['amount_usd'].sum()
-        
-        variance = actual_revenue - budget_revenue
-        variance_pct = (variance / budget_revenue * 100) if budget_revenue > 0 else 0
-        
+    def month_range(self, start_month=None, end_month=None):
+        """Known months between start_month and end_month inclusive"""
+        lo = 0 if start_month is None else bisect.bisect_left(self.months, start_month)
+        hi = len(self.months) if end_month is None else bisect.bisect_right(self.months, end_month)
+        return self.months[lo:hi]
+
+    def _gather(self, months, entities):
+        """Cube and row-count blocks for the given months x entities"""
+        # Unknown months/entities simply contribute zeros
+        month_pos = np.array([self.month_index.get(m, -1) for m in months], dtype=np.int64)
+        entity_lookup = {e: i for i, e in enumerate(self.entities)}
+        entity_pos = np.array([entity_lookup.get(e, -1) for e in entities], dtype=np.int64)
+
+        shape = (len(months), len(entities), len(self.categories), len(SCENARIOS))
+        block = np.zeros(shape)
+        counts = np.zeros(shape, dtype=np.int64)
+        rows, cols = month_pos >= 0, entity_pos >= 0
+        source = np.ix_(month_pos[rows], entity_pos[cols])
+        block[np.ix_(rows, cols)] = self.cube[source]
+        counts[np.ix_(rows, cols)] = self.cube_counts[source]
+        add_rows(counts.sum())
+        return block, counts
+
+    @traced('tools.get_metrics')
+    @memoized
+    def get_metrics(self, months=None, entities=None, metrics=None, by_entity=False):
+        """
+        Compute several metrics for many months in one vectorized pass.
+        Returns one row per month (or per month and entity with by_entity=True).
+        """
+        if months is None:
+            # The budget can run past the actuals, so the full month axis needs it
+            self._require('budget')
+        months = list(self.months) if months is None else list(months)
+        entities = list(self.entities) if entities is None else list(entities)
+        metrics = list(METRICS) if metrics is None else list(metrics)
+
+        unknown = [m for m in metrics if m not in METRICS]
+        if unknown:
+            raise ValueError(f"Unknown metrics: {unknown}. Choose from {METRICS}")
+        if set(metrics) & BUDGET_METRICS:
+            self._require('budget')
+
+        block, _ = self._gather(months, entities)
+
+        actual = block[..., SCENARIOS.index('actual')]
+        budget = block[..., SCENARIOS.index('budget')]
+        totals = {
+            'revenue': actual[..., self.revenue_idx].sum(axis=-1),
+            'budget_revenue': budget[..., self.revenue_idx].sum(axis=-1),
+            'cogs': actual[..., self.cogs_idx].sum(axis=-1),
+            'opex': actual[..., self.opex_idx].sum(axis=-1)
+        }
+        if not by_entity:
+            totals = {name: values.sum(axis=1) for name, values in totals.items()}
+
+        revenue, budget_revenue = totals['revenue'], totals['budget_revenue']
+        derived = dict(totals)
+        derived['revenue_variance'] = revenue - budget_revenue
+        derived['ebitda'] = revenue - totals['cogs'] - totals['opex']
+        with np.errstate(divide='ignore', invalid='ignore'):
+            derived['revenue_variance_pct'] = np.where(
+                budget_revenue > 0, derived['revenue_variance'] / budget_revenue * 100, 0)
+            derived['ebitda_margin_pct'] = np.where(
+                revenue > 0, derived['ebitda'] / revenue * 100, 0)
+            derived['gross_margin_pct'] = (revenue - totals['cogs']) / revenue * 100
+
+        if by_entity:
+            frame = {
+                'month': np.repeat(np.array(months, dtype=object), len(entities)),
+                'entity': np.tile(np.array(entities, dtype=object), len(months))
+            }
+        else:
+            frame = {'month': months}
+        for name in metrics:
+            frame[name] = derived[name].ravel()
+
+        return pd.DataFrame(frame)
+
+    @traced('tools.get_revenue_vs_budget')
+    @memoized
+    def get_revenue_vs_budget(self, month, entity=None):
+        row = self.get_metrics(
+            [month], entities=None if entity is None else [entity],
+            metrics=['revenue', 'budget_revenue', 'revenue_variance', 'revenue_variance_pct']
+        ).iloc[0]
+
         return {
             'month': month,
-            'actual': actual_revenue,
-            'budget': budget_revenue,
-            'variance': variance,
-            'variance_pct': variance_pct
+            'actual': row['revenue'],
+            'budget': row['budget_revenue'],
+            'variance': row['revenue_variance'],
+            'variance_pct': row['revenue_variance_pct']
         }
 
-    def get_gross_margin_trend(self, start_month, end_month):
-   
-        actuals_filtered = self.actuals_usd[
-            (self.actuals_usd['month'] >= start_month) & 
-            (self.actuals_usd['month'] <= end_month)
-        ]
-     
-        monthly = actuals_filtered.groupby('month').apply(
-            lambda x: pd.Series({
-                'revenue': x[x['account_category'] == 'Revenue']['amount_usd'].sum(),
-                'cogs': x[x['account_category'] == 'COGS']['amount_usd'].sum()
+    @traced('tools.get_gross_margin_trend')
+    @memoized
+    def get_gross_margin_trend(self, start_month=None, end_month=None, by_entity=False):
+        """Monthly revenue, COGS and gross margin %, optionally per entity"""
+        # Months are sorted, so any range is a contiguous block of the cube
+        months = self.month_range(start_month, end_month)
+        lo = self.month_index[months[0]] if months else 0
+        hi = lo + len(months)
+
+        window = self.cube[lo:hi, :, :, SCENARIOS.index('actual')]
+        counts = self.cube_counts[lo:hi, :, :, SCENARIOS.index('actual')]
+        add_rows(counts.sum())
+
+        # month x entity totals in one reduction each
+        revenue = window[:, :, self.revenue_idx].sum(axis=2)
+        cogs = window[:, :, self.cogs_idx].sum(axis=2)
+        has_rows = counts.sum(axis=2) > 0
+        months = np.array(self.months[lo:hi], dtype=object)
+
+        if by_entity:
+            present = has_rows.ravel()
+            monthly = pd.DataFrame({
+                'month': np.repeat(months, len(self.entities))[present],
+                'entity': np.tile(np.array(self.entities, dtype=object), len(months))[present],
+                'revenue': revenue.ravel()[present],
+                'cogs': cogs.ravel()[present]
+            })
+        else:
+            present = has_rows.any(axis=1)
+            monthly = pd.DataFrame({
+                'month': months[present],
+                'revenue': revenue.sum(axis=1)[present],
+                'cogs': cogs.sum(axis=1)[present]
             })
-        ).reset_index()
-        
+
         # Calculating gross margin %
         monthly['gross_margin_pct'] = (
             (monthly['revenue'] - monthly['cogs']) / monthly['revenue'] * 100
         )
-        
-        return monthly[['month', 'revenue', 'cogs', 'gross_margin_pct']]
-    
-    def get_opex_breakdown(self, month):
-       
-        opex_data = self.actuals_usd[
-            (self.actuals_usd['month'] == month) & 
-            (self.actuals_usd['account_category'].str.startswith('Opex:'))
-        ]
-        
-        breakdown = opex_data.groupby('account_category')['amount_usd'].sum().reset_index()
-        breakdown.columns = ['category', 'amount']
-        breakdown['category'] = breakdown['category'].str.replace('Opex:', '')
-        
+
+        columns = ['month', 'entity'] if by_entity else ['month']
+        return monthly[columns + ['revenue', 'cogs', 'gross_margin_pct']]
+
+    @traced('tools.get_opex_by_category')
+    @memoized
+    def get_opex_by_category(self, months=None, entities=None, by_entity=False):
+        """
+        Opex per category for many months in one pass, as a tidy frame of
+        month, [entity,] category, amount (categories without rows are left out)
+        """
+        months = list(self.months) if months is None else list(months)
+        entities = list(self.entities) if entities is None else list(entities)
+
+        block, counts = self._gather(months, entities)
+        amounts = block[:, :, self.opex_idx, SCENARIOS.index('actual')]
+        has_rows = counts[:, :, self.opex_idx, SCENARIOS.index('actual')] > 0
+        if not by_entity:
+            amounts, has_rows = amounts.sum(axis=1), has_rows.any(axis=1)
+
+        # Flattening month x [entity x] category into rows
+        categories = np.array([self.categories[c].replace('Opex:', '') for c in self.opex_idx], dtype=object)
+        months = np.array(months, dtype=object)
+        present = has_rows.ravel()
+        frame = {'month': np.repeat(months, amounts.size // max(len(months), 1))[present]}
+        if by_entity:
+            entity_axis = np.repeat(np.array(entities, dtype=object), len(categories))
+            frame['entity'] = np.tile(entity_axis, len(months))[present]
+        frame['category'] = np.tile(categories, amounts.size // max(len(categories), 1))[present]
+        frame['amount'] = amounts.ravel()[present]
+
+        return pd.DataFrame(frame)
+
+    @traced('tools.get_opex_breakdown')
+    @memoized
+    def get_opex_breakdown(self, month, entity=None):
+
+        breakdown = self.get_opex_by_category(
+            [month], entities=None if entity is None else [entity]
+        )[['category', 'amount']].reset_index(drop=True)
+
         total_opex = breakdown['amount'].sum()
         breakdown['pct_of_total'] = (breakdown['amount'] / total_opex * 100)
-        
+
         return breakdown.sort_values('amount', ascending=False)
-    
-    def get_ebitda(self, month):
-       
-        month_data = self.actuals_usd[self.actuals_usd['month'] == month]
-        
-        revenue = month_data[month_data['account_category'] == 'Revenue']['amount_usd'].sum()
-        cogs = month_data[month_data['account_category'] == 'COGS']['amount_usd'].sum()
-        opex = month_data[month_data['account_category'].str.startswith('Opex:')]['amount_usd'].sum()
-        
-        ebitda = revenue - cogs - opex
-        ebitda_margin = (ebitda / revenue * 100) if revenue > 0 else 0
-        
+
+    @traced('tools.get_ebitda')
+    @memoized
+    def get_ebitda(self, month, entity=None):
+        row = self.get_metrics(
+            [month], entities=None if entity is None else [entity],
+            metrics=['revenue', 'cogs', 'opex', 'ebitda', 'ebitda_margin_pct']
+        ).iloc[0]
+
         return {
             'month': month,
-            'revenue': revenue,
-            'cogs': cogs,
-            'opex': opex,
-            'ebitda': ebitda,
-            'ebitda_margin_pct': ebitda_margin
+            'revenue': row['revenue'],
+            'cogs': row['cogs'],
+            'opex': row['opex'],
+            'ebitda': row['ebitda'],
+            'ebitda_margin_pct': row['ebitda_margin_pct']
         }
-    
-    def get_cash_runway(self):
-       
-       
-        latest_cash = self.cash.sort_values('month', ascending=False).iloc[0]['cash_usd']
-        latest_month = self.cash.sort_values('month', ascending=False).iloc[0]['month']
-        
-       
-        all_months = sorted(self.actuals_usd['month'].unique(), reverse=True)
-        last_3_months = all_months[:3]
-        
-        # Calculating monthly burn for each month
-        monthly_burn = []
-        for month in last_3_months:
-            ebitda_data = self.get_ebitda(month)
-            burn = -ebitda_data['ebitda']  # Negative EBITDA = cash burn
-            monthly_burn.append(burn)
-        
-        avg_monthly_burn = sum(monthly_burn) / len(monthly_burn)
-        
+
+    def _window_prefix(self):
+        """
+        Prefix sums down the month axis of per-entity revenue, COGS, opex and
+        budget revenue, plus how many months had actuals, so any window sum is
+        two lookups
+        """
+        if self._prefix is None:
+            actual = self.cube[..., SCENARIOS.index('actual')]
+            budget = self.cube[..., SCENARIOS.index('budget')]
+            series = np.stack([
+                actual[..., self.revenue_idx].sum(axis=-1),
+                actual[..., self.cogs_idx].sum(axis=-1),
+                actual[..., self.opex_idx].sum(axis=-1),
+                budget[..., self.revenue_idx].sum(axis=-1)
+            ], axis=-1)
+            has_rows = self.cube_counts[..., SCENARIOS.index('actual')].sum(axis=2) > 0
+
+            sums = np.zeros((len(self.months) + 1,) + series.shape[1:])
+            np.cumsum(series, axis=0, out=sums[1:])
+            entity_months = np.zeros((len(self.months) + 1, len(self.entities)), dtype=np.int64)
+            np.cumsum(has_rows, axis=0, out=entity_months[1:])
+
+            # Calendar position of each month, so windows skip over gaps correctly
+            ordinals = np.array([int(m[:4]) * 12 + int(m[5:7]) - 1 for m in self.months], dtype=np.int64)
+            self._prefix = {'sums': sums, 'has_rows': has_rows, 'entity_months': entity_months,
+                            'ordinals': ordinals}
+        return self._prefix
+
+    def _window_starts(self, window, length, ordinals):
+        """Index of the first month in each month's window"""
+        if window == 'trailing':
+            if length < 1:
+                raise ValueError("Window length must be at least 1 month")
+            first = ordinals - (length - 1)
+        elif window == 'ytd':
+            first = ordinals - ordinals % 12
+        elif window == 'qtd':
+            first = ordinals - ordinals % 3
+        else:
+            raise ValueError(f"Unknown window: {window}. Choose from {WINDOWS}")
+        return np.searchsorted(ordinals, first, side='left')
+
+    @traced('tools.get_window_metrics')
+    @memoized
+    def get_window_metrics(self, window='trailing', length=3, months=None, entities=None, by_entity=False):
+        """
+        Window totals, averages and margins ending at each month: a trailing
+        `length`-month window, year-to-date or quarter-to-date. Averages divide
+        by the months in the window that have actuals. Unknown months are skipped.
+        """
+        self._require('budget')
+        return self._window_frame(window, length, months, entities, by_entity)
+
+    def _window_frame(self, window, length, months=None, entities=None, by_entity=False):
+        """get_window_metrics over whatever scenarios are loaded (runway only needs actuals)"""
+        prefix = self._window_prefix()
+        months = list(self.months) if months is None else [m for m in months if m in self.month_index]
+        entities = list(self.entities) if entities is None else list(entities)
+
+        end = np.array([self.month_index[m] for m in months], dtype=np.int64)
+        start = self._window_starts(window, length, prefix['ordinals'])[end]
+        end = end + 1
+
+        entity_lookup = {e: i for i, e in enumerate(self.entities)}
+        entity_pos = np.array([entity_lookup.get(e, -1) for e in entities], dtype=np.int64)
+        known = entity_pos >= 0
+
+        # month x entity x series window sums, two prefix lookups each
+        sums = np.zeros((len(months), len(entities), 4))
+        sums[:, known] = (prefix['sums'][end][:, entity_pos[known]] -
+                          prefix['sums'][start][:, entity_pos[known]])
+        counts = np.zeros((len(months), len(entities)), dtype=np.int64)
+        counts[:, known] = (prefix['entity_months'][end][:, entity_pos[known]] -
+                            prefix['entity_months'][start][:, entity_pos[known]])
+        add_rows(counts.sum())
+
+        if by_entity:
+            frame = {
+                'month': np.repeat(np.array(months, dtype=object), len(entities)),
+                'entity': np.tile(np.array(entities, dtype=object), len(months))
+            }
+        else:
+            sums = sums.sum(axis=1, keepdims=True)
+            # Months where any of the entities had actuals
+            any_rows = np.zeros(len(self.months) + 1, dtype=np.int64)
+            np.cumsum(prefix['has_rows'][:, entity_pos[known]].any(axis=1), out=any_rows[1:])
+            counts = (any_rows[end] - any_rows[start])[:, None]
+            frame = {'month': months}
+
+        revenue, cogs, opex, budget_revenue = (sums[..., i].ravel() for i in range(4))
+        window_months = counts.ravel()
+        ebitda = revenue - cogs - opex
+        with np.errstate(divide='ignore', invalid='ignore'):
+            frame.update({
+                'window_months': window_months,
+                'revenue': revenue,
+                'budget_revenue': budget_revenue,
+                'cogs': cogs,
+                'opex': opex,
+                'ebitda': ebitda,
+                'gross_margin_pct': np.where(revenue > 0, (revenue - cogs) / revenue * 100, np.nan),
+                'ebitda_margin_pct': np.where(revenue > 0, ebitda / revenue * 100, np.nan),
+                'avg_revenue': revenue / window_months,
+                'avg_ebitda': ebitda / window_months,
+                'avg_burn': -ebitda / window_months
+            })
+        return pd.DataFrame(frame)
+
+    def _cash_by_month(self):
+        """Cash balance per month in the reporting currency, oldest first"""
+        cash = self.cash.groupby('month', sort=True)['cash_usd'].sum()
+        if self.reporting_currency != BASE_CURRENCY:
+            cash = cash * self.fx_rates.usd_to(self.reporting_currency, cash.index.tolist())
+        return cash
+
+    @traced('tools.get_runway_series')
+    @memoized
+    def get_runway_series(self, window=3):
+        """
+        Cash runway at every month with a cash balance, using the average burn
+        of the trailing `window` months of actuals ending that month
+        """
+        if window < 1:
+            raise ValueError("Window length must be at least 1 month")
+        cash = self._cash_by_month()
+        prefix = self._window_prefix()
+
+        # Windows are found by calendar position, so a cash month missing from the
+        # cube's month axis (which depends on the sheets loaded so far) still gets one
+        ordinals = np.array([month_ordinal(m) for m in cash.index], dtype=np.int64)
+        end = np.searchsorted(prefix['ordinals'], ordinals, side='right')
+        start = np.searchsorted(prefix['ordinals'], ordinals - (window - 1), side='left')
+        sums = (prefix['sums'][end] - prefix['sums'][start]).sum(axis=1)
+        any_rows = np.zeros(len(self.months) + 1, dtype=np.int64)
+        np.cumsum(prefix['has_rows'].any(axis=1), out=any_rows[1:])
+        months_with_actuals = any_rows[end] - any_rows[start]
+        add_rows(months_with_actuals.sum())
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            burn = -(sums[:, 0] - sums[:, 1] - sums[:, 2]) / months_with_actuals
+            runway = np.where(burn > 0, cash.to_numpy() / burn, np.where(np.isnan(burn), np.nan, np.inf))
+        return pd.DataFrame({
+            'month': cash.index.to_numpy(dtype=object),
+            'cash': cash.to_numpy(),
+            'avg_monthly_burn': burn,
+            'runway_months': runway
+        })
+
+    @traced('tools.get_cash_runway')
+    @memoized
+    def get_cash_runway(self, window=3):
+        """Runway from the latest cash balance and the average burn of the last `window` months"""
+        cash = self._cash_by_month()
+        latest_month, latest_cash = cash.index[-1], cash.iloc[-1]
+
+        # Average burn over the trailing window ending at the latest actuals
+        last = self.month_index[self.actual_months()[-1]]
+        avg_monthly_burn = self._window_frame('trailing', window, [self.months[last]])['avg_burn'].iloc[0]
+
+        # Burn of each month in that window that has actuals (negative EBITDA = cash burn)
+        prefix = self._window_prefix()
+        first = self._window_starts('trailing', window, prefix['ordinals'])[last]
+        in_window = [m for i, m in enumerate(self.months[first:last + 1], first) if prefix['has_rows'][i].any()]
+        monthly_burn = (-self.get_metrics(in_window, metrics=['ebitda'])['ebitda']).tolist()
+        # Burn of the three latest months with actuals, newest first, whatever the window
+        last_3_months = self.actual_months()[-3:][::-1]
+        last_3_months_burn = (-self.get_metrics(last_3_months, metrics=['ebitda'])['ebitda']).tolist()
+
         # Calculating runway in months
         runway_months = latest_cash / avg_monthly_burn if avg_monthly_burn > 0 else float('inf')
-        
+
         return {
             'current_cash': latest_cash,
             'latest_month': latest_month,
+            'window_months': window,
             'avg_monthly_burn': avg_monthly_burn,
             'runway_months': runway_months,
-            'last_3_months_burn': monthly_burn
-        }
\ No newline at end of file
+            'monthly_burn': monthly_burn,
+            # Kept as it always was for existing clients of the result
+            'last_3_months_burn': last_3_months_burn
+        }
+
+    @traced('tools.simulate_runway')
+    @memoized
+    def simulate_runway(self, paths=10000, horizon=24, window=3, by=None, shock=0.1, vol_scale=1.0,
+                        trend=False, seed=0):
+        """
+        Runway distribution from `paths` simulated months of revenue, COGS,
+        opex and FX moves, starting at the last `window` months' averages.
+        See RunwaySimulator.simulate for what is returned.
+        """
+        return self._runway_simulator(window).simulate(
+            paths, horizon, by=by, shock=shock, vol_scale=vol_scale, trend=trend, seed=seed)
+
+    def _runway_simulator(self, window):
+        """Calibrate a RunwaySimulator on the monthly actuals in the cube"""
+        cash = self._cash_by_month()
+        months = self.actual_months()
+        history = self.get_metrics(months, metrics=['revenue', 'cogs', 'opex'])
+        drivers = history[['revenue', 'cogs', 'opex']].to_numpy()
+
+        # Starting levels: the trailing window averages get_cash_runway burns at
+        last = self._window_frame('trailing', window, [months[-1]]).iloc[0]
+        base = last[['revenue', 'cogs', 'opex']].to_numpy(dtype=float) / last['window_months']
+
+        foreign_share, fx_volatility = self._fx_exposure(self.month_range(
+            self.months[self._window_starts('trailing', window, self._window_prefix()['ordinals'])[
+                self.month_index[months[-1]]]], months[-1]))
+        return RunwaySimulator(drivers, base, cash.iloc[-1], cash.index[-1], foreign_share, fx_volatility)
+
+    def _fx_exposure(self, months):
+        """
+        Share of revenue, COGS and opex booked outside the reporting currency
+        in `months`, and the exposure-weighted monthly volatility of those
+        currencies against it
+        """
+        ledger = self.actuals
+        rows = ledger[ledger['month'].isin(months)]
+        add_rows(len(rows))
+        amounts, _ = self.fx_rates.convert(rows['amount'], rows['month'], rows['currency'])
+        amounts = np.abs(amounts)
+
+        # Driver of each category: 0 revenue, 1 COGS, 2 opex, 3 anything else
+        driver_of = np.full(len(self.categories) + 1, 3, dtype=np.int64)
+        driver_of[self.revenue_idx], driver_of[self.cogs_idx], driver_of[self.opex_idx] = 0, 1, 2
+        drivers = driver_of[_codes(rows['account_category'], self.categories)]
+        foreign = (rows['currency'] != self.reporting_currency).to_numpy()
+
+        totals = np.bincount(drivers, weights=amounts, minlength=4)[:3]
+        foreign_totals = np.bincount(drivers[foreign], weights=amounts[foreign], minlength=4)[:3]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            share = np.nan_to_num(foreign_totals / totals)
+
+        # Monthly log changes of each currency's rate against the reporting currency
+        rates = self.fx_rates.asof_rates
+        home = rates[:, self.fx_rates.currency_index[self.reporting_currency]]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            volatility = np.nan_to_num(np.nanstd(np.diff(np.log(rates / home[:, None]), axis=0), axis=0))
+        exposure = np.bincount(_codes(rows['currency'][foreign], self.fx_rates.currencies),
+                               weights=amounts[foreign], minlength=len(self.fx_rates.currencies))
+        fx_volatility = exposure @ volatility / exposure.sum() if exposure.sum() > 0 else 0.0
+        return share, float(fx_volatility)
+
+    def _variance_index(self):
+        """Local-currency actual/budget per month and entity/category/currency, built once"""
+        if self._variance is None:
+            self._require('budget')
+            with span('tools.build_variance_index', rows=len(self.actuals) + len(self.budget)):
+                self._variance = VarianceIndex(self.actuals, self.budget, self.months)
+        return self._variance
+
+    def _reporting_rates(self, currencies, plan_rates):
+        """
+        Month x currency rates into the reporting currency at actual (as-of)
+        rates and at plan rates: 'actual', 'year_start' (each year's January
+        rate) or a fixed 'YYYY-MM'
+        """
+        positions = np.array([self.fx_rates.currency_index.get(c, -1) for c in currencies], dtype=np.int64)
+        home = self.fx_rates.currency_index[self.reporting_currency]
+
+        def table(months):
+            rates = self.fx_rates.rate_table(months)[:-1]
+            return rates[:, positions] / rates[:, [home]]
+
+        if plan_rates == 'actual':
+            plan_months = self.months
+        elif plan_rates == 'year_start':
+            plan_months = [f'{month[:4]}-01' for month in self.months]
+        elif isinstance(plan_rates, str) and len(plan_rates) == 7 and plan_rates[4] == '-':
+            plan_months = [plan_rates] * len(self.months)
+        else:
+            raise ValueError(f"Unknown plan_rates: {plan_rates}. Use 'actual', 'year_start' or 'YYYY-MM'")
+        return table(self.months), table(plan_months)
+
+    @traced('tools.get_variance_drilldown')
+    @memoized
+    def get_variance_drilldown(self, start_month=None, end_month=None, metric='revenue',
+                               by=('entity',), top_k=10, plan_rates='year_start'):
+        """
+        Actual vs budget for `metric` over a month range, with the budget at
+        plan rates. The variance splits into a volume effect (actuals at plan
+        rates minus budget) and an FX effect (actuals at actual minus plan
+        rates), totalled and for the top_k groups of `by` (any of entity,
+        account_category, currency) by absolute variance.
+        """
+        by = [by] if isinstance(by, str) else list(by)
+        if top_k < 1:
+            raise ValueError("top_k must be at least 1")
+        index = self._variance_index()
+        # The same category positions the cube's metrics use, so the two can't disagree
+        weights = metric_weights(metric, len(self.categories), (self.revenue_idx, self.cogs_idx, self.opex_idx))
+
+        months = self.month_range(start_month, end_month)
+        if not months:
+            raise ValueError(f"No months between {start_month} and {end_month}")
+        lo = self.month_index[months[0]]
+        hi = lo + len(months)
+
+        actual_rates, plan = self._reporting_rates(index.axes['currency'], plan_rates)
+        prefix = index.prefix(actual_rates, plan, (self.reporting_currency, plan_rates))
+        # Category weights follow the cube's axis; the index has its own
+        weights = weights[_codes(index.axes['account_category'], self.categories)]
+        totals, contributors = index.drilldown(prefix, lo, hi, weights, by, top_k)
+        add_rows(index.local.shape[1])
+
+        result = {
+            'metric': metric,
+            'start_month': months[0],
+            'end_month': months[-1],
+            'plan_rates': plan_rates
+        }
+        result.update(totals)
+        result['contributors'] = contributors
+        return result
+
+    @traced('tools.detect_anomalies')
+    @memoized
+    def detect_anomalies(self, window=12, threshold=3.0, min_periods=6, method='zscore', budget_threshold=0.1):
+        """
+        Flag months of every entity/category series whose USD actuals score
+        beyond `threshold` against the trailing `window` months ('zscore' or
+        robust 'mad'), and months missing budget by more than budget_threshold
+        (a fraction). One row per flag: month, entity, account_category, kind,
+        amount_usd, expected_usd, score.
+        """
+        if method not in METHODS:
+            raise ValueError(f"Unknown method: {method}. Choose from {METHODS}")
+        if window < 1:
+            raise ValueError("Window length must be at least 1 month")
+        self._require('budget')
+
+        # The USD cube already holds every series, month x entity x category
+        actual = self.cube_usd[..., SCENARIOS.index('actual')]
+        budget = self.cube_usd[..., SCENARIOS.index('budget')]
+        present = self.cube_counts[..., SCENARIOS.index('actual')] > 0
+        budget_present = self.cube_counts[..., SCENARIOS.index('budget')] > 0
+        add_rows(self.cube_counts.sum())
+
+        scorer = rolling_zscores if method == 'zscore' else rolling_mad_scores
+        scores, expected = scorer(actual, present, window, min_periods)
+        misses = budget_misses(actual, present, budget, budget_present)
+
+        parts = []
+        for kind, score, reference, limit in [(method, scores, expected, threshold),
+                                              ('budget_miss', misses, budget, budget_threshold)]:
+            months, entities, categories = np.nonzero(np.abs(np.nan_to_num(score)) > limit)
+            parts.append(pd.DataFrame({
+                'month': np.array(self.months, dtype=object)[months],
+                'entity': np.array(self.entities, dtype=object)[entities],
+                'account_category': np.array(self.categories, dtype=object)[categories],
+                'kind': kind,
+                'amount_usd': actual[months, entities, categories],
+                'expected_usd': reference[months, entities, categories],
+                'score': score[months, entities, categories]
+            }))
+
+        flags = pd.concat(parts, ignore_index=True)
+        return flags.sort_values(['month', 'entity', 'account_category', 'kind'], ignore_index=True)
+
+    def _forecast(self, method, months_ahead):
+        """
+        Forecast months and their month x entity x category actuals, from
+        every series of the cube in one batched fit; kept per data version
+        """
+        key = (self.data_version, self.reporting_currency, method, months_ahead)
+        if key not in self._forecasts:
+            self._require('budget')
+            actual_months = self.actual_months()
+            lo, hi = self.month_index[actual_months[0]], self.month_index[actual_months[-1]] + 1
+            history = self.cube[lo:hi, :, :, SCENARIOS.index('actual')]
+            last = month_ordinal(actual_months[-1])
+
+            if months_ahead is None:
+                # To the end of the budget, or a year on if the actuals already reach it
+                budget_rows = self.cube_counts[..., SCENARIOS.index('budget')].sum(axis=(1, 2)) > 0
+                budget_end = max(month_ordinal(m) for m, present in zip(self.months, budget_rows) if present)
+                months_ahead = budget_end - last if budget_end > last else DEFAULT_FORECAST_MONTHS
+            if months_ahead < 1:
+                raise ValueError("months_ahead must be at least 1")
+
+            with span('tools.forecast', rows=int(self.cube_counts[lo:hi, ..., SCENARIOS.index('actual')].sum())):
+                values = forecast_series(history, months_ahead, method)
+            months = [month_label(last + i) for i in range(1, months_ahead + 1)]
+            self._forecasts[key] = (months, values)
+        return self._forecasts[key]
+
+    def _forecast_totals(self, values):
+        """Revenue, COGS, opex and EBITDA per month x entity of a forecast block"""
+        revenue = values[..., self.revenue_idx].sum(axis=-1)
+        cogs = values[..., self.cogs_idx].sum(axis=-1)
+        opex = values[..., self.opex_idx].sum(axis=-1)
+        return {'revenue': revenue, 'cogs': cogs, 'opex': opex, 'ebitda': revenue - cogs - opex}
+
+    @traced('tools.get_forecast')
+    @memoized
+    def get_forecast(self, method='auto', months_ahead=None, by_entity=False):
+        """
+        Forecast revenue, COGS, opex and EBITDA for the months after the last
+        actuals: to the end of the budget unless months_ahead says otherwise.
+        method is one of seasonal_naive, exp_smoothing, linear_trend or auto
+        (the best of those per entity/category series on recent months).
+        """
+        months, values = self._forecast(method, months_ahead)
+        totals = self._forecast_totals(values)
+
+        if by_entity:
+            frame = {
+                'month': np.repeat(np.array(months, dtype=object), len(self.entities)),
+                'entity': np.tile(np.array(self.entities, dtype=object), len(months))
+            }
+        else:
+            totals = {name: series.sum(axis=1) for name, series in totals.items()}
+            frame = {'month': months}
+        for name, series in totals.items():
+            frame[name] = series.ravel()
+        return pd.DataFrame(frame)
+
+    @traced('tools.get_forecast_vs_budget')
+    @memoized
+    def get_forecast_vs_budget(self, method='auto', months_ahead=None):
+        """
+        Forecast revenue and EBITDA against budget for each forecast month,
+        and each year's landing (actuals to date plus forecast) against its
+        full-year budget
+        """
+        forecast = self.get_forecast(method, months_ahead)
+        budget = self.get_metrics(list(forecast['month']), metrics=['budget_revenue'])
+        budget_ebitda = self._budget_ebitda(list(forecast['month']))
+        has_budget = np.array([m in self.month_index for m in forecast['month']])
+
+        monthly = pd.DataFrame({
+            'month': forecast['month'],
+            'forecast_revenue': forecast['revenue'],
+            'budget_revenue': np.where(has_budget, budget['budget_revenue'], np.nan),
+            'forecast_ebitda': forecast['ebitda'],
+            'budget_ebitda': np.where(has_budget, budget_ebitda, np.nan)
+        })
+        monthly['revenue_variance'] = monthly['forecast_revenue'] - monthly['budget_revenue']
+        monthly['ebitda_variance'] = monthly['forecast_ebitda'] - monthly['budget_ebitda']
+
+        # Landing: each forecast year's actuals so far plus its forecast months
+        rows = []
+        for year in sorted({m[:4] for m in forecast['month']}):
+            year_months = self.month_range(f'{year}-01', f'{year}-12')
+            actual = self.get_metrics(year_months, metrics=['revenue', 'ebitda', 'budget_revenue'])
+            in_year = monthly['month'].str.startswith(year)
+            # A year with no budget rows has no budget to land against
+            budgeted = any(self.cube_counts[self.month_index[m], ..., SCENARIOS.index('budget')].any()
+                           for m in year_months)
+            rows.append({
+                'year': year,
+                'actual_revenue': actual['revenue'].sum(),
+                'forecast_revenue': monthly.loc[in_year, 'forecast_revenue'].sum(),
+                'budget_revenue': actual['budget_revenue'].sum() if budgeted else np.nan,
+                'actual_ebitda': actual['ebitda'].sum(),
+                'forecast_ebitda': monthly.loc[in_year, 'forecast_ebitda'].sum(),
+                'budget_ebitda': self._budget_ebitda(year_months).sum() if budgeted else np.nan
+            })
+        landing = pd.DataFrame(rows, columns=['year', 'actual_revenue', 'forecast_revenue', 'budget_revenue',
+                                              'actual_ebitda', 'forecast_ebitda', 'budget_ebitda'])
+        landing['landing_revenue'] = landing['actual_revenue'] + landing['forecast_revenue']
+        landing['revenue_variance'] = landing['landing_revenue'] - landing['budget_revenue']
+        landing['landing_ebitda'] = landing['actual_ebitda'] + landing['forecast_ebitda']
+        landing['ebitda_variance'] = landing['landing_ebitda'] - landing['budget_ebitda']
+
+        return {'method': method, 'monthly': monthly, 'landing': landing}
+
+    def _budget_ebitda(self, months):
+        """Consolidated budget EBITDA for each month (zero where there is no budget)"""
+        block, _ = self._gather(months, self.entities)
+        totals = self._forecast_totals(block[..., SCENARIOS.index('budget')])
+        return totals['ebitda'].sum(axis=1)
+
+    @traced('tools.get_forecast_runway')
+    @memoized
+    def get_forecast_runway(self, method='auto', months_ahead=None):
+        """
+        Runway from the latest cash balance and forecast monthly EBITDA
+        instead of a flat trailing burn. The projection starts the month after
+        the balance: actual EBITDA for any months it doesn't include yet, then
+        the forecast. Past the forecast, the last forecast month's burn carries on.
+        """
+        cash = self._cash_by_month()
+        latest_month, latest_cash = cash.index[-1], cash.iloc[-1]
+        start = month_ordinal(latest_month)
+        forecast = self.get_forecast(method, months_ahead)
+
+        # Actuals newer than the balance aren't in it yet; forecasts older than it already are
+        gap = [month_label(o) for o in range(start + 1, month_ordinal(forecast['month'].iloc[0]))]
+        forecast = forecast[forecast['month'] > latest_month]
+        months = gap + forecast['month'].tolist()
+        ebitda = np.concatenate([
+            self.get_metrics(gap, metrics=['ebitda'])['ebitda'].to_numpy() if gap else np.zeros(0),
+            forecast['ebitda'].to_numpy()
+        ])
+        source = ['actual'] * len(gap) + ['forecast'] * len(forecast)
+
+        balance = latest_cash + np.cumsum(ebitda)
+        negative = np.flatnonzero(balance < 0)
+        if len(negative):
+            # Cash falls linearly through the month it runs out in
+            first = negative[0]
+            before = balance[first - 1] if first > 0 else latest_cash
+            runway_months = first + before / (before - balance[first])
+        elif len(ebitda) and ebitda[-1] < 0:
+            runway_months = len(ebitda) + balance[-1] / -ebitda[-1]
+        else:
+            runway_months = float('inf')
+        # Months count from the balance, so the month it runs out in follows from the runway
+        out_of_cash_month = None if np.isinf(runway_months) else month_label(start + int(np.ceil(runway_months)))
+
+        return {
+            'current_cash': latest_cash,
+            'latest_month': latest_month,
+            'method': method,
+            'runway_months': runway_months,
+            'out_of_cash_month': out_of_cash_month,
+            'projection': pd.DataFrame({'month': months, 'source': source, 'ebitda': ebitda, 'cash': balance})
+        }
@@ -0,0 +1,158 @@
+import numpy as np
+import pandas as pd
+
+# Dimensions a variance can be broken down by
+DIMENSIONS = ['entity', 'account_category', 'currency']
+
+# Sign of the (revenue, COGS, opex) categories in each metric the drill-down understands
+METRIC_SIGNS = {
+    'revenue': (1.0, 0.0, 0.0),
+    'cogs': (0.0, 1.0, 0.0),
+    'opex': (0.0, 0.0, 1.0),
+    'ebitda': (1.0, -1.0, -1.0)
+}
+VARIANCE_METRICS = list(METRIC_SIGNS)
+
+# Columns of the per-combination prefix sums
+SERIES = ['actual', 'actual_at_plan', 'budget']
+
+
+def metric_weights(metric, size, groups):
+    """
+    Sign each of `size` account categories carries in `metric` (0 where it
+    doesn't count), given the (revenue, COGS, opex) category positions
+    """
+    if metric not in METRIC_SIGNS:
+        raise ValueError(f"Unknown metric: {metric}. Choose from {VARIANCE_METRICS}")
+    weights = np.zeros(size)
+    for positions, sign in zip(groups, METRIC_SIGNS[metric]):
+        weights[positions] = sign
+    return weights
+
+
+class VarianceIndex:
+    """
+    Actuals and budget summed in local currency per month and
+    (entity, account_category, currency) combination. Combinations are
+    sorted by those keys and the reporting-currency values are kept as
+    prefix sums down the month axis, so a month range costs two lookups per
+    combination and top-k only sorts the k rows it returns.
+    """
+
+    def __init__(self, actuals, budget, months):
+        self.months = list(months)
+        self.axes = {
+            dim: sorted(set(actuals[dim].unique()) | set(budget[dim].unique()))
+            for dim in DIMENSIONS
+        }
+        sizes = [len(self.axes[dim]) for dim in DIMENSIONS]
+
+        month_codes, keys = [], []
+        for df in [actuals, budget]:
+            dims = [pd.Categorical(df[dim], categories=self.axes[dim]).codes.astype(np.int64)
+                    for dim in DIMENSIONS]
+            month_codes.append(pd.Categorical(df['month'], categories=self.months).codes.astype(np.int64))
+            keys.append((dims[0] * sizes[1] + dims[1]) * sizes[2] + dims[2])
+
+        # Only combinations that occur get a column; unique() sorts them by key
+        combo_keys, inverse = np.unique(np.concatenate(keys), return_inverse=True)
+        self.combos = {
+            'entity': combo_keys // (sizes[1] * sizes[2]),
+            'account_category': combo_keys // sizes[2] % sizes[1],
+            'currency': combo_keys % sizes[2]
+        }
+
+        # month x combination x (actual, budget) local amounts
+        shape = (len(self.months), len(combo_keys))
+        self.local = np.zeros(shape + (2,))
+        combo_rows = np.split(inverse, [len(keys[0])])
+        for s, df in enumerate([actuals, budget]):
+            amounts = np.nan_to_num(df['amount'].to_numpy(dtype=float))
+            flat = month_codes[s] * shape[1] + combo_rows[s]
+            self.local[..., s] = np.bincount(flat, weights=amounts, minlength=shape[0] * shape[1]).reshape(shape)
+        self._prefix = {}
+
+    def prefix(self, actual_rates, plan_rates, key):
+        """
+        Prefix sums of actual at actual rates, actual at plan rates and budget
+        at plan rates; rates are month x currency tables in the reporting currency
+        """
+        if key not in self._prefix:
+            currency = self.combos['currency']
+            values = np.stack([
+                self._convert(self.local[..., 0], actual_rates[:, currency]),
+                self._convert(self.local[..., 0], plan_rates[:, currency]),
+                self._convert(self.local[..., 1], plan_rates[:, currency])
+            ], axis=-1)
+            prefix = np.zeros((len(self.months) + 1,) + values.shape[1:])
+            np.cumsum(values, axis=0, out=prefix[1:])
+            self._prefix[key] = prefix
+        return self._prefix[key]
+
+    def _convert(self, local, rates):
+        missing = np.isnan(rates) & (local != 0)
+        if missing.any():
+            months, combos = np.nonzero(missing)
+            pairs = sorted({(self.months[m], self.axes['currency'][self.combos['currency'][c]])
+                            for m, c in zip(months, combos)})
+            raise ValueError(f"No FX rate for (month, currency): {pairs[:10]}")
+        return np.where(local != 0, local * np.nan_to_num(rates), 0.0)
+
+    def drilldown(self, prefix, lo, hi, weights, by, top_k):
+        """
+        Variance over months [lo, hi) grouped by the `by` dimensions, as the
+        totals and a frame of the top_k groups by absolute variance
+        """
+        unknown = [dim for dim in by if dim not in DIMENSIONS]
+        if unknown or not by:
+            raise ValueError(f"Break down by one or more of {DIMENSIONS}, not {list(by)}")
+
+        # combination x series sums for the range, signed for the metric
+        values = (prefix[hi] - prefix[lo]) * weights[self.combos['account_category']][:, None]
+        keep = weights[self.combos['account_category']] != 0
+
+        group = np.zeros(len(values), dtype=np.int64)
+        for dim in by:
+            group = group * len(self.axes[dim]) + self.combos[dim]
+        groups, inverse = np.unique(group[keep], return_inverse=True)
+        sums = np.stack([np.bincount(inverse, weights=values[keep, i], minlength=len(groups))
+                         for i in range(len(SERIES))], axis=-1)
+
+        actual, actual_at_plan, budget = sums.T
+        variance = actual - budget
+        total = values[keep].sum(axis=0)
+        total_variance = total[0] - total[2]
+
+        # Only the k largest are sorted
+        magnitude = np.abs(variance)
+        if top_k < len(groups):
+            candidates = np.argpartition(-magnitude, top_k)[:top_k]
+        else:
+            candidates = np.arange(len(groups))
+        order = candidates[np.argsort(-magnitude[candidates], kind='stable')]
+
+        frame = {}
+        for dim in reversed(by):
+            size = len(self.axes[dim])
+            frame[dim] = np.array(self.axes[dim], dtype=object)[groups[order] % size]
+            groups = groups // size
+        frame = {dim: frame[dim] for dim in by}
+        with np.errstate(divide='ignore', invalid='ignore'):
+            frame.update({
+                'actual': actual[order],
+                'budget': budget[order],
+                'variance': variance[order],
+                'volume_effect': actual_at_plan[order] - budget[order],
+                'fx_effect': actual[order] - actual_at_plan[order],
+                'share_of_variance_pct': np.where(
+                    total_variance != 0, variance[order] / total_variance * 100, np.nan)
+            })
+
+        totals = {
+            'actual': total[0],
+            'budget': total[2],
+            'variance': total_variance,
+            'volume_effect': total[1] - total[2],
+            'fx_effect': total[0] - total[1]
+        }
+        return totals, pd.DataFrame(frame)
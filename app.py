@@ -1,148 +1,180 @@
 import streamlit as st
+import pandas as pd
 from agent.data_loader import FinanceDataLoader
 from agent.tools import FinanceTools
+from agent.cache import ResultCache
 from agent.planner import QueryPlanner
+from agent.pipeline import QueryPipeline
 import plotly.graph_objects as go
 import plotly.express as px
 from agent.pdf_generator import PDFReportGenerator
-import os
+from agent.anomalies import AnomalyStore
+from agent.instrumentation import TRACER, span
 from datetime import datetime
 
 st.set_page_config(page_title="CFO Copilot", page_icon="💼", layout="wide")
 
-# Load data (caching it so it doesn't reload on every interaction)
-@st.cache_data
+# Spans recorded from here on belong to this rerun (Streamlit runs each session on its own thread)
+timings_mark = TRACER.mark()
+show_timings = st.sidebar.checkbox("Debug timings")
+show_anomalies = st.sidebar.checkbox("Anomalies")
+
+# Load data lazily (the version comes from the loader's cache without parsing the
+# sheets; the ttl lets a changed workbook through, which that cache keeps cheap)
+@st.cache_resource(ttl=300)
 def load_data():
-    loader = FinanceDataLoader()
-    return loader.load_all_data()
+    data = FinanceDataLoader(compact=True).load_lazy()
+    return data, data.version
+
+
+# One result cache shared by every session
+@st.cache_resource
+def get_result_cache():
+    return ResultCache(maxsize=1024, ttl=3600)
+
 
+# Build FinanceTools once per data version instead of on every rerun. Sessions
+# share it from their own threads, so every scenario is loaded before it is handed out
+@st.cache_resource(max_entries=2)
+def get_tools(version):
+    data, _ = load_data()
+    return FinanceTools(data, result_cache=get_result_cache()).preload()
 
-data = load_data()
-tools = FinanceTools(data)
+
+data, version = load_data()
+tools = get_tools(version)
 planner = QueryPlanner()
+pipeline = QueryPipeline(tools, planner)
 
 
 st.title("💼 CFO Copilot")
 st.markdown("Ask questions about your financial performance")
 
+# Flags are scanned once per data version and persisted next to the loader cache
+@st.cache_data(max_entries=2)
+def get_anomalies(version):
+    return AnomalyStore(FinanceDataLoader().cache_dir).get_or_scan(get_tools(version))
+
+
+# PDF bytes per (month, data version), built in memory and shared by all sessions
+@st.cache_data(max_entries=32)
+def build_report(month, version):
+    return PDFReportGenerator(get_tools(version)).generate_report_bytes(month=month)
+
+
 col1, col2 = st.columns([6, 1])
 with col2:
     if st.button("📄 Export PDF"):
-        pdf_gen = PDFReportGenerator(tools)
-        pdf_filename = f"cfo_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-        pdf_gen.generate_report(pdf_filename, month='2025-06')
+        report_month = '2025-06'
+        pdf_bytes = build_report(report_month, version)
         
         # Provide download button
-        with open(pdf_filename, "rb") as pdf_file:
-            st.download_button(
-                label="⬇️ Download Report",
-                data=pdf_file,
-                file_name=pdf_filename,
-                mime="application/pdf"
-            )
-        
-        # Clean up
-        if os.path.exists(pdf_filename):
-            os.remove(pdf_filename)
+        st.download_button(
+            label="⬇️ Download Report",
+            data=pdf_bytes,
+            file_name=f"cfo_report_{report_month}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
+            mime="application/pdf"
+        )
 
 # Chat interface
 user_question = st.text_input("Ask a question:")
 
 if user_question:
-    # Parseing  the question
-    parsed = planner.parse_query(user_question)
+    # Parseing  the question and running the matching tool
+    answer = pipeline.answer(user_question)
+    result = answer['result']
     
     st.markdown("---")
     
 
-    if parsed['intent'] == 'revenue_vs_budget':
-        if parsed['month']:
-            result = tools.get_revenue_vs_budget(parsed['month'])
-            
-            # Displaying results
-            col1, col2, col3 = st.columns(3)
-            with col1:
-                st.metric("Actual Revenue", f"${result['actual']:,.0f}")
-            with col2:
-                st.metric("Budget", f"${result['budget']:,.0f}")
-            with col3:
-                st.metric("Variance", f"${result['variance']:,.0f}", 
-                         delta=f"{result['variance_pct']:.1f}%")
-            
-            # Creating  chart
+    if answer['intent'] == 'revenue_vs_budget' and answer['error']:
+        st.warning(f"⚠️ {answer['error']}")
+
+    elif answer['intent'] == 'revenue_vs_budget':
+        
+        # Displaying results
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Actual Revenue", f"${result['actual']:,.0f}")
+        with col2:
+            st.metric("Budget", f"${result['budget']:,.0f}")
+        with col3:
+            st.metric("Variance", f"${result['variance']:,.0f}", 
+                     delta=f"{result['variance_pct']:.1f}%")
+        
+        # Creating  chart
+        with span('app.figure'):
             fig = go.Figure(data=[
                 go.Bar(name='Actual', x=['Revenue'], y=[result['actual']], marker_color='#1f77b4'),
                 go.Bar(name='Budget', x=['Revenue'], y=[result['budget']], marker_color='#ff7f0e')
             ])
             fig.update_layout(
-                title=f"Revenue vs Budget - {parsed['month']}",
+                title=f"Revenue vs Budget - {answer['month']}",
                 yaxis_title="USD",
                 barmode='group',
                 height=400
             )
-            st.plotly_chart(fig, use_container_width=True)
-        else:
-            st.warning("⚠️ Please specify a month (e.g., 'June 2025')")
+        st.plotly_chart(fig, use_container_width=True)
     
-    elif parsed['intent'] == 'gross_margin_trend':
-        
-        if parsed['date_range'] and parsed['date_range'][0] == 'LAST_N_MONTHS':
-            num_months = parsed['date_range'][1]
-        else:
-            num_months = 3
-        
-     
-        all_months = sorted(tools.actuals_usd['month'].unique(), reverse=True)
-        end_month = all_months[0]
-        start_month = all_months[num_months - 1]
-        
-        gm_trend = tools.get_gross_margin_trend(start_month, end_month)
+    elif answer['intent'] == 'gross_margin_trend' and answer['error']:
+        st.warning(f"⚠️ {answer['error']}")
+    
+    elif answer['intent'] == 'gross_margin_trend':
+        gm_trend = result
         
         # Display summary
         avg_gm = gm_trend['gross_margin_pct'].mean()
         st.metric("Average Gross Margin", f"{avg_gm:.1f}%")
         
         # Creating  chart
-        fig = go.Figure()
-        fig.add_trace(go.Scatter(
-            x=gm_trend['month'], 
-            y=gm_trend['gross_margin_pct'],
-            mode='lines+markers',
-            name='Gross Margin %',
-            line=dict(color='#2ca02c', width=3),
-            marker=dict(size=10)
-        ))
-        fig.update_layout(
-            title="Gross Margin % Trend",
-            xaxis_title="Month",
-            yaxis_title="Gross Margin %",
-            height=400
-        )
+        with span('app.figure'):
+            fig = go.Figure()
+            fig.add_trace(go.Scatter(
+                x=gm_trend['month'], 
+                y=gm_trend['gross_margin_pct'],
+                mode='lines+markers',
+                name='Gross Margin %',
+                line=dict(color='#2ca02c', width=3),
+                marker=dict(size=10)
+            ))
+            fig.update_layout(
+                title="Gross Margin % Trend",
+                xaxis_title="Month",
+                yaxis_title="Gross Margin %",
+                height=400
+            )
         st.plotly_chart(fig, use_container_width=True)
         
       
         st.dataframe(gm_trend, use_container_width=True)
     
-    elif parsed['intent'] == 'opex_breakdown':
-        month = parsed['month'] if parsed['month'] else '2025-06'  
-        opex = tools.get_opex_breakdown(month)
+    elif answer['intent'] == 'opex_breakdown' and answer['error']:
+        st.warning(f"⚠️ {answer['error']}")
+
+    elif answer['intent'] == 'opex_breakdown':
+        month = answer['month']
+        opex = result
         
    
         total_opex = opex['amount'].sum()
         st.metric("Total Operating Expenses", f"${total_opex:,.0f}")
         
      
-        fig = px.pie(opex, values='amount', names='category', 
-                     title=f"Opex Breakdown - {month}")
-        fig.update_traces(textposition='inside', textinfo='percent+label')
+        with span('app.figure'):
+            fig = px.pie(opex, values='amount', names='category', 
+                         title=f"Opex Breakdown - {month}")
+            fig.update_traces(textposition='inside', textinfo='percent+label')
         st.plotly_chart(fig, use_container_width=True)
         
   
         st.dataframe(opex, use_container_width=True)
     
-    elif parsed['intent'] == 'ebitda':
-        month = parsed['month'] if parsed['month'] else '2025-06'
-        ebitda = tools.get_ebitda(month)
+    elif answer['intent'] == 'ebitda' and answer['error']:
+        st.warning(f"⚠️ {answer['error']}")
+
+    elif answer['intent'] == 'ebitda':
+        month = answer['month']
+        ebitda = result
      
         col1, col2 = st.columns(2)
         with col1:
@@ -150,19 +182,23 @@ if user_question:
         with col2:
             st.metric("EBITDA Margin", f"{ebitda['ebitda_margin_pct']:.1f}%")
 
-        fig = go.Figure(go.Waterfall(
-            x=['Revenue', 'COGS', 'Opex', 'EBITDA'],
-            y=[ebitda['revenue'], -ebitda['cogs'], -ebitda['opex'], ebitda['ebitda']],
-            measure=['absolute', 'relative', 'relative', 'total'],
-            text=[f"${ebitda['revenue']:,.0f}", f"-${ebitda['cogs']:,.0f}", 
-                  f"-${ebitda['opex']:,.0f}", f"${ebitda['ebitda']:,.0f}"],
-            textposition="outside"
-        ))
-        fig.update_layout(title=f"EBITDA Calculation - {month}", height=400)
+        with span('app.figure'):
+            fig = go.Figure(go.Waterfall(
+                x=['Revenue', 'COGS', 'Opex', 'EBITDA'],
+                y=[ebitda['revenue'], -ebitda['cogs'], -ebitda['opex'], ebitda['ebitda']],
+                measure=['absolute', 'relative', 'relative', 'total'],
+                text=[f"${ebitda['revenue']:,.0f}", f"-${ebitda['cogs']:,.0f}", 
+                      f"-${ebitda['opex']:,.0f}", f"${ebitda['ebitda']:,.0f}"],
+                textposition="outside"
+            ))
+            fig.update_layout(title=f"EBITDA Calculation - {month}", height=400)
         st.plotly_chart(fig, use_container_width=True)
     
-    elif parsed['intent'] == 'cash_runway':
-        runway = tools.get_cash_runway()
+    elif answer['intent'] == 'cash_runway' and answer['error']:
+        st.warning(f"⚠️ {answer['error']}")
+
+    elif answer['intent'] == 'cash_runway':
+        runway = result
         
   
         col1, col2, col3 = st.columns(3)
@@ -176,7 +212,75 @@ if user_question:
             else:
                 st.metric("Cash Runway", f"{runway['runway_months']:.1f} months")
         
-        st.info(f"📊 Based on cash balance as of {runway['latest_month']}")
+        st.info(f"📊 Based on cash balance as of {runway['latest_month']} and "
+                f"{runway['window_months']}-month average burn")
+
+        # Runway at every month, from the same trailing burn window
+        series = tools.get_runway_series(runway['window_months'])
+        series['runway_months'] = series['runway_months'].replace(float('inf'), float('nan'))
+        with span('app.figure'):
+            fig = go.Figure(go.Scatter(x=series['month'], y=series['runway_months'],
+                                       mode='lines+markers', name='Runway (months)'))
+            fig.update_layout(title="Cash Runway Over Time", xaxis_title="Month",
+                              yaxis_title="Months", height=400)
+        st.plotly_chart(fig, use_container_width=True)
+
+    elif answer['intent'] == 'forecast_vs_budget' and answer['error']:
+        st.warning(f"⚠️ {answer['error']}")
+
+    elif answer['intent'] == 'forecast_vs_budget':
+        forecast = result['monthly']
+        landing = result['landing']
+
+        # Landing for the last forecast year against its full-year budget
+        year = landing.iloc[-1]
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric(f"{year['year']} Revenue Landing", f"${year['landing_revenue']:,.0f}")
+        # Actuals can already reach the end of the budget, leaving the forecast year unbudgeted
+        budgeted = pd.notna(year['budget_revenue'])
+        with col2:
+            st.metric("Full-Year Budget", f"${year['budget_revenue']:,.0f}" if budgeted else "No budget")
+        with col3:
+            st.metric("Landing vs Budget", f"${year['revenue_variance']:,.0f}" if budgeted else "–")
+
+        with span('app.figure'):
+            fig = go.Figure()
+            fig.add_trace(go.Scatter(x=forecast['month'], y=forecast['forecast_revenue'],
+                                     mode='lines+markers', name='Forecast Revenue'))
+            fig.add_trace(go.Scatter(x=forecast['month'], y=forecast['budget_revenue'],
+                                     mode='lines+markers', name='Budget Revenue'))
+            fig.update_layout(title="Revenue Forecast vs Budget", xaxis_title="Month",
+                              yaxis_title="USD", height=400)
+        st.plotly_chart(fig, use_container_width=True)
+
+        st.dataframe(landing, use_container_width=True)
+
+    elif answer['intent'] == 'forecast_runway' and answer['error']:
+        st.warning(f"⚠️ {answer['error']}")
+
+    elif answer['intent'] == 'forecast_runway':
+        runway = result
+
+        col1, col2 = st.columns(2)
+        with col1:
+            st.metric("Current Cash", f"${runway['current_cash']:,.0f}")
+        with col2:
+            if runway['runway_months'] == float('inf'):
+                st.metric("Forecast Runway", "∞ (Profitable!)", delta="Positive forecast cash flow")
+            else:
+                st.metric("Forecast Runway", f"{runway['runway_months']:.1f} months",
+                          delta=f"Out of cash {runway['out_of_cash_month']}", delta_color="inverse")
+
+        with span('app.figure'):
+            fig = go.Figure(go.Scatter(x=runway['projection']['month'], y=runway['projection']['cash'],
+                                       mode='lines+markers', name='Projected Cash'))
+            fig.update_layout(title="Projected Cash Balance", xaxis_title="Month",
+                              yaxis_title="USD", height=400)
+        st.plotly_chart(fig, use_container_width=True)
+
+        st.info(f"📊 Based on cash balance as of {runway['latest_month']} and "
+                f"forecast EBITDA ({runway['method']} model)")
     
     else:
         st.error("❌ I don't understand that question. Try asking about:\n"
@@ -184,4 +288,22 @@ if user_question:
                 "- Gross margin trends\n"
                 "- Opex breakdown\n"
                 "- EBITDA\n"
-                "- Cash runway")
\ No newline at end of file
+                "- Cash runway\n"
+                "- Forecast vs budget or forecast runway")
+
+if show_anomalies:
+    with st.sidebar:
+        flags = get_anomalies(version)
+        st.caption(f"{len(flags)} flagged months")
+        st.dataframe(flags, use_container_width=True)
+
+# Where this rerun spent its time
+if show_timings:
+    with st.sidebar:
+        spans = TRACER.spans_since(timings_mark)
+        if spans:
+            st.dataframe(TRACER.log_records(spans), use_container_width=True)
+        else:
+            st.caption("No instrumented calls in this run")
+        with st.expander("Prometheus totals"):
+            st.code(TRACER.prometheus(), language="text")
@@ -0,0 +1,200 @@
+"""
+Benchmark runner for the loader, FinanceTools metrics, planner and PDF export.
+
+    python -m benchmarks.run --sizes 10000 1000000 --output bench.json
+    python -m benchmarks.run --compare benchmarks/baseline.json --threshold 0.25
+
+Each hot path is timed over several repeats at each synthetic ledger size and
+reported as latency percentiles, throughput and peak traced memory. With
+--compare the run fails (exit code 1) when any p50 latency regresses by more
+than the threshold relative to the baseline.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agent.data_loader import FinanceDataLoader
+from agent.pdf_generator import PDFReportGenerator, CHART_CACHE
+from agent.planner import QueryPlanner
+from agent.synthetic import account_categories, generate_ledger, write_dataset
+from agent.tools import FinanceTools
+
+DEFAULT_SIZES = [10000, 1000000, 10000000]
+
+# Writing xlsx is slow and Excel caps sheets at ~1M rows, so cold parses stop here
+DEFAULT_MAX_EXCEL_ROWS = 10000
+
+QUESTIONS = [
+    "What was June 2025 revenue vs budget?",
+    "Show me gross margin trend for the last 6 months",
+    "Break down Opex by category for March 2025",
+    "What was EBITDA in 2025-04?",
+    "How long will our cash last?",
+    "How did we do in April 2025 compared to budget?",
+    "Tell me something interesting",
+]
+
+
+def synthetic_data(rows, seed=0):
+    """Ledger sheets of `rows` actuals rows over ten years, from agent.synthetic"""
+    months = 120
+    per_entity = months * len(account_categories())
+    data = generate_ledger(entities=max(1, -(-rows // per_entity)), currencies=12, months=months,
+                           start_month='2015-01', seed=seed)
+    for sheet in ['actuals', 'budget']:
+        data[sheet] = data[sheet].iloc[:rows]
+    return data
+
+
+def measure(fn, repeats, units=1):
+    """Time `fn` `repeats` times; returns latency percentiles, throughput and peak memory"""
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+
+    # One extra traced run for memory, kept out of the timings tracemalloc would skew
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    timings = np.array(timings)
+    return {
+        'repeats': repeats,
+        'p50_ms': float(np.percentile(timings, 50) * 1000),
+        'p95_ms': float(np.percentile(timings, 95) * 1000),
+        'p99_ms': float(np.percentile(timings, 99) * 1000),
+        'throughput_per_s': float(units / timings.mean()) if timings.mean() > 0 else float('inf'),
+        'peak_mem_mb': peak / 2**20
+    }
+
+
+def bench_size(rows, repeats, max_excel_rows, workdir, workers=1):
+    results = {}
+    data = synthetic_data(rows)
+    months = sorted(data['actuals']['month'].unique())
+    month = months[-6]
+
+    if rows <= max_excel_rows:
+        fixtures = os.path.join(workdir, f'ledger_{rows}')
+        write_dataset(data, fixtures, 'xlsx')
+        results['loader.cold_excel'] = measure(
+            lambda: FinanceDataLoader(fixtures, use_cache=False).load_all_data(), max(1, repeats // 5), rows)
+        FinanceDataLoader(fixtures).load_all_data()
+        results['loader.warm_cache'] = measure(
+            lambda: FinanceDataLoader(fixtures).load_all_data(), repeats, rows)
+        # Lazy loading reads only the sheets the question touches
+        results['loader.first_answer_lazy'] = measure(
+            lambda: FinanceTools(FinanceDataLoader(fixtures).load_lazy(), result_cache=False)
+            .get_opex_breakdown(month), repeats, rows)
+
+    # preload() so the budget scenario is built too, as it always was before lazy loading
+    results['tools.construct'] = measure(
+        lambda: FinanceTools(data, result_cache=False).preload(), max(1, repeats // 5), rows)
+    if workers > 1:
+        results['tools.construct_parallel'] = measure(
+            lambda: FinanceTools(data, result_cache=False, workers=workers).preload(), max(1, repeats // 5), rows)
+
+    # Result caching off so every call does the real work
+    tools = FinanceTools(data, result_cache=False).preload()
+    results['tools.get_revenue_vs_budget'] = measure(lambda: tools.get_revenue_vs_budget(month), repeats)
+    results['tools.get_ebitda'] = measure(lambda: tools.get_ebitda(month), repeats)
+    results['tools.get_opex_breakdown'] = measure(lambda: tools.get_opex_breakdown(month), repeats)
+    results['tools.get_gross_margin_trend'] = measure(
+        lambda: tools.get_gross_margin_trend(months[0], months[-1]), repeats)
+    results['tools.get_cash_runway'] = measure(tools.get_cash_runway, repeats)
+    results['tools.get_variance_drilldown'] = measure(
+        lambda: tools.get_variance_drilldown(months[0], months[-1], metric='ebitda',
+                                             by=['entity', 'account_category']), repeats)
+    results['tools.simulate_runway'] = measure(
+        lambda: tools.simulate_runway(paths=100000, horizon=24), max(1, repeats // 5), 100000)
+
+    def export():
+        CHART_CACHE.invalidate()
+        PDFReportGenerator(tools, chart_workers=0).generate_report_bytes(month)
+    results['pdf.generate_report'] = measure(export, max(1, repeats // 5))
+
+    return results
+
+
+def bench_planner(repeats):
+    planner = QueryPlanner()
+    questions = QUESTIONS * 100
+    return {'planner.parse_query': measure(
+        lambda: [planner.parse_query(q) for q in questions], repeats, len(questions))}
+
+
+def compare(baseline, current, threshold):
+    """List (size, benchmark, baseline p50, current p50) for p50 regressions beyond threshold"""
+    regressions = []
+    for size, benchmarks in current['results'].items():
+        for name, stats in benchmarks.items():
+            base = baseline.get('results', {}).get(size, {}).get(name)
+            if base is None:
+                continue
+            if stats['p50_ms'] > base['p50_ms'] * (1 + threshold):
+                regressions.append((size, name, base['p50_ms'], stats['p50_ms']))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark CFO Copilot hot paths')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help='synthetic actuals row counts to benchmark')
+    parser.add_argument('--repeats', type=int, default=20)
+    parser.add_argument('--max-excel-rows', type=int, default=DEFAULT_MAX_EXCEL_ROWS,
+                        help='largest size for which an xlsx is written and parsed')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='threads for the partitioned FinanceTools build')
+    parser.add_argument('--output', help='write results JSON here (e.g. a new baseline)')
+    parser.add_argument('--compare', help='baseline JSON to check for regressions')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='allowed fractional p50 slowdown before failing')
+    args = parser.parse_args(argv)
+
+    report = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'results': {'planner': bench_planner(args.repeats)}
+    }
+    with tempfile.TemporaryDirectory() as workdir:
+        for rows in args.sizes:
+            report['results'][str(rows)] = bench_size(rows, args.repeats, args.max_excel_rows, workdir,
+                                                      args.workers)
+
+    for size, benchmarks in report['results'].items():
+        for name, stats in benchmarks.items():
+            print(f"{size:>10} {name:<32} p50 {stats['p50_ms']:>10.3f} ms  p95 {stats['p95_ms']:>10.3f} ms  "
+                  f"{stats['throughput_per_s']:>14,.0f}/s  peak {stats['peak_mem_mb']:>8.1f} MB")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, report, args.threshold)
+        for size, name, base, now in regressions:
+            print(f"REGRESSION {size} {name}: p50 {base:.3f} ms -> {now:.3f} ms")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,24 @@
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agent.data_loader import FinanceDataLoader
+from agent.tools import FinanceTools
+
+@pytest.fixture
+def finance_tools():
+    """Load data and create FinanceTools instance"""
+    loader = FinanceDataLoader()
+    data = loader.load_all_data()
+    return FinanceTools(data)
+
+@pytest.fixture
+def burning_tools():
+    """FinanceTools on the fixture with revenue cut so the company burns cash"""
+    data = FinanceDataLoader().load_all_data()
+    actuals = data['actuals'].copy()
+    revenue = actuals['account_category'] == 'Revenue'
+    actuals.loc[revenue, 'amount'] = actuals.loc[revenue, 'amount'] * 0.3
+    return FinanceTools(dict(data, actuals=actuals), result_cache=False)
@@ -0,0 +1,67 @@
+import pytest
+import numpy as np
+import pandas as pd
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agent.anomalies import AnomalyStore, rolling_zscores
+from agent.data_loader import FinanceDataLoader
+from agent.tools import FinanceTools
+
+@pytest.fixture
+def data():
+    return FinanceDataLoader().load_all_data()
+
+def test_rolling_zscores_match_pandas():
+    """Test that prefix-sum z-scores match a pandas rolling mean/std of the months before"""
+    values = np.random.default_rng(0).normal(100, 10, size=(40, 3))
+    present = np.ones(values.shape, dtype=bool)
+    z, expected = rolling_zscores(values, present, window=12, min_periods=6)
+
+    frame = pd.DataFrame(values)
+    history = frame.rolling(12, min_periods=6)
+    mean, std = history.mean().shift(1), history.std(ddof=0).shift(1)
+    np.testing.assert_allclose(z, ((frame - mean) / std).to_numpy(), equal_nan=True)
+    np.testing.assert_allclose(expected, mean.to_numpy(), equal_nan=True)
+
+@pytest.mark.parametrize('method', ['zscore', 'mad'])
+def test_spike_is_flagged(data, method):
+    """Test that a month booked at five times its usual amount is flagged"""
+    actuals = data['actuals'].copy()
+    cell = (actuals['month'] == '2025-06') & (actuals['entity'] == 'ParentCo') & \
+        (actuals['account_category'] == 'Opex:Marketing')
+    actuals.loc[cell, 'amount'] = actuals.loc[cell, 'amount'] * 5
+    flags = FinanceTools(dict(data, actuals=actuals)).detect_anomalies(method=method)
+
+    spike = flags[(flags['kind'] == method) & (flags['month'] == '2025-06')]
+    assert spike[['entity', 'account_category']].values.tolist() == [['ParentCo', 'Opex:Marketing']]
+    assert spike['score'].iloc[0] > 3
+    # Five times the usual amount also misses budget
+    assert ((flags['kind'] == 'budget_miss') & (flags['month'] == '2025-06')).any()
+
+def test_budget_misses(data):
+    """Test that budget misses are signed fractions of budget beyond the threshold"""
+    flags = FinanceTools(data).detect_anomalies(budget_threshold=0.05)
+    misses = flags[flags['kind'] == 'budget_miss']
+
+    assert len(misses) > 0 and (misses['score'].abs() > 0.05).all()
+    np.testing.assert_allclose(misses['score'], (misses['amount_usd'] - misses['expected_usd']) /
+                               misses['expected_usd'].abs())
+
+def test_store_serves_persisted_flags(data, tmp_path, monkeypatch):
+    """Test that saved flags are served without rescanning and stale versions are dropped"""
+    tools = FinanceTools(data)
+    store = AnomalyStore(str(tmp_path))
+    # Spelled out like the CLI does; a call leaning on the defaults must find the same file
+    flags = store.get_or_scan(tools, window=12, threshold=3.0, method='zscore', budget_threshold=0.05)
+
+    def fail(**params):
+        raise AssertionError('rescanned despite persisted flags')
+
+    monkeypatch.setattr(tools, 'detect_anomalies', fail)
+    pd.testing.assert_frame_equal(store.get_or_scan(tools, budget_threshold=0.05), flags)
+
+    store.save('newer', {}, flags)
+    assert not list(tmp_path.glob(f'anomalies-{tools.data_version}-*'))
@@ -0,0 +1,30 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.run import compare, measure, synthetic_data
+from agent.tools import FinanceTools
+
+def test_measure_reports_percentiles():
+    """Test the shape of a benchmark measurement"""
+    stats = measure(lambda: sum(range(1000)), repeats=5, units=1000)
+
+    assert stats['repeats'] == 5
+    assert 0 <= stats['p50_ms'] <= stats['p95_ms'] <= stats['p99_ms']
+    assert stats['throughput_per_s'] > 0
+
+def test_compare_flags_regressions():
+    """Test that only slowdowns past the threshold are reported"""
+    baseline = {'results': {'10000': {'a': {'p50_ms': 10.0}, 'b': {'p50_ms': 10.0}}}}
+    current = {'results': {'10000': {'a': {'p50_ms': 12.0}, 'b': {'p50_ms': 13.0}, 'new': {'p50_ms': 1.0}}}}
+
+    assert compare(baseline, current, threshold=0.25) == [('10000', 'b', 10.0, 13.0)]
+
+def test_synthetic_data_feeds_finance_tools():
+    """Test that the benchmark ledger has the schema FinanceTools expects"""
+    data = synthetic_data(5000)
+
+    assert len(data['actuals']) == 5000
+    tools = FinanceTools(data)
+    assert tools.get_ebitda(tools.months[-1])['revenue'] > 0
@@ -0,0 +1,63 @@
+import pytest
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agent.data_loader import FinanceDataLoader
+from agent.tools import FinanceTools
+from agent.bulk_reports import BulkReportGenerator, report_filename
+
+@pytest.fixture
+def bulk(tmp_path):
+    tools = FinanceTools(FinanceDataLoader().load_all_data())
+    return BulkReportGenerator(tools, str(tmp_path), workers=2)
+
+def test_plan_rolling_window(bulk):
+    """Test one job per entity per month in the window"""
+    jobs = bulk.plan(end_month='2025-06', window=12, include_consolidated=True)
+
+    assert len(jobs) == 12 * 3
+    assert jobs[0][0] == '2024-07' and jobs[-1][0] == '2025-06'
+    assert ('2025-06', None) in jobs
+
+    for window in [0, -3]:
+        with pytest.raises(ValueError):
+            bulk.plan(end_month='2025-06', window=window)
+
+def test_inputs_match_single_report_queries(bulk):
+    """Test that batched inputs equal the per-entity tool calls"""
+    job, = bulk.compute_inputs([('2025-06', 'EMEA')])
+    revenue = bulk.tools.get_revenue_vs_budget('2025-06', 'EMEA')
+    opex = bulk.tools.get_opex_breakdown('2025-06', 'EMEA')
+
+    assert job['revenue']['actual'] == pytest.approx(revenue['actual'])
+    assert job['opex']['category'].tolist() == opex['category'].tolist()
+    assert job['opex']['pct_of_total'].tolist() == pytest.approx(opex['pct_of_total'].tolist())
+
+def test_run_resumes_after_failure(bulk, tmp_path):
+    """Test that a failed report is retried while finished ones are skipped"""
+    jobs = bulk.plan(end_month='2025-06', window=1)
+    blocked = tmp_path / report_filename('2025-06', 'EMEA')
+    blocked.mkdir()  # a directory where the PDF should go makes that report fail
+
+    first = {r['file']: r['status'] for r in bulk.run(jobs)}
+    assert first[blocked.name] == 'failed'
+    assert first[report_filename('2025-06', 'ParentCo')] == 'done'
+    assert not list(tmp_path.glob('*.part'))
+
+    blocked.rmdir()
+    second = {r['file']: r['status'] for r in bulk.run(jobs)}
+    assert second == {blocked.name: 'done', report_filename('2025-06', 'ParentCo'): 'skipped'}
+    assert blocked.read_bytes().startswith(b'%PDF')
+
+def test_run_redoes_reports_from_other_data(bulk, tmp_path):
+    """Test that reports from an older workbook are regenerated, not skipped"""
+    jobs = bulk.plan(end_month='2025-06', window=1)
+    bulk.run(jobs)
+
+    data = FinanceDataLoader().load_all_data()
+    cash = data['cash'].assign(cash_usd=data['cash']['cash_usd'] * 2)
+    bulk.tools.refresh(dict(data, cash=cash), {'cash': cash['month'].tolist()})
+
+    assert {r['status'] for r in bulk.run(jobs)} == {'done'}
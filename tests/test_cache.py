@@ -0,0 +1,74 @@
+import pytest
+import numpy as np
+import pandas as pd
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agent.cache import ResultCache
+from agent.data_loader import FinanceDataLoader
+from agent.tools import FinanceTools
+
+@pytest.fixture
+def data():
+    return FinanceDataLoader().load_all_data()
+
+def test_lru_and_ttl_eviction(monkeypatch):
+    """Test bounded size and expiry of cached entries"""
+    cache = ResultCache(maxsize=2, ttl=10)
+    cache.put(('v1', 'a'), 1)
+    cache.put(('v1', 'b'), 2)
+    cache.get(('v1', 'a'))
+    cache.put(('v1', 'c'), 3)  # evicts 'b', the least recently used
+
+    assert cache.get(('v1', 'b')) == (False, None)
+    assert cache.get(('v1', 'a')) == (True, 1)
+
+    now = __import__('time').monotonic()
+    monkeypatch.setattr('agent.cache.time.monotonic', lambda: now + 60)
+    assert cache.get(('v1', 'c')) == (False, None)
+    assert cache.stats()['evictions'] == 2
+
+def test_repeat_queries_hit_cache(data):
+    """Test that asking the same question twice is served from the cache"""
+    tools = FinanceTools(data)
+    first = tools.get_ebitda('2025-06')
+    first['ebitda'] = 0  # mutating an answer must not leak into the cache
+
+    second = tools.get_ebitda('2025-06')
+    stats = tools.result_cache.stats()
+
+    assert second['ebitda'] != 0
+    assert stats['hits'] >= 1
+    assert tools.get_metrics(['2025-06'], metrics=['ebitda']).iloc[0]['ebitda'] == second['ebitda']
+
+def test_shared_cache_keyed_by_data_version(data):
+    """Test that instances share answers only when their data matches"""
+    cache = ResultCache()
+    tools = FinanceTools(data, result_cache=cache)
+    twin = FinanceTools(data, result_cache=cache)
+    assert tools.data_version == twin.data_version
+
+    tools.get_cash_runway()
+    hits = cache.hits
+    twin.get_cash_runway()
+    assert cache.hits == hits + 1
+
+    cash = data['cash'].assign(cash_usd=data['cash']['cash_usd'] * 2)
+    twin.refresh(dict(data, cash=cash), {'cash': cash['month'].tolist()})
+    assert twin.data_version != tools.data_version
+    assert twin.get_cash_runway()['current_cash'] == 2 * tools.get_cash_runway()['current_cash']
+
+def test_array_arguments_are_cached(data):
+    """Test that array, Index and Categorical arguments key the cache like lists"""
+    tools = FinanceTools(data)
+    months = tools.actuals['month'].unique()
+    expected = tools.get_metrics(list(months), metrics=['ebitda'])
+
+    for arg in [months, np.array(list(months), dtype=object), pd.Index(list(months)), pd.Series(list(months))]:
+        pd.testing.assert_frame_equal(tools.get_metrics(arg, metrics=['ebitda']), expected)
+    assert tools.result_cache.stats()['hits'] == 4
+    # Arguments that still can't be hashed bypass the cache instead of raising
+    keys_view = dict.fromkeys(months).keys()
+    pd.testing.assert_frame_equal(tools.get_metrics(keys_view, metrics=['ebitda']), expected)
@@ -0,0 +1,120 @@
+import pytest
+import pandas as pd
+import shutil
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agent.data_loader import FinanceDataLoader, data_version
+
+FIXTURES = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'fixtures'))
+
+@pytest.fixture
+def workbook_dir(tmp_path):
+    """Copy the fixture workbook somewhere the cache can be written freely"""
+    shutil.copy(os.path.join(FIXTURES, 'data.xlsx'), tmp_path / 'data.xlsx')
+    return str(tmp_path)
+
+def test_cache_matches_excel(workbook_dir):
+    """Test that cached sheets are identical to the parsed workbook"""
+    fresh = FinanceDataLoader(workbook_dir, use_cache=False).load_all_data()
+    FinanceDataLoader(workbook_dir).load_all_data()
+    cached = FinanceDataLoader(workbook_dir).load_all_data()
+
+    for sheet in ['actuals', 'budget', 'cash', 'fx']:
+        pd.testing.assert_frame_equal(cached[sheet], fresh[sheet])
+
+def test_cache_skips_excel(workbook_dir, monkeypatch):
+    """Test that a warm cache never touches the Excel parser"""
+    FinanceDataLoader(workbook_dir).load_all_data()
+
+    def fail(*args, **kwargs):
+        raise AssertionError('read_excel called on a warm cache')
+
+    monkeypatch.setattr(pd, 'read_excel', fail)
+    data = FinanceDataLoader(workbook_dir).load_all_data()
+    assert len(data['actuals']) > 0
+
+def test_cache_rebuilds_on_change(workbook_dir):
+    """Test that editing the workbook invalidates the cache"""
+    loader = FinanceDataLoader(workbook_dir)
+    data = loader.load_all_data()
+
+    excel_path = os.path.join(workbook_dir, 'data.xlsx')
+    with pd.ExcelWriter(excel_path) as writer:
+        for sheet, df in data.items():
+            if sheet == 'cash':
+                df = df.assign(cash_usd=df['cash_usd'] + 1)
+            df.to_excel(writer, sheet_name=sheet, index=False)
+
+    reloaded = loader.load_all_data()
+    assert (reloaded['cash']['cash_usd'] == data['cash']['cash_usd'] + 1).all()
+
+def test_streaming_matches_eager(workbook_dir):
+    """Test that chunked ingestion yields the same ledger with coded dimensions"""
+    eager = FinanceDataLoader(workbook_dir, use_cache=False).load_all_data()
+    streamed = FinanceDataLoader(workbook_dir, use_cache=False, streaming=True,
+                                 chunk_size=50).load_all_data()
+
+    for sheet in ['actuals', 'budget']:
+        assert str(streamed[sheet]['entity'].dtype) == 'category'
+        assert streamed[sheet]['month'].cat.ordered
+        pd.testing.assert_frame_equal(
+            streamed[sheet].astype({col: object for col in ['month', 'entity', 'account_category', 'currency']}),
+            eager[sheet]
+        )
+
+def test_streaming_feeds_finance_tools(workbook_dir):
+    """Test that FinanceTools gives identical answers on streamed data"""
+    from agent.tools import FinanceTools
+
+    eager = FinanceTools(FinanceDataLoader(workbook_dir, use_cache=False).load_all_data())
+    streamed = FinanceTools(FinanceDataLoader(workbook_dir, streaming=True).load_all_data())
+
+    assert streamed.get_revenue_vs_budget('2025-06') == eager.get_revenue_vs_budget('2025-06')
+    assert streamed.get_ebitda('2025-06') == eager.get_ebitda('2025-06')
+    assert streamed.get_cash_runway() == eager.get_cash_runway()
+    pd.testing.assert_frame_equal(
+        streamed.get_opex_breakdown('2025-06').reset_index(drop=True),
+        eager.get_opex_breakdown('2025-06').reset_index(drop=True)
+    )
+
+def test_refresh_reports_changed_months(workbook_dir):
+    """Test that only appended or edited month partitions are reported"""
+    loader = FinanceDataLoader(workbook_dir)
+    data = loader.load_all_data()
+
+    actuals = data['actuals']
+    new_month = actuals[actuals['month'] == '2025-12'].assign(month='2026-01')
+    edited = actuals.copy()
+    edited.loc[edited.index[0], 'amount'] += 1000
+    excel_path = os.path.join(workbook_dir, 'data.xlsx')
+    with pd.ExcelWriter(excel_path) as writer:
+        for sheet, df in data.items():
+            if sheet == 'actuals':
+                df = pd.concat([edited, new_month], ignore_index=True)
+            df.to_excel(writer, sheet_name=sheet, index=False)
+
+    refreshed, changes = loader.refresh(data)
+    assert changes == {'actuals': [actuals['month'].iloc[0], '2026-01']}
+    assert len(refreshed['actuals']) == len(actuals) + len(new_month)
+
+def test_lazy_reads_only_requested_sheets(workbook_dir):
+    """Test that lazy data parses a sheet on first access and caches it on its own"""
+    data = FinanceDataLoader(workbook_dir).load_lazy()
+    assert data.loaded() == [] and 'cash' in data
+
+    cash = data['cash']
+    assert data.loaded() == ['cash'] and data['cash'] is cash
+
+    # The cash sheet is served from the cache while fx still comes from the workbook
+    cached = FinanceDataLoader(workbook_dir).load_lazy()
+    pd.testing.assert_frame_equal(cached['cash'], cash)
+    pd.testing.assert_frame_equal(cached['fx'], FinanceDataLoader(workbook_dir, use_cache=False).load_sheet('fx'))
+    assert cached.version == data.version
+
+    # Once every sheet is cached, lazy data versions like the eager sheets without parsing anything
+    eager = FinanceDataLoader(workbook_dir).load_all_data()
+    warm = FinanceDataLoader(workbook_dir).load_lazy()
+    assert warm.version == data_version(eager) and warm.loaded() == []
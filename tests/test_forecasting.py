@@ -0,0 +1,34 @@
+import pytest
+import numpy as np
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agent.forecasting import forecast_series
+
+@pytest.fixture
+def history():
+    """36 months of a straight line, a pure seasonal cycle and a constant, as month x 1 x 3"""
+    t = np.arange(36)
+    return np.stack([100 + 2 * t, 100 + 10 * np.sin(2 * np.pi * t / 12), np.full(36, 50.0)], axis=1)[:, None, :]
+
+def test_models_extend_their_patterns(history):
+    """Test each model on the series shape it is built for"""
+    trend = forecast_series(history, 3, 'linear_trend')[:, 0, 0]
+    np.testing.assert_allclose(trend, [172, 174, 176])
+
+    seasonal = forecast_series(history, 14, 'seasonal_naive')[:, 0, 1]
+    np.testing.assert_allclose(seasonal, history[24:36, 0, 1].tolist() + history[24:26, 0, 1].tolist())
+
+    flat = forecast_series(history, 3, 'exp_smoothing')[:, 0, 2]
+    np.testing.assert_allclose(flat, 50.0)
+
+def test_auto_picks_a_model_per_series(history):
+    """Test that auto forecasts each series with the model that fits it"""
+    auto = forecast_series(history, 3, 'auto')
+    np.testing.assert_allclose(auto[:, 0, 0], forecast_series(history, 3, 'linear_trend')[:, 0, 0])
+    np.testing.assert_allclose(auto[:, 0, 1], forecast_series(history, 3, 'seasonal_naive')[:, 0, 1])
+
+    with pytest.raises(ValueError):
+        forecast_series(history, 3, 'arima')
@@ -0,0 +1,69 @@
+import pytest
+import pandas as pd
+import numpy as np
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agent.data_loader import FinanceDataLoader
+from agent.fx import FXRates
+from agent.tools import FinanceTools
+
+@pytest.fixture
+def fx_table():
+    return pd.DataFrame({
+        'month': ['2025-01', '2025-01', '2025-02', '2025-03', '2025-03'],
+        'currency': ['USD', 'EUR', 'USD', 'USD', 'EUR'],
+        'rate_to_usd': [1.0, 1.10, 1.0, 1.0, 1.20]
+    })
+
+def test_asof_fallback(fx_table):
+    """Test that a missing rate falls back to the latest earlier month"""
+    rates = FXRates(fx_table)
+
+    result = rates.lookup(['2025-02', '2025-03', '2025-06'], ['EUR', 'EUR', 'EUR'])
+    assert result.tolist() == [1.10, 1.20, 1.20]
+
+    exact = rates.lookup(['2025-02'], ['EUR'], asof=False)
+    assert np.isnan(exact[0])
+
+def test_missing_rate_raises(fx_table):
+    """Test that conversion fails loudly instead of producing NaN"""
+    rates = FXRates(fx_table)
+
+    with pytest.raises(ValueError):
+        rates.convert([100.0], ['2024-12'], ['EUR'])
+    with pytest.raises(ValueError):
+        rates.convert([100.0], ['2025-01'], ['GBP'])
+
+def test_reporting_currency_switch():
+    """Test restating metrics in EUR without rebuilding FinanceTools"""
+    data = FinanceDataLoader().load_all_data()
+    tools = FinanceTools(data)
+    usd = tools.get_ebitda('2025-06')
+
+    tools.set_reporting_currency('EUR')
+    eur = tools.get_ebitda('2025-06')
+    eur_rate = data['fx'][(data['fx']['month'] == '2025-06') &
+                          (data['fx']['currency'] == 'EUR')]['rate_to_usd'].iloc[0]
+
+    assert eur['revenue'] == pytest.approx(usd['revenue'] / eur_rate)
+    assert eur['ebitda_margin_pct'] == pytest.approx(usd['ebitda_margin_pct'])
+
+    tools.set_reporting_currency('USD')
+    assert tools.get_ebitda('2025-06')['ebitda'] == pytest.approx(usd['ebitda'])
+
+def test_finance_tools_uses_fx_index():
+    """Test that FinanceTools converts through FXRates (no silent NaN)"""
+    data = FinanceDataLoader().load_all_data()
+    fx = data['fx']
+    first_month = fx['month'].min()
+
+    gappy = fx[~((fx['month'] == '2025-03') & (fx['currency'] == 'EUR'))]
+    tools = FinanceTools(dict(data, fx=gappy))
+    assert tools.actuals_usd['amount_usd'].notna().all()
+
+    missing = fx[~((fx['month'] == first_month) & (fx['currency'] == 'EUR'))]
+    with pytest.raises(ValueError):
+        FinanceTools(dict(data, fx=missing))
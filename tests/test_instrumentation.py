@@ -0,0 +1,59 @@
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agent.data_loader import FinanceDataLoader
+from agent.instrumentation import TRACER, Tracer
+from agent.tools import FinanceTools
+
+@pytest.fixture
+def tools():
+    data = FinanceDataLoader('fixtures').load_all_data()
+    return FinanceTools(data)
+
+def test_nested_spans_roll_up_rows():
+    """Test that spans nest, time themselves and pass rows to their parent"""
+    tracer = Tracer(track_allocations=True)
+    with tracer.span('outer'):
+        with tracer.span('inner', rows=10) as inner:
+            inner.add_rows(5)
+            buffer = bytearray(1 << 20)
+
+    inner, outer = tracer.spans_since(0)
+    assert (inner.name, inner.parent, inner.rows) == ('inner', 'outer', 15)
+    assert outer.rows == 15
+    assert outer.seconds >= inner.seconds > 0
+    assert inner.alloc_bytes >= len(buffer)
+    tracer.set_track_allocations(False)
+
+def test_tools_methods_are_traced(tools):
+    """Test that FinanceTools calls record rows scanned and cache hits"""
+    mark = TRACER.mark()
+    tools.get_ebitda('2025-06')
+    tools.get_ebitda('2025-06')
+
+    spans = [s for s in TRACER.spans_since(mark) if s.name == 'tools.get_ebitda']
+    assert [s.attrs['cached'] for s in spans] == [False, True]
+    assert spans[0].rows > 0
+    assert spans[1].rows == 0
+
+def test_prometheus_and_log_export():
+    """Test the Prometheus text dump and JSON log records"""
+    tracer = Tracer()
+    with tracer.span('loader.load_all_data', rows=3):
+        pass
+
+    text = tracer.prometheus()
+    assert '# TYPE cfo_copilot_span_calls_total counter' in text
+    assert 'cfo_copilot_span_rows_total{span="loader.load_all_data"} 3' in text
+    record, = tracer.log_records()
+    assert record['span'] == 'loader.load_all_data' and record['rows'] == 3
+
+def test_disabled_tracer_records_nothing():
+    """Test that a disabled tracer is a no-op"""
+    tracer = Tracer(enabled=False)
+    with tracer.span('anything') as span:
+        assert span is None
+    assert tracer.totals() == {}
@@ -0,0 +1,35 @@
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agent.pdf_generator import PDFReportGenerator, CHART_CACHE, render_chart
+
+def test_render_chart_png():
+    """Test that charts render to PNG bytes without pyplot"""
+    png = render_chart('revenue', {'actual': 1000.0, 'budget': 1200.0, 'month': '2025-06'})
+    assert png.startswith(b'\x89PNG')
+
+    with pytest.raises(ValueError):
+        render_chart('waterfall', {})
+
+def test_report_reuses_cached_charts(finance_tools, tmp_path):
+    """Test that re-exporting the same month skips chart rendering"""
+    CHART_CACHE.invalidate()
+    generator = PDFReportGenerator(finance_tools)
+
+    generator.generate_report(str(tmp_path / 'first.pdf'), month='2025-06')
+    misses = CHART_CACHE.misses
+    generator.generate_report(str(tmp_path / 'second.pdf'), month='2025-06')
+
+    assert CHART_CACHE.misses == misses
+    assert (tmp_path / 'second.pdf').read_bytes().startswith(b'%PDF')
+
+def test_report_bytes_in_memory(finance_tools, tmp_path, monkeypatch):
+    """Test building a report straight to bytes without touching disk"""
+    monkeypatch.chdir(tmp_path)
+    pdf = PDFReportGenerator(finance_tools, chart_workers=0).generate_report_bytes(month='2025-05')
+
+    assert pdf.startswith(b'%PDF')
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,68 @@
+import pytest
+import json
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agent.data_loader import FinanceDataLoader
+from agent.tools import FinanceTools
+from agent.pipeline import QueryPipeline, to_serializable
+
+@pytest.fixture
+def pipeline():
+    return QueryPipeline(FinanceTools(FinanceDataLoader().load_all_data()))
+
+def test_batch_computes_distinct_queries_once(pipeline, monkeypatch):
+    """Test that repeated and equivalent questions share one tool call"""
+    calls = []
+    original = pipeline.tools.get_ebitda
+    monkeypatch.setattr(pipeline.tools, 'get_ebitda', lambda month: calls.append(month) or original(month))
+
+    questions = [
+        "What was EBITDA in June 2025?",
+        "EBITDA 2025-06",
+        "Show me profitability",  # defaults to 2025-06
+        "What was EBITDA in May 2025?"
+    ] * 50
+    answers = pipeline.answer_batch(questions)
+
+    assert len(answers) == len(questions)
+    assert sorted(calls) == ['2025-05', '2025-06']
+    assert answers[0]['result'] == original('2025-06')
+
+def test_batch_reports_errors(pipeline):
+    """Test that unanswerable questions carry an error instead of raising"""
+    answers = pipeline.answer_batch(["revenue vs budget", "tell me a joke", "gm trend last 500 months"])
+
+    assert [a['result'] for a in answers] == [None, None, None]
+    assert all(a['error'] for a in answers)
+
+def test_stream_is_serializable(pipeline):
+    """Test streaming answers and turning them into JSON lines"""
+    questions = iter(["gross margin trend last 6 months", "cash runway", "opex breakdown"] * 3)
+    answers = list(pipeline.answer_stream(questions, chunk_size=2))
+
+    assert len(answers) == 9
+    assert len(answers[0]['result']) == 6
+    for answer in answers:
+        json.dumps(to_serializable(answer))
+
+def test_runway_window_from_question(pipeline):
+    """Test that "last N months" sets the burn window of a runway question"""
+    answer = pipeline.answer("What is our cash runway based on the last 6 months?")
+
+    assert answer['date_range'] == ('LAST_N_MONTHS', 6)
+    assert answer['result']['window_months'] == 6
+
+def test_tool_failure_stays_with_its_question(pipeline, monkeypatch):
+    """Test that a tool raising fails only the questions that reach it"""
+    def broken(month):
+        raise ValueError("No FX rate for (month, currency): [('2025-06', 'EUR')]")
+    monkeypatch.setattr(pipeline.tools, 'get_ebitda', broken)
+
+    answers = pipeline.answer_batch(["EBITDA June 2025", "opex breakdown", "gm trend last 0 months"])
+
+    assert answers[0]['result'] is None and 'No FX rate' in answers[0]['error']
+    assert answers[1]['error'] is None
+    assert answers[2]['error'] == "The trend needs a window of at least 1 month"
@@ -73,4 +73,27 @@ def test_date_range_extraction(planner):
     assert result == ('LAST_N_MONTHS', 3)
     
     result = planner.extract_date_range("Show me last 6 months")
-    assert result == ('LAST_N_MONTHS', 6)
\ No newline at end of file
+    assert result == ('LAST_N_MONTHS', 6)
+
+def test_parse_query_single_scan(planner):
+    """Test that the combined scanner keeps intent and month precedence"""
+    result = planner.parse_query("EBITDA and cash runway for 2025-03, last 6 months")
+    assert result['intent'] == 'ebitda'
+    assert result['month'] == '2025-03'
+    assert result['date_range'] == ('LAST_N_MONTHS', 6)
+
+    # Month names win over YYYY-MM, earlier names in the calendar win ties
+    assert planner.extract_month("2025-01 vs June 2024 vs March 2023") == '2023-03'
+    assert planner.extract_month("last 12 monthsep 2024") == '2024-09'
+    assert planner.parse_query("Hello there")['intent'] == 'unknown'
+
+def test_forecast_intents(planner):
+    """Test forecast questions, including ones that mention budget or runway"""
+    assert planner.classify_intent("What is our revenue forecast vs budget?") == 'forecast_vs_budget'
+    assert planner.classify_intent("Where will we land this year?") == 'forecast_vs_budget'
+    assert planner.classify_intent("What is the forecast cash runway?") == 'forecast_runway'
+    assert planner.classify_intent("What is our cash runway?") == 'cash_runway'
+    assert planner.classify_intent("What's our cash runway projection?") == 'forecast_runway'
+    assert planner.classify_intent("runway outlook next year") == 'forecast_runway'
+    assert planner.classify_intent("What is our landing for the year?") == 'forecast_vs_budget'
+    assert planner.classify_intent("budget revenue for June 2025 landing page campaign") == 'revenue_vs_budget'
@@ -0,0 +1,39 @@
+import pytest
+import numpy as np
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agent.scenarios import RunwaySimulator
+
+def test_flat_paths_run_out_on_schedule():
+    """Test that without volatility every path burns 50 a month through 1000 of cash"""
+    history = np.tile([100.0, 20.0, 130.0], (12, 1))
+    simulator = RunwaySimulator(history, [100.0, 20.0, 130.0], 1000.0, '2025-12')
+    result = simulator.simulate(paths=500, horizon=24, by='2027-08')
+
+    assert set(result['runway_months'].values()) == {20.0}
+    assert result['prob_out_of_cash'] == 0.0
+    curve = result['out_of_cash_curve'].set_index('month')['probability']
+    assert curve['2027-08'] == 0.0 and curve['2027-09'] == 1.0
+
+def test_simulation_matches_deterministic_runway(burning_tools):
+    """Test that vol_scale=0 reproduces get_cash_runway and shocks move runway the right way"""
+    expected = burning_tools.get_cash_runway()['runway_months']
+    flat = burning_tools.simulate_runway(paths=100, vol_scale=0)
+    assert flat['runway_months']['p50'] == pytest.approx(expected)
+
+    result = burning_tools.simulate_runway(paths=20000, seed=1)
+    p = result['runway_months']
+    assert p['p5'] <= p['p50'] <= p['p95']
+    assert np.all(np.diff(result['out_of_cash_curve']['probability']) >= 0)
+
+    sensitivity = result['sensitivity'].set_index(['driver', 'shock'])['runway_p50']
+    assert sensitivity[('revenue', 0.1)] > sensitivity[('revenue', -0.1)]
+    assert sensitivity[('opex', 0.1)] < sensitivity[('opex', -0.1)]
+
+def test_by_must_fall_in_horizon(burning_tools):
+    """Test that asking for a probability beyond the simulated months is rejected"""
+    with pytest.raises(ValueError):
+        burning_tools.simulate_runway(paths=10, horizon=6, by='2030-01')
@@ -0,0 +1,82 @@
+import pytest
+import sys
+import os
+import asyncio
+import json
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agent.data_loader import FinanceDataLoader
+from agent.server import FinanceService
+from agent.tools import FinanceTools
+
+@pytest.fixture
+def service():
+    data = FinanceDataLoader('fixtures').load_all_data()
+    service = FinanceService(FinanceTools(data), timeout=5)
+    yield service
+    service.close()
+
+def call(service, method, target, payload=None):
+    body = b'' if payload is None else json.dumps(payload).encode()
+    status, _, response = asyncio.run(service.handle(method, target, body))
+    return status, json.loads(response)
+
+def test_query_and_batch(service):
+    """Test single and batch questions against the warm pipeline"""
+    status, answer = call(service, 'POST', '/query', {'question': 'What was EBITDA in 2025-04?'})
+    assert status == 200
+    assert answer['intent'] == 'ebitda' and answer['result']['month'] == '2025-04'
+
+    status, batch = call(service, 'POST', '/batch', {'questions': ['How long will our cash last?', 'hello']})
+    assert status == 200
+    assert [a['intent'] for a in batch['answers']] == ['cash_runway', 'unknown']
+
+def test_bad_requests(service):
+    """Test that malformed requests get JSON errors with the right status"""
+    assert call(service, 'POST', '/query', {'q': 'x'})[0] == 400
+    assert call(service, 'GET', '/query')[0] == 405
+    assert call(service, 'GET', '/nope')[0] == 404
+    status, _, _ = asyncio.run(service.handle('POST', '/batch', b'not json'))
+    assert status == 400
+
+def test_route_failure_is_500(service):
+    """Test that an unexpected error in a route comes back as a JSON 500"""
+    def broken(questions):
+        raise ValueError("No FX rate for (month, currency)")
+    service.pipeline.answer_batch = broken
+    status, body = call(service, 'POST', '/batch', {'questions': ['EBITDA']})
+    assert status == 500
+    assert 'No FX rate' in body['error']
+
+def test_request_timeout(service):
+    """Test that a slow tool call is answered with 504"""
+    service.pipeline.answer = lambda question: time.sleep(0.5)
+    status, body = call(service, 'POST', '/query', {'question': 'EBITDA', 'timeout': 0.05})
+    assert status == 504
+    assert 'Timed out' in body['error']
+
+def test_http_round_trip(service):
+    """Test keep-alive HTTP requests over a real socket"""
+    async def scenario():
+        server = await service.start('127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        responses = []
+        for request in [b'GET /health HTTP/1.1\r\n\r\n',
+                        b'POST /query HTTP/1.1\r\nContent-Length: 31\r\nConnection: close\r\n\r\n'
+                        b'{"question": "cash runway now"}']:
+            writer.write(request)
+            head = await reader.readuntil(b'\r\n\r\n')
+            length = int(head.split(b'Content-Length: ')[1].split(b'\r\n')[0])
+            responses.append((head.split(b' ')[1], json.loads(await reader.readexactly(length))))
+        writer.close()
+        server.close()
+        await server.wait_closed()
+        return responses
+
+    (status1, health), (status2, answer) = asyncio.run(scenario())
+    assert status1 == status2 == b'200'
+    assert health['data_version'] == service.tools.data_version
+    assert answer['intent'] == 'cash_runway'
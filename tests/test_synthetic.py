@@ -0,0 +1,45 @@
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agent.data_loader import FinanceDataLoader
+from agent.synthetic import generate_ledger, write_dataset
+from agent.tools import FinanceTools
+
+@pytest.fixture
+def ledger():
+    return generate_ledger(entities=5, currencies=3, months=24, sub_accounts=2, actuals_months=18, seed=7)
+
+def test_generator_is_deterministic(ledger):
+    """Test that the same seed gives the same ledger and another seed doesn't"""
+    again = generate_ledger(entities=5, currencies=3, months=24, sub_accounts=2, actuals_months=18, seed=7)
+    other = generate_ledger(entities=5, currencies=3, months=24, sub_accounts=2, actuals_months=18, seed=8)
+
+    for sheet in ledger:
+        assert ledger[sheet].equals(again[sheet])
+    assert not ledger['actuals'].equals(other['actuals'])
+
+def test_generator_shape(ledger):
+    """Test row counts, sub-accounts and currencies of a generated ledger"""
+    categories = 2 + 4 * 2
+
+    assert len(ledger['budget']) == 24 * 5 * categories
+    assert len(ledger['actuals']) == 18 * 5 * categories
+    assert len(ledger['cash']) == 18
+    assert 'Opex:Marketing:02' in set(ledger['actuals']['account_category'])
+    assert set(ledger['fx']['currency']) == {'USD', 'EUR', 'GBP'}
+    assert (ledger['fx'].loc[ledger['fx']['currency'] == 'USD', 'rate_to_usd'] == 1.0).all()
+
+@pytest.mark.parametrize('fmt', ['xlsx', 'csv', 'feather'])
+def test_written_dataset_loads(ledger, fmt, tmp_path):
+    """Test that every output format round-trips through the loader into FinanceTools"""
+    write_dataset(ledger, str(tmp_path), fmt)
+    data = FinanceDataLoader(str(tmp_path), use_cache=False).load_all_data()
+
+    assert len(data['actuals']) == len(ledger['actuals'])
+    tools = FinanceTools(data)
+    month = tools.actual_months()[-1]
+    expected = FinanceTools(ledger).get_ebitda(month)
+    assert tools.get_ebitda(month)['ebitda'] == pytest.approx(expected['ebitda'])
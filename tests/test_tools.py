@@ -9,13 +9,6 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')
 from agent.data_loader import FinanceDataLoader
 from agent.tools import FinanceTools
 
-@pytest.fixture
-def finance_tools():
-    """Load data and create FinanceTools instance"""
-    loader = FinanceDataLoader()
-    data = loader.load_all_data()
-    return FinanceTools(data)
-
 def test_revenue_vs_budget(finance_tools):
     """Test revenue vs budget calculation"""
     result = finance_tools.get_revenue_vs_budget('2025-06')
@@ -64,6 +57,12 @@ def test_cash_runway(finance_tools):
     assert 'avg_monthly_burn' in result
     assert 'runway_months' in result
 
+    # Newest month first, three months whatever the burn window
+    latest = sorted(finance_tools.actuals_usd['month'].unique(), reverse=True)[:3]
+    expected = [-finance_tools.get_ebitda(month)['ebitda'] for month in latest]
+    assert result['last_3_months_burn'] == pytest.approx(expected)
+    assert finance_tools.get_cash_runway(6)['last_3_months_burn'] == pytest.approx(expected)
+
 def test_usd_conversion(finance_tools):
     """Test that amounts are properly converted to USD"""
     
@@ -75,4 +74,228 @@ def test_usd_conversion(finance_tools):
             (finance_tools.actuals_usd['month'] == eur_data.iloc[0]['month'])
         ]
         assert len(usd_data) > 0
-        assert 'amount_usd' in usd_data.columns
\ No newline at end of file
+        assert 'amount_usd' in usd_data.columns
+
+def test_cube_matches_row_scan(finance_tools):
+    """Test that cube lookups agree with filtering the USD frames directly"""
+    actuals = finance_tools.actuals_usd
+    month_data = actuals[actuals['month'] == '2025-06']
+
+    ebitda = finance_tools.get_ebitda('2025-06')
+    assert ebitda['revenue'] == pytest.approx(
+        month_data[month_data['account_category'] == 'Revenue']['amount_usd'].sum())
+    assert ebitda['opex'] == pytest.approx(
+        month_data[month_data['account_category'].str.startswith('Opex:')]['amount_usd'].sum())
+
+    budget = finance_tools.budget_usd
+    revenue = finance_tools.get_revenue_vs_budget('2025-06')
+    assert revenue['budget'] == pytest.approx(
+        budget[(budget['month'] == '2025-06') & (budget['account_category'] == 'Revenue')]['amount_usd'].sum())
+
+def test_unknown_month_is_empty(finance_tools):
+    """Test that a month outside the ledger yields zeros, not errors"""
+    assert finance_tools.get_ebitda('1999-01')['revenue'] == 0
+    assert len(finance_tools.get_opex_breakdown('1999-01')) == 0
+
+def test_gross_margin_trend_by_entity(finance_tools):
+    """Test that the per-entity trend adds up to the consolidated trend"""
+    consolidated = finance_tools.get_gross_margin_trend('2024-01', '2024-12')
+    by_entity = finance_tools.get_gross_margin_trend('2024-01', '2024-12', by_entity=True)
+
+    assert list(by_entity.columns) == ['month', 'entity', 'revenue', 'cogs', 'gross_margin_pct']
+    assert set(by_entity['entity']) == {'ParentCo', 'EMEA'}
+
+    totals = by_entity.groupby('month')[['revenue', 'cogs']].sum().reset_index()
+    pd.testing.assert_frame_equal(totals, consolidated[['month', 'revenue', 'cogs']])
+
+def test_gross_margin_trend_open_range(finance_tools):
+    """Test that omitting the range bounds covers the whole history"""
+    result = finance_tools.get_gross_margin_trend()
+
+    assert result['month'].iloc[0] == '2023-01'
+    assert result['month'].iloc[-1] == '2025-12'
+    assert len(finance_tools.get_gross_margin_trend('2025-07', '2025-01')) == 0
+
+def test_batch_metrics_match_single_month(finance_tools):
+    """Test that one batched call reproduces the per-month methods"""
+    months = finance_tools.month_range('2025-01', '2025-06')
+    batch = finance_tools.get_metrics(months)
+
+    assert batch['month'].tolist() == months
+    for _, row in batch.iterrows():
+        ebitda = finance_tools.get_ebitda(row['month'])
+        revenue = finance_tools.get_revenue_vs_budget(row['month'])
+        assert row['ebitda'] == pytest.approx(ebitda['ebitda'])
+        assert row['budget_revenue'] == pytest.approx(revenue['budget'])
+
+def test_batch_metrics_by_entity(finance_tools):
+    """Test per-entity batch rows and metric validation"""
+    result = finance_tools.get_metrics(['2025-06'], entities=['EMEA'], metrics=['revenue'], by_entity=True)
+
+    assert list(result.columns) == ['month', 'entity', 'revenue']
+    assert result.iloc[0]['entity'] == 'EMEA'
+    assert 0 < result.iloc[0]['revenue'] < finance_tools.get_ebitda('2025-06')['revenue']
+
+    with pytest.raises(ValueError):
+        finance_tools.get_metrics(['2025-06'], metrics=['not_a_metric'])
+
+def test_incremental_refresh_matches_rebuild(finance_tools):
+    """Test that folding a new month in equals rebuilding from scratch"""
+    data = {
+        'actuals': finance_tools.actuals,
+        'budget': finance_tools.budget,
+        'cash': finance_tools.cash,
+        'fx': finance_tools.fx
+    }
+    actuals = data['actuals']
+    new_month = actuals[actuals['month'] == '2025-12'].assign(month='2026-01')
+    edited = actuals.copy()
+    edited.loc[(edited['month'] == '2025-06') & (edited['account_category'] == 'Revenue'), 'amount'] *= 2
+
+    updated = dict(data, actuals=pd.concat([edited, new_month], ignore_index=True))
+    finance_tools.refresh(updated, {'actuals': ['2025-06', '2026-01']})
+    rebuilt = FinanceTools(updated)
+
+    for month in ['2025-05', '2025-06', '2026-01']:
+        assert finance_tools.get_ebitda(month)['ebitda'] == pytest.approx(rebuilt.get_ebitda(month)['ebitda'])
+    assert finance_tools.get_cash_runway() == pytest.approx(rebuilt.get_cash_runway())
+    assert len(finance_tools.actuals_usd) == len(rebuilt.actuals_usd)
+
+def test_compact_ledger_gives_same_answers():
+    """Test that categorical-coded ledgers answer identically and keep the data version"""
+    from agent.data_loader import compact_ledger, data_version
+
+    data = FinanceDataLoader().load_all_data()
+    compact = dict(data, actuals=compact_ledger(data['actuals']), budget=compact_ledger(data['budget']))
+
+    assert data_version(compact) == data_version(data)
+    plain, coded = FinanceTools(data), FinanceTools(compact)
+    assert coded.get_ebitda('2025-06') == plain.get_ebitda('2025-06')
+    assert coded.get_cash_runway() == plain.get_cash_runway()
+    assert str(coded.actuals['entity'].dtype) == 'category'
+
+def test_memory_footprint(finance_tools):
+    """Test the footprint report and that USD frames are not kept alongside the ledger"""
+    footprint = finance_tools.memory_footprint()
+
+    assert footprint['total'] == sum(v for k, v in footprint.items() if k != 'total')
+    assert footprint['cube'] > 0
+    assert 'actuals_usd' not in vars(finance_tools)
+    assert finance_tools.cube is finance_tools.cube_usd
+
+def test_parallel_build_is_bit_identical():
+    """Test that month-partitioned aggregation reproduces the single-threaded cube exactly"""
+    from agent.synthetic import generate_ledger
+
+    data = generate_ledger(entities=20, currencies=4, months=30, seed=3)
+    # Shuffled rows take the sort-and-split path instead of zero-copy slices
+    shuffled = dict(data, actuals=data['actuals'].sample(frac=1, random_state=0))
+
+    for ledger in [data, shuffled]:
+        serial = FinanceTools(ledger, result_cache=False)
+        parallel = FinanceTools(ledger, result_cache=False, workers=4)
+        assert (serial.cube_usd == parallel.cube_usd).all()
+        assert (serial.cube_counts == parallel.cube_counts).all()
+        assert serial.get_cash_runway() == parallel.get_cash_runway()
+
+def test_parallel_missing_rate_raises():
+    """Test that a missing FX rate in any partition still raises"""
+    data = FinanceDataLoader().load_all_data()
+    fx = data['fx']
+    missing = fx[~((fx['month'] == fx['month'].min()) & (fx['currency'] == 'EUR'))]
+
+    with pytest.raises(ValueError):
+        FinanceTools(dict(data, fx=missing), workers=3)
+
+def test_window_metrics_match_direct_sums(finance_tools):
+    """Test trailing, YTD and QTD windows against summing monthly metrics"""
+    monthly = finance_tools.get_metrics().set_index('month')
+
+    trailing = finance_tools.get_window_metrics('trailing', 3, ['2025-06']).iloc[0]
+    assert trailing['window_months'] == 3
+    assert trailing['ebitda'] == pytest.approx(monthly.loc['2025-04':'2025-06', 'ebitda'].sum())
+    assert trailing['avg_burn'] == pytest.approx(-monthly.loc['2025-04':'2025-06', 'ebitda'].mean())
+
+    ytd = finance_tools.get_window_metrics('ytd', months=['2025-05']).iloc[0]
+    assert ytd['revenue'] == pytest.approx(monthly.loc['2025-01':'2025-05', 'revenue'].sum())
+    qtd = finance_tools.get_window_metrics('qtd', months=['2025-05'], entities=['EMEA'], by_entity=True).iloc[0]
+    assert qtd['window_months'] == 2 and qtd['entity'] == 'EMEA'
+
+    with pytest.raises(ValueError):
+        finance_tools.get_window_metrics('weekly')
+
+def test_runway_series_and_window(finance_tools):
+    """Test that the runway series ends at get_cash_runway and honours the window"""
+    series = finance_tools.get_runway_series(6)
+    runway = finance_tools.get_cash_runway(6)
+
+    assert len(series) == len(finance_tools.cash)
+    assert series['month'].iloc[-1] == runway['latest_month']
+    assert series['avg_monthly_burn'].iloc[-1] == pytest.approx(runway['avg_monthly_burn'])
+    assert len(runway['monthly_burn']) == 6
+    assert runway['avg_monthly_burn'] == pytest.approx(sum(runway['monthly_burn']) / 6)
+
+    # Cash past the actuals gets the same series whether or not the budget widened the month axis
+    data = finance_tools.data
+    short = dict(data, actuals=data['actuals'][data['actuals']['month'] <= '2025-06'])
+    lazy = FinanceTools(short, result_cache=False).get_runway_series()
+    pd.testing.assert_frame_equal(lazy, FinanceTools(short, result_cache=False).preload().get_runway_series())
+    assert lazy.set_index('month').loc['2025-07', 'avg_monthly_burn'] == pytest.approx(
+        -finance_tools.get_metrics(['2025-05', '2025-06'], metrics=['ebitda'])['ebitda'].mean())
+
+def test_lazy_data_loads_what_queries_touch(finance_tools):
+    """Test that lazy tools read only the sheets an answer needs and agree with eager tools"""
+    data = FinanceDataLoader(compact=True).load_lazy()
+    tools = FinanceTools(data)
+
+    pd.testing.assert_frame_equal(tools.get_opex_breakdown('2025-06'), finance_tools.get_opex_breakdown('2025-06'))
+    assert data.loaded() == ['actuals', 'fx']
+
+    # Keying the result cache doesn't read sheets, even with no loader cache to take digests from
+    uncached = FinanceDataLoader(compact=True, use_cache=False).load_lazy()
+    FinanceTools(uncached).get_opex_breakdown('2025-06')
+    assert uncached.loaded() == ['actuals', 'fx']
+
+    assert tools.get_cash_runway() == finance_tools.get_cash_runway()
+    assert data.loaded() == ['actuals', 'cash', 'fx']
+
+    assert tools.get_revenue_vs_budget('2025-06') == finance_tools.get_revenue_vs_budget('2025-06')
+    assert data.loaded() == ['actuals', 'budget', 'cash', 'fx']
+    pd.testing.assert_frame_equal(tools.get_metrics(), finance_tools.get_metrics())
+
+def test_forecast_to_end_of_budget():
+    """Test that a forecast fills the budgeted months after the actuals and lands the year"""
+    data = FinanceDataLoader().load_all_data()
+    actuals, cash = data['actuals'], data['cash']
+    tools = FinanceTools(dict(data, actuals=actuals[actuals['month'] <= '2025-06'],
+                              cash=cash[cash['month'] <= '2025-06']))
+
+    result = tools.get_forecast_vs_budget()
+    monthly, landing = result['monthly'], result['landing'].iloc[0]
+    assert monthly['month'].tolist() == ['2025-07', '2025-08', '2025-09', '2025-10', '2025-11', '2025-12']
+    assert monthly['budget_revenue'].tolist() == tools.get_metrics(
+        monthly['month'].tolist(), metrics=['budget_revenue'])['budget_revenue'].tolist()
+    assert landing['landing_revenue'] == pytest.approx(
+        tools.get_metrics(tools.month_range('2025-01', '2025-06'), metrics=['revenue'])['revenue'].sum() +
+        monthly['forecast_revenue'].sum())
+
+    # One batched fit serves the forecast, the comparison and the runway
+    tools.get_forecast_runway()
+    assert len(tools._forecasts) == 1
+
+def test_forecast_runway_when_burning(burning_tools):
+    """Test that forecast burn runs cash out at a named month"""
+    runway = burning_tools.get_forecast_runway(method='exp_smoothing', months_ahead=24)
+    projection = runway['projection']
+    assert 0 < runway['runway_months'] < len(projection)
+    assert projection.loc[projection['cash'] < 0, 'month'].iloc[0] == runway['out_of_cash_month']
+
+    # Cash reported behind the actuals: the months in between burn at their actual EBITDA
+    cash = burning_tools.cash
+    behind = FinanceTools(dict(burning_tools.data, cash=cash[cash['month'] <= '2025-06']), result_cache=False)
+    projection = behind.get_forecast_runway(method='exp_smoothing', months_ahead=24)['projection']
+    gap = behind.month_range('2025-07', '2025-12')
+    assert projection['month'].tolist()[:7] == gap + ['2026-01']
+    assert projection['source'].tolist()[:7] == ['actual'] * 6 + ['forecast']
+    assert projection['ebitda'].tolist()[:6] == pytest.approx(
+        behind.get_metrics(gap, metrics=['ebitda'])['ebitda'].tolist())
@@ -0,0 +1,50 @@
+import pytest
+import numpy as np
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agent.tools import FinanceTools
+
+def test_effects_add_up(finance_tools):
+    """Test that volume and FX effects sum to the variance and contributors sum to the total"""
+    result = finance_tools.get_variance_drilldown('2025-01', '2025-06', by=['entity', 'currency'])
+    contributors = result['contributors']
+
+    assert result['volume_effect'] + result['fx_effect'] == pytest.approx(result['variance'])
+    assert result['fx_effect'] != 0
+    assert contributors['variance'].sum() == pytest.approx(result['variance'])
+    np.testing.assert_allclose(contributors['volume_effect'] + contributors['fx_effect'],
+                               contributors['variance'])
+    # Only the EUR entity carries an FX effect
+    assert (contributors.loc[contributors['currency'] == 'USD', 'fx_effect'] == 0).all()
+
+def test_actual_plan_rates_match_revenue_vs_budget(finance_tools):
+    """Test that budgeting at actual rates reproduces the consolidated variance with no FX effect"""
+    result = finance_tools.get_variance_drilldown('2025-06', '2025-06', plan_rates='actual')
+    expected = finance_tools.get_revenue_vs_budget('2025-06')
+
+    assert result['variance'] == pytest.approx(expected['variance'])
+    assert result['fx_effect'] == 0
+
+def test_top_k_contributors():
+    """Test that only the k largest contributors come back, largest first"""
+    from agent.synthetic import generate_ledger
+
+    tools = FinanceTools(generate_ledger(entities=40, currencies=5, months=12, sub_accounts=3, seed=2))
+    full = tools.get_variance_drilldown(metric='ebitda', by=['entity', 'account_category'], top_k=10000)
+    top = tools.get_variance_drilldown(metric='ebitda', by=['entity', 'account_category'], top_k=5)
+
+    assert len(top['contributors']) == 5
+    assert (np.diff(top['contributors']['variance'].abs()) <= 0).all()
+    assert top['contributors']['variance'].tolist() == full['contributors']['variance'].head(5).tolist()
+
+def test_rejects_unknown_breakdowns(finance_tools):
+    """Test that unknown metrics, dimensions and plan rates are rejected"""
+    with pytest.raises(ValueError):
+        finance_tools.get_variance_drilldown(metric='cash')
+    with pytest.raises(ValueError):
+        finance_tools.get_variance_drilldown(by=['region'])
+    with pytest.raises(ValueError):
+        finance_tools.get_variance_drilldown(plan_rates='spot')